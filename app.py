@@ -1,277 +1,609 @@
 import streamlit as st
-import google.generativeai as genai
+from streamlit import runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+import functools
 import json
 import os
+import re
+import time
+from collections import deque
 
+import config
+from attempts import AttemptRecorder, SQLiteAttemptBackend
+from dedup import NearDuplicateIndex
+from generation import (
+    GenerationResources, generate_quiz, request_key, stream_mcqs, whole_quiz_questions,
+)
+from hedging import HedgedBackend
+from jobs import JobExecutor
+from llm_backends import BackendRegistry
+from mcq_cache import MCQCache
+from mcq_fallback import generate_fallback_mcqs
+from mcq_schema import OutputMetrics
+from mcq_stream import StreamingQuiz
+from prefetch import Prefetcher, practice_instructions
+from published import PublishedQuizzes
+from profiler import SORT_KEYS, profile_call
+from question_bank import QuestionBank
+from quiz_state import AnswerSheet, Quiz, QuizStore, SessionMemory
+from scheduler import PRIORITY_BATCH, PRIORITY_INSTRUCTOR, PRIORITY_STUDENT, QueueFull, RequestScheduler
+from singleflight import SingleFlight
+from syllabus import SyllabusRun, parse_syllabus, syllabus_id
+import tracing
 
-GOOGLE_API_KEY = st.secrets["api_keys"]["google_api_key"]
-
-if GOOGLE_API_KEY:
-    genai.configure(api_key=GOOGLE_API_KEY)
-
-# Enhanced system prompt for better API integration
-SYSTEM_PROMPT = """You are a highly qualified MCQ generator for an engineering college lecture. Your task is to create exactly 3 multiple-choice questions (MCQs) based strictly on the list of topics provided from a lecture. These MCQs serve as exit ticket questions to assess students' understanding of core concepts.
-
-Instructions:
-- Only use concepts that were explicitly covered in the given topic list
-- Do not include or infer content beyond the provided topics
-- Focus on the most essential technical points, definitions, principles, or equations
-- Each question must have one correct answer and three plausible distractors
-- The correct answer must be factually accurate
-- Write short, clear, and professional questions and answer choices
-- Use standard engineering terminology and units
-- Keep all technical details precise and concise
-
-Output Format (JSON):
-{
-  "questions": [
-    {
-      "question": "Question text here?",
-      "options": {
-        "A": "Option A text",
-        "B": "Option B text", 
-        "C": "Option C text",
-        "D": "Option D text"
-      },
-      "correct_answer": "C",
-      "explanation": "Brief explanation of why this answer is correct"
-    }
-  ]
+def load_google_api_key():
+    """Read the API key from Streamlit secrets, falling back to the environment"""
+    try:
+        return st.secrets["api_keys"]["google_api_key"]
+    except Exception:
+        return config.GOOGLE_API_KEY
+
+GOOGLE_API_KEY = load_google_api_key() if config.LLM_BACKEND == 'gemini' else None
+
+def minify_css(css):
+    """Drop comments and layout whitespace so each full run sends fewer bytes"""
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    return re.sub(r"\s*([{};:,>])\s*", r"\1", css).strip()
+
+# Custom CSS for professional, minimal UI, built once per process
+APP_CSS = minify_css("""
+<style>
+/* Aggressive light theme override for all buttons and inputs */
+body, .stApp, .main .block-container {
+    background-color: #F7FAFC !important;
+}
+/* Card/form backgrounds */
+.stForm, .stExpander, .stMetric {
+    background-color: #FFFFFF !important;
+    border-radius: 12px !important;
+    box-shadow: 0 2px 12px rgba(0,0,0,0.06) !important;
+    border: 1px solid #E2E8F0 !important;
+}
+/* Text colors */
+.stMarkdown, .stText, p, div, span, label, .stCaption, .stMetricLabel {
+    color: #22223B !important;
+}
+h1, h2, h3, h4, h5, h6 {
+    color: #22223B !important;
+    font-weight: 600;
+}
+/* All buttons: primary, secondary, etc. */
+.stButton > button, .stForm button, button, input[type="button"], input[type="submit"] {
+    background-color: #43A363 !important;
+    color: #FFFFFF !important;
+    border: none !important;
+    border-radius: 8px !important;
+    padding: 0.75rem 1.5rem !important;
+    font-weight: 600 !important;
+    font-size: 1rem !important;
+    transition: all 0.2s cubic-bezier(.4,0,.2,1) !important;
+    box-shadow: 0 2px 8px rgba(67, 163, 99, 0.10) !important;
+    outline: none !important;
+}
+.stButton > button:hover, .stForm button:hover, button:hover, input[type="button"]:hover, input[type="submit"]:hover {
+    background-color: #388752 !important;
+}
+.stButton > button:active, .stForm button:active, button:active, input[type="button"]:active, input[type="submit"]:active {
+    background-color: #2E6B4B !important;
+}
+/* Backward/secondary buttons (by key) - visually distinct */
+button#back_btn {
+    background-color: #FFFFFF !important;
+    color: #43A363 !important;
+    border: 2px solid #43A363 !important;
+    box-shadow: 0 2px 8px rgba(67, 163, 99, 0.05) !important;
+}
+button#back_btn:hover, button#back_btn:focus {
+    background-color: #E9F7F0 !important;
+    color: #388752 !important;
+    border-color: #388752 !important;
+}
+/* Text inputs and textareas */
+.stTextInput input, .stTextArea textarea, input[type="text"], textarea {
+    background-color: #FFFFFF !important;
+    color: #22223B !important;
+    border: 2px solid #E2E8F0 !important;
+    border-radius: 8px !important;
+    padding: 0.75rem !important;
+    caret-color: #22223B !important;
+}
+.stTextInput input:focus, .stTextArea textarea:focus, input[type="text"]:focus, textarea:focus {
+    border-color: #43A363 !important;
+    box-shadow: 0 0 0 3px rgba(67, 163, 99, 0.10) !important;
+}
+/* Radio/toggle buttons - green accent and background */
+.stRadio > div {
+    background-color: #FFFFFF !important;
+    border-radius: 10px !important;
+    padding: 1.25rem 2.5rem 1.25rem 1.5rem !important;
+    border: 1.5px solid #E2E8F0 !important;
+    margin-bottom: 1.1rem !important;
+    min-width: 520px !important;
+    max-width: 900px !important;
+    width: 100% !important;
+    box-shadow: 0 2px 8px rgba(0,0,0,0.04) !important;
+    display: flex !important;
+    flex-direction: column !important;
+}
+.stRadio label {
+    color: #22223B !important;
+    font-weight: 500 !important;
+    font-size: 1.08rem !important;
+    width: 100%;
+}
+.stRadio input[type="radio"] {
+    accent-color: #B8EFC6 !important; /* light green */
+    background-color: #E9F7F0 !important; /* very light green */
+}
+.stRadio input[type="radio"]:checked {
+    accent-color: #43A363 !important; /* green when checked */
+    background-color: #DFF3E8 !important;
+}
+/* Progress bar */
+.stProgress > div > div {
+    background-color: #43A363 !important;
+}
+/* Success/Error/Info messages */
+.stSuccess {
+    background-color: #DCFCE7 !important;
+    color: #166534 !important;
+    border-left: 4px solid #43A363 !important;
+    padding: 1rem !important;
+    border-radius: 8px !important;
+}
+.stError {
+    background-color: #FEE2E2 !important;
+    color: #B91C1C !important;
+    border-left: 4px solid #EF4444 !important;
+    padding: 1rem !important;
+    border-radius: 8px !important;
+}
+.stInfo {
+    background-color: #DBEAFE !important;
+    color: #1E40AF !important;
+    border-left: 4px solid #2563EB !important;
+    padding: 1rem !important;
+    border-radius: 8px !important;
+}
+/* Expander header */
+.stExpanderHeader {
+    color: #22223B !important;
+    background-color: #F1F5F9 !important;
+    border-radius: 8px 8px 0 0 !important;
+}
+/* Links */
+a {
+    color: #43A363 !important;
+    text-decoration: underline !important;
 }
+/* Metrics */
+.stMetricValue {
+    color: #43A363 !important;
+    font-weight: bold !important;
+}
+/* Remove default Streamlit styling */
+* { color: inherit !important; }
+.stMarkdown p, .stMarkdown div, .stMarkdown span {
+    color: #22223B !important;
+}
+</style>
+""")
 
-Requirements:
-- Return ONLY valid JSON format
-- Ensure all questions are relevant to the provided topics
-- Make explanations educational and clear
-- Use engineering-appropriate language and precision"""
 
-def generate_mcqs(lecture_topics, ai_instructions):
-    """Generate MCQs using Google AI Studio"""
-    try:
-        if not GOOGLE_API_KEY:
-            st.error("Google API key not found. Please set GOOGLE_API_KEY in your environment variables.")
-            return None
-        
-        # Create the prompt with system prompt
-        prompt = f"""{SYSTEM_PROMPT}
+@st.cache_resource
+def get_backend_registry():
+    """Process-wide registry so backends and their connections outlive reruns"""
+    registry = BackendRegistry(config.BACKEND_HEALTH_PATH, config.BACKEND_HEALTH_HEARTBEAT_SECONDS)
+    if config.WARMUP_ON_START:
+        registry.warm_up(config.LLM_BACKEND, api_key=GOOGLE_API_KEY)
+    return registry
 
-Lecture Topics:
-{lecture_topics}
+def get_llm_backend():
+    """LLM backend selected by MCQ_LLM_BACKEND"""
+    return get_backend_registry().get(config.LLM_BACKEND, api_key=GOOGLE_API_KEY)
 
-Additional Instructions:
-{ai_instructions if ai_instructions.strip() else "No additional instructions provided."}
+@st.cache_resource
+def get_scheduler():
+    """Process-wide queue that keeps LLM calls within the API quota"""
+    return RequestScheduler(
+        requests_per_minute=config.SCHEDULER_REQUESTS_PER_MINUTE,
+        tokens_per_minute=config.SCHEDULER_TOKENS_PER_MINUTE,
+        max_queue=config.SCHEDULER_MAX_QUEUE,
+    )
 
-Please generate exactly 3 MCQs based on the above topics and instructions.
-Return ONLY the JSON format as specified above."""
-        
-        # Generate response using Gemini
-        model = genai.GenerativeModel('gemini-2.5-flash')
-        response = model.generate_content(prompt)
-        
-        # Parse JSON response
-        try:
-            # Extract JSON from response
-            response_text = response.text
-            # Find JSON content (handle cases where response might have extra text)
-            start_idx = response_text.find('{')
-            end_idx = response_text.rfind('}') + 1
-            json_str = response_text[start_idx:end_idx]
-            
-            mcqs = json.loads(json_str)
-            return mcqs
-        except json.JSONDecodeError as e:
-            st.error(f"Error parsing AI response: {e}")
-            st.text("Raw response:")
-            st.text(response.text)
-            return None
-            
+def session_priority():
+    """Instructors (?key=<MCQ_INSTRUCTOR_KEY>) are scheduled ahead of students"""
+    if config.INSTRUCTOR_KEY and st.query_params.get("key") == config.INSTRUCTOR_KEY:
+        return PRIORITY_INSTRUCTOR
+    return PRIORITY_STUDENT
+
+@st.cache_resource
+def get_hedged_backend():
+    """Process-wide wrapper that learns call latencies and hedges slow calls"""
+    scheduler = get_scheduler()
+    return HedgedBackend(
+        get_llm_backend(),
+        window_size=config.LATENCY_WINDOW_SIZE,
+        min_samples=config.LATENCY_MIN_SAMPLES,
+        max_hedge_ratio=config.HEDGE_MAX_RATIO,
+        timeout_multiplier=config.TIMEOUT_MULTIPLIER,
+        min_timeout=config.LLM_MIN_TIMEOUT_SECONDS,
+        max_timeout=config.LLM_MAX_TIMEOUT_SECONDS,
+        # A hedge takes its own quota, and only while nobody is queued
+        allow_hedge=scheduler.hedge_gate(config.SCHEDULER_TOKENS_PER_QUESTION),
+    )
+
+def get_scheduled_backend(on_wait=None):
+    """The configured backend, with every call queued at this session's priority"""
+    backend = get_hedged_backend() if config.HEDGING_ENABLED else get_llm_backend()
+    return get_scheduler().wrap(
+        backend, session_priority(), config.SCHEDULER_TOKENS_PER_QUESTION,
+        config.SCHEDULER_MAX_RETRIES, on_wait,
+    )
+
+def queue_message(position, eta):
+    return f"⏳ You are number {position} in the queue. Estimated wait: about {max(1, round(eta))}s."
+
+def show_queue_full(error):
+    st.warning(
+        f"⏳ The question generator is busy ({error.queued} requests waiting). "
+        f"Please try again in about {max(1, round(error.retry_after))}s."
+    )
+
+@st.cache_resource
+def get_job_executor():
+    """Shared worker pool that runs generation off the script threads"""
+    return JobExecutor(config.GENERATION_WORKERS)
+
+@st.cache_resource
+def get_syllabus_executor():
+    """Process-wide pool for syllabus lectures, kept apart so it can't starve quiz jobs"""
+    return JobExecutor(config.SYLLABUS_WORKERS)
+
+@st.cache_resource
+def get_prefetch_executor():
+    """Process-wide pool for prefetched quizzes, kept apart so it can't starve quiz jobs"""
+    return JobExecutor(config.PREFETCH_WORKERS)
+
+@st.cache_resource
+def get_prefetcher():
+    """Process-wide limits and hit/waste counters for prefetched quizzes"""
+    return Prefetcher(config.PREFETCH_TTL_SECONDS, config.PREFETCH_MAX_BYTES, config.PREFETCH_MAX_PENDING)
+
+@st.cache_resource
+def get_attempt_recorder():
+    """Process-wide write-behind recorder of quiz attempts"""
+    return AttemptRecorder(
+        SQLiteAttemptBackend(config.ATTEMPTS_DB_PATH),
+        flush_seconds=config.ATTEMPTS_FLUSH_SECONDS,
+        batch_size=config.ATTEMPTS_BATCH_SIZE,
+        max_queue=config.ATTEMPTS_MAX_QUEUE,
+    )
+
+@st.cache_resource
+def get_published_quizzes():
+    """Process-wide read-through cache of quizzes published to a class"""
+    return PublishedQuizzes(config.PUBLISHED_DB_PATH, config.PUBLISHED_MEMORY_ENTRIES, get_quiz_store())
+
+@st.cache_resource
+def get_mcq_cache():
+    """Process-wide MCQ cache shared by every session"""
+    return MCQCache(
+        memory_max_entries=config.CACHE_MEMORY_MAX_ENTRIES,
+        db_path=config.CACHE_DB_PATH,
+        ttl_seconds=config.CACHE_TTL_SECONDS,
+        disk_max_entries=config.CACHE_DISK_MAX_ENTRIES,
+    )
+
+@st.cache_resource
+def get_output_metrics():
+    """Process-wide parse-failure and repair counters"""
+    return OutputMetrics()
+
+@st.cache_resource
+def get_dedup_index():
+    """Process-wide window of recently generated questions, or None when the window is 0"""
+    if not config.DEDUP_WINDOW:
+        return None
+    return NearDuplicateIndex(config.DEDUP_WINDOW, config.DEDUP_THRESHOLD)
+
+@st.cache_resource
+def get_question_bank():
+    """Process-wide bank of previously generated questions"""
+    return QuestionBank(config.BANK_DB_PATH, min_overlap=config.BANK_MIN_TOPIC_OVERLAP)
+
+@st.cache_resource
+def get_single_flight():
+    """Process-wide coalescing of identical in-flight requests"""
+    return SingleFlight()
+
+def generation_resources():
+    """The process-wide helpers a generation uses, resolved on the script thread
+
+    Generation runs on worker threads, where st.cache_resource getters log a
+    missing ScriptRunContext warning on every call, so jobs are handed these.
+    """
+    return GenerationResources(
+        cache=get_mcq_cache() if config.CACHE_ENABLED else None,
+        bank=get_question_bank() if config.BANK_ENABLED else None,
+        metrics=get_output_metrics(),
+        registry=get_backend_registry(),
+        single_flight=get_single_flight(),
+        dedup_index=get_dedup_index() if config.DEDUP_ENABLED else None,
+    )
+
+@st.cache_resource
+def get_tracer():
+    """Install the process-wide tracer when tracing is enabled"""
+    if not config.TRACE_ENABLED:
+        return None
+    tracer = tracing.Tracer(config.TRACE_PATH, config.TRACE_MAX_BYTES, config.TRACE_BACKUPS)
+    tracing.enable(tracer)
+    if config.METRICS_PORT:
+        tracing.serve_metrics(tracer, port=config.METRICS_PORT)
+    return tracer
+
+@st.cache_resource
+def get_quiz_store():
+    """Process-wide store of finished quizzes, one copy per distinct quiz"""
+    return QuizStore()
+
+@st.cache_resource
+def get_session_memory():
+    """Latest session-state size reported by each session"""
+    return SessionMemory()
+
+def session_memory_stats():
+    """Record this session's state size and return it with the totals for live sessions"""
+    memory = get_session_memory()
+    ctx = get_script_run_ctx()
+    own = memory.record(ctx.session_id, st.session_state.to_dict()) if ctx is not None else 0
+    stats = memory.stats(runtime.get_instance().is_active_session if runtime.exists() else None)
+    return {"this_session_bytes": own, **stats}
+
+def generate_mcqs(lecture_topics, ai_instructions, num_questions=config.DEFAULT_QUESTIONS_COUNT):
+    """Generate MCQs on the calling thread, showing any error with st.error"""
+    try:
+        backend = get_scheduled_backend()
+        with tracing.request(), tracing.span("generate", questions=num_questions):
+            return generate_quiz(lecture_topics, ai_instructions, num_questions, backend,
+                                 generation_resources())
     except Exception as e:
-        st.error(f"Error generating MCQs: {e}")
+        if config.FALLBACK_ENABLED:
+            mcqs = fallback_mcqs(lecture_topics, num_questions)
+            if mcqs['questions']:
+                st.warning(fallback_notice(fallback_reason(e)))
+                return mcqs
+        show_generation_error(e)
         return None
 
+def fallback_mcqs(lecture_topics, num_questions):
+    """Rule-based MCQs from the topics text, with bank option texts as extra distractors"""
+    bank = get_question_bank() if config.BANK_ENABLED else None
+    with tracing.span("fallback", questions=num_questions):
+        vocabulary = bank.option_texts(lecture_topics) if bank is not None else []
+        return generate_fallback_mcqs(lecture_topics, num_questions, vocabulary)
+
+def fallback_reason(error):
+    """Why the LLM quiz wasn't used, for the fallback notice"""
+    if isinstance(error, QueueFull):
+        return "is busy"
+    if isinstance(error, TimeoutError):
+        return "took too long"
+    return "is unavailable"
+
+def fallback_notice(reason):
+    return (f"⚡ Quick practice quiz built from your notes without AI, because the AI generator {reason}. "
+            "Generate a new quiz later for AI-written questions.")
+
+def show_generation_error(error):
+    """Explain a failed generation to the user"""
+    if isinstance(error, QueueFull):
+        show_queue_full(error)
+    elif isinstance(error, json.JSONDecodeError):
+        st.error(f"Error parsing AI response: {error}")
+        st.text("Raw response:")
+        st.text(error.doc)
+    elif error is not None:
+        st.error(f"Error generating MCQs: {error}")
+    else:
+        st.error("Failed to generate MCQs. Please try again.")
+
 def main():
+    if not profiling_enabled():
+        render_app()
+        return
+    profile_call(render_app, "full run", record_profile)
+    show_profiler_panel()
+
+def render_app():
     st.set_page_config(
         page_title="LevelUp",
         page_icon="🎓",
         layout="wide"
     )
     
+    # Builds the backend registry (and starts warm-up) on the first run in this process
+    get_backend_registry()
+    get_tracer()
+    
     st.title("🎓 LevelUp")
     st.markdown("Generate multiple-choice questions from your lecture topics using AI")
     
-    # Inject custom CSS for professional, minimal UI
-    st.markdown(
-        """
-        <style>
-        /* Aggressive light theme override for all buttons and inputs */
-        body, .stApp, .main .block-container {
-            background-color: #F7FAFC !important;
-        }
-        /* Card/form backgrounds */
-        .stForm, .stExpander, .stMetric {
-            background-color: #FFFFFF !important;
-            border-radius: 12px !important;
-            box-shadow: 0 2px 12px rgba(0,0,0,0.06) !important;
-            border: 1px solid #E2E8F0 !important;
-        }
-        /* Text colors */
-        .stMarkdown, .stText, p, div, span, label, .stCaption, .stMetricLabel {
-            color: #22223B !important;
-        }
-        h1, h2, h3, h4, h5, h6 {
-            color: #22223B !important;
-            font-weight: 600;
-        }
-        /* All buttons: primary, secondary, etc. */
-        .stButton > button, .stForm button, button, input[type="button"], input[type="submit"] {
-            background-color: #43A363 !important;
-            color: #FFFFFF !important;
-            border: none !important;
-            border-radius: 8px !important;
-            padding: 0.75rem 1.5rem !important;
-            font-weight: 600 !important;
-            font-size: 1rem !important;
-            transition: all 0.2s cubic-bezier(.4,0,.2,1) !important;
-            box-shadow: 0 2px 8px rgba(67, 163, 99, 0.10) !important;
-            outline: none !important;
-        }
-        .stButton > button:hover, .stForm button:hover, button:hover, input[type="button"]:hover, input[type="submit"]:hover {
-            background-color: #388752 !important;
-        }
-        .stButton > button:active, .stForm button:active, button:active, input[type="button"]:active, input[type="submit"]:active {
-            background-color: #2E6B4B !important;
-        }
-        /* Backward/secondary buttons (by key) - visually distinct */
-        button#back_btn {
-            background-color: #FFFFFF !important;
-            color: #43A363 !important;
-            border: 2px solid #43A363 !important;
-            box-shadow: 0 2px 8px rgba(67, 163, 99, 0.05) !important;
-        }
-        button#back_btn:hover, button#back_btn:focus {
-            background-color: #E9F7F0 !important;
-            color: #388752 !important;
-            border-color: #388752 !important;
-        }
-        /* Text inputs and textareas */
-        .stTextInput input, .stTextArea textarea, input[type="text"], textarea {
-            background-color: #FFFFFF !important;
-            color: #22223B !important;
-            border: 2px solid #E2E8F0 !important;
-            border-radius: 8px !important;
-            padding: 0.75rem !important;
-            caret-color: #22223B !important;
-        }
-        .stTextInput input:focus, .stTextArea textarea:focus, input[type="text"]:focus, textarea:focus {
-            border-color: #43A363 !important;
-            box-shadow: 0 0 0 3px rgba(67, 163, 99, 0.10) !important;
-        }
-        /* Radio/toggle buttons - green accent and background */
-        .stRadio > div {
-            background-color: #FFFFFF !important;
-            border-radius: 10px !important;
-            padding: 1.25rem 2.5rem 1.25rem 1.5rem !important;
-            border: 1.5px solid #E2E8F0 !important;
-            margin-bottom: 1.1rem !important;
-            min-width: 520px !important;
-            max-width: 900px !important;
-            width: 100% !important;
-            box-shadow: 0 2px 8px rgba(0,0,0,0.04) !important;
-            display: flex !important;
-            flex-direction: column !important;
-        }
-        .stRadio label {
-            color: #22223B !important;
-            font-weight: 500 !important;
-            font-size: 1.08rem !important;
-            width: 100%;
-        }
-        .stRadio input[type="radio"] {
-            accent-color: #B8EFC6 !important; /* light green */
-            background-color: #E9F7F0 !important; /* very light green */
-        }
-        .stRadio input[type="radio"]:checked {
-            accent-color: #43A363 !important; /* green when checked */
-            background-color: #DFF3E8 !important;
-        }
-        /* Progress bar */
-        .stProgress > div > div {
-            background-color: #43A363 !important;
-        }
-        /* Success/Error/Info messages */
-        .stSuccess {
-            background-color: #DCFCE7 !important;
-            color: #166534 !important;
-            border-left: 4px solid #43A363 !important;
-            padding: 1rem !important;
-            border-radius: 8px !important;
-        }
-        .stError {
-            background-color: #FEE2E2 !important;
-            color: #B91C1C !important;
-            border-left: 4px solid #EF4444 !important;
-            padding: 1rem !important;
-            border-radius: 8px !important;
-        }
-        .stInfo {
-            background-color: #DBEAFE !important;
-            color: #1E40AF !important;
-            border-left: 4px solid #2563EB !important;
-            padding: 1rem !important;
-            border-radius: 8px !important;
-        }
-        /* Expander header */
-        .stExpanderHeader {
-            color: #22223B !important;
-            background-color: #F1F5F9 !important;
-            border-radius: 8px 8px 0 0 !important;
-        }
-        /* Links */
-        a {
-            color: #43A363 !important;
-            text-decoration: underline !important;
-        }
-        /* Metrics */
-        .stMetricValue {
-            color: #43A363 !important;
-            font-weight: bold !important;
-        }
-        /* Remove default Streamlit styling */
-        * { color: inherit !important; }
-        .stMarkdown p, .stMarkdown div, .stMarkdown span {
-            color: #22223B !important;
-        }
-        </style>
-        """,
-        unsafe_allow_html=True
-    )
+    # Full runs only: fragment reruns keep the stylesheet already on the page
+    st.markdown(APP_CSS, unsafe_allow_html=True)
     
     # Initialize session state
     if 'mcqs' not in st.session_state:
         st.session_state.mcqs = None
-    if 'current_question' not in st.session_state:
-        st.session_state.current_question = 0
-    if 'user_answers' not in st.session_state:
-        st.session_state.user_answers = {}
-    if 'quiz_completed' not in st.session_state:
-        st.session_state.quiz_completed = False
-    if 'show_feedback' not in st.session_state:
-        st.session_state.show_feedback = False
-    if 'last_user_answer' not in st.session_state:
-        st.session_state.last_user_answer = None
+    if 'answers' not in st.session_state:
+        st.session_state.answers = AnswerSheet()
+    if 'mcq_stream' not in st.session_state:
+        st.session_state.mcq_stream = None
+    if 'generation_job' not in st.session_state:
+        st.session_state.generation_job = None
+    if 'generation_error' not in st.session_state:
+        st.session_state.generation_error = None
+    if 'syllabus_run' not in st.session_state:
+        st.session_state.syllabus_run = None
+    if 'quiz_request' not in st.session_state:
+        st.session_state.quiz_request = None
+    if 'practice_sets' not in st.session_state:
+        # Question lists of the practice sets served for quiz_request so far
+        st.session_state.practice_sets = []
+    if 'fallback_reason' not in st.session_state:
+        st.session_state.fallback_reason = None
+    if 'prefetch' not in st.session_state:
+        st.session_state.prefetch = None
+    elif not get_prefetcher().usable(st.session_state.prefetch):
+        # Expired or over the memory cap: let the questions be freed
+        st.session_state.prefetch = None
+    if config.ATTEMPTS_ENABLED and st.session_state.mcqs is None and st.session_state.generation_job is None:
+        attempt_id = st.query_params.get("attempt")
+        if attempt_id and not resume_attempt(attempt_id):
+            del st.query_params["attempt"]
+    if config.PUBLISH_ENABLED and st.session_state.mcqs is None and st.session_state.generation_job is None:
+        code = st.query_params.get("quiz")
+        if code and not open_published_quiz(code):
+            st.warning(f"No published quiz has the code {code}.")
+            del st.query_params["quiz"]
     
+    if config.SHOW_DIAGNOSTICS:
+        show_diagnostics_sidebar()
+
     # Main application flow
     if st.session_state.mcqs is None:
-        show_input_page()
-    elif not st.session_state.quiz_completed:
-        show_quiz_page()
+        with tracing.span("render", page="input"):
+            show_input_page()
+    elif not st.session_state.answers.completed:
+        with tracing.span("render", page="quiz"):
+            show_quiz_page()
     else:
-        show_results_page()
+        with tracing.span("render", page="results"):
+            show_results_page()
+
+def show_diagnostics_sidebar():
+    """Display cache counters, output quality and backend health for operators"""
+    with st.sidebar.expander("⚙️ Diagnostics"):
+        st.caption("LLM backend")
+        st.json(get_backend_registry().health())
+        st.caption("Generation workers")
+        st.json(get_job_executor().stats())
+        st.caption("Request scheduler")
+        st.json(get_scheduler().stats())
+        if config.HEDGING_ENABLED:
+            st.caption("Latency and hedging")
+            st.json(get_hedged_backend().stats())
+        st.caption("Request coalescing")
+        st.json(get_single_flight().stats())
+        if config.PREFETCH_ENABLED:
+            st.caption("Prefetched quizzes")
+            st.json(get_prefetcher().stats())
+        if config.ATTEMPTS_ENABLED:
+            recorder = get_attempt_recorder()
+            st.caption("Attempt store")
+            st.json({**recorder.stats(), **recorder.backend.stats()})
+        if config.PUBLISH_ENABLED:
+            st.caption("Published quizzes")
+            st.json(get_published_quizzes().stats())
+        if config.TRACE_ENABLED:
+            st.caption("Stage timings")
+            st.json(get_tracer().stats())
+        st.caption("Session memory")
+        st.json(session_memory_stats())
+        st.caption("Shared quizzes")
+        st.json(get_quiz_store().stats())
+        st.caption("Output parsing and repair")
+        st.json(get_output_metrics().stats())
+        if config.DEDUP_ENABLED and config.DEDUP_WINDOW:
+            st.caption("Near-duplicate window")
+            st.json(get_dedup_index().stats())
+        if config.BANK_ENABLED:
+            st.caption("Question bank")
+            st.json(get_question_bank().stats())
+        if config.CACHE_ENABLED:
+            stats = get_mcq_cache().stats()
+            st.caption("MCQ cache")
+            st.json(stats)
+        else:
+            st.caption("MCQ cache disabled")
+
+def profiling_enabled():
+    """Profile this session's reruns (config for everyone, ?profile=1 for one session)
+
+    With MCQ_INSTRUCTOR_KEY set, only instructors may use ?profile=1.
+    """
+    if config.PROFILE_ENABLED:
+        return True
+    if not config.PROFILE_QUERY_PARAM_ENABLED or st.query_params.get("profile") != "1":
+        return False
+    return not config.INSTRUCTOR_KEY or session_priority() == PRIORITY_INSTRUCTOR
+
+def record_profile(profile):
+    if 'profiles' not in st.session_state:
+        st.session_state.profiles = deque(maxlen=config.PROFILE_HISTORY)
+    st.session_state.profiles.append(profile)
+
+def profiled(label):
+    """Profile a fragment's own reruns when profiling is on"""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not profiling_enabled():
+                return fn(*args, **kwargs)
+            return profile_call(lambda: fn(*args, **kwargs), label, record_profile)
+        return wrapper
+    return decorate
+
+def show_profiler_panel():
+    """Top functions of a recent rerun, with the raw profile as a download"""
+    profiles = list(st.session_state.get('profiles', ()))
+    with st.sidebar.expander("⏱️ Profiler", expanded=True):
+        if not profiles:
+            st.caption("No profiled reruns yet")
+            return
+        # Newest first; fragment reruns appear here on the next full run
+        choice = st.selectbox(
+            "Rerun",
+            range(len(profiles) - 1, -1, -1),
+            format_func=lambda i: (
+                f"{time.strftime('%H:%M:%S', time.localtime(profiles[i].started_at))} "
+                f"{profiles[i].label} ({profiles[i].seconds * 1000:.0f} ms)"
+            ),
+            key="profile_choice",
+        )
+        sort = st.radio("Sort by", list(SORT_KEYS), horizontal=True, key="profile_sort")
+        profile = profiles[choice]
+        st.dataframe(profile.top(config.PROFILE_TOP_N, sort), hide_index=True)
+        st.download_button(
+            "Download .prof",
+            data=profile.dump(),
+            file_name=f"rerun-{time.strftime('%Y%m%d-%H%M%S', time.localtime(profile.started_at))}.prof",
+            mime="application/octet-stream",
+        )
 
 def show_input_page():
     """Display the input page for lecture topics and AI instructions"""
     st.header("📝 Enter Lecture Information")
     
+    queued, eta = get_scheduler().status()
+    if queued:
+        st.info(f"⏳ {queued} requests are waiting for the question generator "
+                f"(about {max(1, round(eta))}s).")
+    
+    if st.session_state.generation_job is not None:
+        show_generation_progress()
+        if st.button("Cancel", key="cancel_generation"):
+            # The job still finishes in the background and fills the cache and bank
+            st.session_state.generation_job = None
+            st.rerun()
+        return
+    
+    if st.session_state.generation_error is not None:
+        show_generation_error(st.session_state.generation_error)
+        st.session_state.generation_error = None
+    
     with st.form("mcq_form"):
         lecture_topics = st.text_area(
             "📚 Lecture Topics & Summary",
@@ -288,13 +620,12 @@ def show_input_page():
         )
         st.markdown("---")
         st.subheader("Number of Questions")
-        num_options = [2, 3, 4, 5]
-        st.selectbox(
-            "Number of Questions (locked to 3)",
+        num_options = list(range(1, config.MAX_QUESTIONS_COUNT + 1))
+        num_questions = st.selectbox(
+            "Number of Questions",
             num_options,
-            index=1,
-            disabled=True,
-            help="Currently only 3 questions are supported."
+            index=num_options.index(config.DEFAULT_QUESTIONS_COUNT),
+            help=f"Up to {config.MAX_QUESTIONS_COUNT} questions per quiz."
         )
         
         
@@ -305,37 +636,415 @@ def show_input_page():
                 st.error("Please enter lecture topics to generate MCQs.")
                 return
             
-            with st.spinner("🤖 Generating MCQs with AI..."):
-                mcqs = generate_mcqs(lecture_topics, ai_instructions)
-                
-                if mcqs and 'questions' in mcqs:
-                    st.session_state.mcqs = mcqs['questions']
-                    st.session_state.current_question = 0
-                    st.session_state.user_answers = {}
-                    st.session_state.quiz_completed = False
-                    st.session_state.show_feedback = False
-                    st.session_state.last_user_answer = None
-                    st.rerun()
-                else:
-                    st.error("Failed to generate MCQs. Please try again.")
+            start_generation_job(lecture_topics, ai_instructions, num_questions)
+            st.rerun()
+    
+    show_syllabus_section()
+
+def show_syllabus_section():
+    """Exit tickets for every lecture of an uploaded syllabus"""
+    if config.INSTRUCTOR_KEY and session_priority() != PRIORITY_INSTRUCTOR:
+        return
+    run = st.session_state.syllabus_run
+    with st.expander("📅 Generate for a whole syllabus", expanded=run is not None):
+        if run is not None:
+            show_clamped_counts(run.lectures)
+        if run is not None and not run.done:
+            show_syllabus_progress()
+            return
+        if run is not None:
+            show_syllabus_results(run)
+            return
+        
+        upload = st.file_uploader(
+            "Syllabus (CSV or JSON)",
+            type=["csv", "json"],
+            help="One lecture per row with `lecture` and `topics` columns, "
+                 "plus optional `instructions` and `n_questions`"
+        )
+        per_lecture = st.selectbox(
+            "Questions per lecture (unless the syllabus sets n_questions)",
+            list(range(1, config.MAX_QUESTIONS_COUNT + 1)),
+            index=config.DEFAULT_QUESTIONS_COUNT - 1,
+            key="syllabus_questions",
+        )
+        if st.button("🚀 Generate for every lecture", disabled=upload is None, key="syllabus_start"):
+            try:
+                lectures = parse_syllabus(upload.name, upload.getvalue(), per_lecture,
+                                          config.MAX_QUESTIONS_COUNT)
+            except (ValueError, TypeError) as e:
+                st.error(f"Could not read the syllabus: {e}")
+                return
+            start_syllabus_run(lectures)
+            st.rerun()
+
+def show_clamped_counts(lectures):
+    """Point out lectures whose n_questions was outside 1..MAX_QUESTIONS_COUNT"""
+    clamped = [lecture for lecture in lectures if "requested_questions" in lecture]
+    if not clamped:
+        return
+    listed = ", ".join(
+        f"{lecture['lecture']} ({lecture['requested_questions']} → {lecture['n_questions']})"
+        for lecture in clamped[:5]
+    )
+    more = f" and {len(clamped) - 5} more" if len(clamped) > 5 else ""
+    st.caption(f"Question counts were clamped to 1–{config.MAX_QUESTIONS_COUNT}: {listed}{more}.")
+
+def start_syllabus_run(lectures):
+    """Generate every unfinished lecture in the background at batch priority"""
+    llm = get_hedged_backend() if config.HEDGING_ENABLED else get_llm_backend()
+    # Interactive sessions keep priority over a syllabus; all share one quota
+    backend = get_scheduler().wrap(
+        llm, PRIORITY_BATCH, config.SCHEDULER_TOKENS_PER_QUESTION, config.SCHEDULER_MAX_RETRIES
+    )
+    # Lectures generate on worker threads, which must not call the cache_resource getters
+    resources = generation_resources()
+    
+    def generate(lecture):
+        with tracing.request():
+            return generate_quiz(
+                lecture['topics'], lecture['instructions'], lecture['n_questions'], backend, resources
+            )['questions']
+    
+    def start():
+        run = SyllabusRun(lectures, config.SYLLABUS_CHECKPOINT_DIR)
+        return run.start(generate, get_syllabus_executor())
+    
+    # Instructors uploading the same syllabus follow the same run
+    key = f"syllabus:{syllabus_id(lectures)}"
+    st.session_state.syllabus_run = get_single_flight().share(key, start, lambda run: run.done)
+
+@st.fragment(run_every=config.JOB_POLL_SECONDS)
+def show_syllabus_progress():
+    """Poll a running syllabus; the whole page reruns once it finishes"""
+    run = st.session_state.syllabus_run
+    if run is None or run.done:
+        st.rerun()
+    finished, failed, total, eta = run.progress()
+    text = f"📅 {finished} of {total} lectures done"
+    if failed:
+        text += f", {failed} failed"
+    text += f" · about {max(1, round(eta))}s left" if eta else " · estimating time left..."
+    st.progress(finished / total, text=text)
+    if run.resumed:
+        st.caption(f"{run.resumed} lectures were restored from the checkpoint")
+
+def show_syllabus_results(run):
+    """Download finished lectures and retry any that failed"""
+    finished, failed, total, _ = run.progress()
+    if failed:
+        first_error = next(iter(run.errors.values()))
+        st.warning(f"{finished} of {total} lectures are done; {failed} failed ({first_error}). "
+                   "Finished lectures are saved, so retrying only generates the rest.")
+    else:
+        st.success(f"✅ All {total} lectures are done.")
+    st.download_button(
+        "Download exit tickets (JSONL)",
+        data=run.export_jsonl(),
+        file_name=f"syllabus-{run.id}.jsonl",
+        mime="application/jsonl",
+    )
+    col1, col2 = st.columns(2)
+    with col1:
+        if failed and st.button("🔁 Retry failed lectures", key="syllabus_retry"):
+            start_syllabus_run(run.lectures)
+            st.rerun()
+    with col2:
+        if st.button("Close", key="syllabus_close"):
+            st.session_state.syllabus_run = None
+            st.rerun()
+
+def new_generation_job(lecture_topics, ai_instructions, num_questions, backend, executor, earlier_sets=()):
+    """Start generating a quiz on `executor`; returns its StreamingQuiz
+
+    `earlier_sets` are the question lists of the practice sets the session
+    already has. They are read when the job reaches the bank, so a set that
+    is still streaming counts with everything it has yielded by then.
+    """
+    job = StreamingQuiz(num_questions, backend)
+    # Runs on the script thread; the job itself only uses what is resolved here
+    resources = generation_resources()
+    if config.STREAMING_ENABLED:
+        questions = stream_mcqs(
+            lecture_topics, ai_instructions, backend, resources.cache, num_questions,
+            resources.metrics, resources.bank, resources.deduper(), earlier_sets,
+        )
+    else:
+        questions = whole_quiz_questions(lecture_topics, ai_instructions, num_questions, backend, resources,
+                                         earlier_sets)
+    job.start(questions, executor)
+    return job
+
+def start_generation_job(lecture_topics, ai_instructions, num_questions):
+    """Submit generation to the shared executor and keep the job handle in session state"""
+    request = (lecture_topics, ai_instructions, num_questions)
+    # The first quiz of a session has nothing to prefetch from, so it isn't counted as a miss
+    if config.PREFETCH_ENABLED and st.session_state.quiz_request is not None and take_prefetch(request):
+        return
+    st.session_state.quiz_request = (request, 1)
+    st.session_state.practice_sets = []
+    try:
+        backend = get_scheduled_backend()
+    except Exception as e:
+        if not serve_fallback_quiz(fallback_reason(e)):
+            st.session_state.generation_error = e
+        return
+    
+    def start():
+        return new_generation_job(lecture_topics, ai_instructions, num_questions, backend, get_job_executor())
+    
+    # Sessions asking for the same quiz while it is generating all follow the same job
+    key = request_key(lecture_topics, ai_instructions, backend.model_name, num_questions)
+    with tracing.request():
+        st.session_state.generation_job = get_single_flight().share(key, start, lambda job: job.done)
+    st.session_state.generation_started = time.monotonic()
+    st.session_state.generation_deadline = time.monotonic() + config.STREAM_QUESTION_TIMEOUT_SECONDS
+
+def take_prefetch(request):
+    """Follow the session's prefetched job if it answers `request`; returns whether it did"""
+    prefetch = st.session_state.prefetch
+    st.session_state.prefetch = None
+    job = get_prefetcher().claim(prefetch, request)
+    if job is None:
+        get_prefetcher().discard(prefetch, "replaced")
+        return False
+    st.session_state.generation_job = job
+    st.session_state.generation_started = time.monotonic()
+    st.session_state.generation_deadline = time.monotonic() + config.STREAM_QUESTION_TIMEOUT_SECONDS
+    st.session_state.quiz_request = (request, prefetch.practice_set)
+    return True
+
+def start_prefetch():
+    """Queue the next practice set of this session's quiz at batch priority"""
+    prefetcher = get_prefetcher()
+    prefetcher.discard(st.session_state.prefetch, "replaced")
+    st.session_state.prefetch = None
+    if st.session_state.quiz_request is None:
+        return
+    request, practice_set = st.session_state.quiz_request
+    lecture_topics, ai_instructions, num_questions = request
+    instructions = practice_instructions(ai_instructions, practice_set + 1)
+    # The bank would otherwise serve the same questions again
+    earlier_sets = list(st.session_state.practice_sets)
+    llm = get_hedged_backend() if config.HEDGING_ENABLED else get_llm_backend()
+    # Prefetches only use quota that interactive sessions leave free
+    backend = get_scheduler().wrap(
+        llm, PRIORITY_BATCH, config.SCHEDULER_TOKENS_PER_QUESTION, config.SCHEDULER_MAX_RETRIES
+    )
+    
+    def start():
+        return new_generation_job(lecture_topics, instructions, num_questions, backend, get_prefetch_executor(),
+                                  earlier_sets)
+    
+    # Sessions that took the same quiz share one prefetch of its next set
+    key = "prefetch:" + request_key(lecture_topics, instructions, backend.model_name, num_questions)
+    with tracing.request():
+        st.session_state.prefetch = prefetcher.start(
+            request, practice_set + 1,
+            lambda: get_single_flight().share(key, start, lambda job: job.done),
+        )
+
+@st.fragment(run_every=config.JOB_POLL_SECONDS)
+def show_generation_progress():
+    """Poll the session's generation job; opens the quiz once questions arrive"""
+    job = st.session_state.generation_job
+    if job is None:
+        return
+    
+    if job.questions:
+        get_backend_registry().mark_warm(job.backend)
+        # With streaming the list keeps growing in the background while the quiz is shown
+        st.session_state.mcqs = job.questions
+        st.session_state.mcq_stream = job if config.STREAMING_ENABLED else None
+        st.session_state.generation_job = None
+        st.session_state.answers = AnswerSheet()
+        st.session_state.fallback_reason = None
+        st.session_state.practice_sets.append(job.questions)
+        session_quiz()
+        if config.PREFETCH_ENABLED:
+            start_prefetch()
+        st.rerun()
+    
+    if job.done:
+        st.session_state.generation_job = None
+        if not serve_fallback_quiz(fallback_reason(job.error)):
+            st.session_state.generation_error = job.error
+        st.rerun()
+    
+    # Past the fallback deadline (queued or not), switch to a local quiz; the job keeps filling the cache
+    waited = time.monotonic() - st.session_state.generation_started
+    if waited > config.FALLBACK_AFTER_SECONDS and serve_fallback_quiz("took too long"):
+        st.rerun()
+    
+    position, eta = job.queue_status()
+    if position:
+        # Time spent queued for quota doesn't count against the timeout
+        st.session_state.generation_deadline = time.monotonic() + config.STREAM_QUESTION_TIMEOUT_SECONDS
+        st.info(queue_message(position, eta))
+        return
+    if not job.started:
+        st.session_state.generation_deadline = time.monotonic() + config.STREAM_QUESTION_TIMEOUT_SECONDS
+        st.info(f"⏳ Waiting for a free generator ({job.elapsed:.0f}s)...")
+        return
+    # Whole-response generation has its own adaptive deadline in the backend
+    if config.STREAMING_ENABLED and time.monotonic() > st.session_state.generation_deadline:
+        st.session_state.generation_job = None
+        if not serve_fallback_quiz("took too long"):
+            st.session_state.generation_error = TimeoutError("no questions arrived in time")
+        st.rerun()
+    
+    st.progress(
+        min(len(job.questions) / max(job.expected_count, 1), 1.0),
+        text=f"🤖 Generating {job.expected_count} MCQs with AI... {job.elapsed:.0f}s",
+    )
+
+def serve_fallback_quiz(reason):
+    """Open a rule-based quiz for the session's request; False if disabled or the notes are too short"""
+    if not config.FALLBACK_ENABLED or st.session_state.quiz_request is None:
+        return False
+    (lecture_topics, _, num_questions), _ = st.session_state.quiz_request
+    questions = fallback_mcqs(lecture_topics, num_questions)['questions']
+    if not questions:
+        return False
+    st.session_state.mcqs = questions
+    st.session_state.mcq_stream = None
+    st.session_state.generation_job = None
+    st.session_state.answers = AnswerSheet()
+    st.session_state.fallback_reason = reason
+    session_quiz()
+    return True
+
+def session_quiz():
+    """The session's questions; a finished stream is swapped for the shared quiz"""
+    stream = st.session_state.mcq_stream
+    if stream is not None and not stream.done:
+        return st.session_state.mcqs
+    if not isinstance(st.session_state.mcqs, Quiz):
+        st.session_state.mcqs = get_quiz_store().intern(st.session_state.mcqs)
+        st.session_state.mcq_stream = None
+        record_attempt_start()
+    return st.session_state.mcqs
+
+def record_attempt_start():
+    """Save the start of the session's attempt at its (shared) quiz"""
+    if config.ATTEMPTS_ENABLED:
+        ctx = get_script_run_ctx()
+        quiz = st.session_state.mcqs
+        get_attempt_recorder().start(
+            st.session_state.answers.attempt_id, quiz.id, quiz.questions, ctx.session_id if ctx else None
+        )
+
+def open_published_quiz(code):
+    """Start the quiz published under `code`; False if there is none"""
+    quiz = get_published_quizzes().get(code)
+    if quiz is None:
+        return False
+    st.session_state.mcqs = quiz
+    st.session_state.mcq_stream = None
+    st.session_state.answers = AnswerSheet()
+    st.session_state.fallback_reason = None
+    record_attempt_start()
+    return True
+
+def resume_attempt(attempt_id):
+    """Reopen a stored attempt in this session, e.g. after a reload; False if there is none"""
+    recorder = get_attempt_recorder()
+    # The attempt's latest answers may still be queued
+    recorder.flush(timeout=max(1.0, 4 * config.ATTEMPTS_FLUSH_SECONDS))
+    attempt = recorder.backend.load(attempt_id)
+    if attempt is None or not attempt["questions"]:
+        return False
+    quiz = get_quiz_store().intern(attempt["questions"])
+    answers = AnswerSheet(attempt_id)
+    for index, option in attempt["answers"].items():
+        if index < len(quiz):
+            answers[index] = option
+    answers.current = min(max(attempt["answers"], default=-1) + 1, len(quiz))
+    answers.completed = attempt["completed_at"] is not None
+    st.session_state.mcqs = quiz
+    st.session_state.mcq_stream = None
+    st.session_state.answers = answers
+    return True
+
+def leave_quiz():
+    """Stop reopening the current attempt or published quiz on reload"""
+    for param in ("attempt", "quiz"):
+        if param in st.query_params:
+            del st.query_params[param]
+
+def publish_link(code):
+    """The link students open for a published quiz
+
+    st.context.url only exists from streamlit 1.45; without it the link is
+    relative to the app's page.
+    """
+    url = getattr(st.context, "url", None)
+    return f"{url.split('?')[0] if url else ''}?quiz={code}"
+
+def show_publish_panel(quiz):
+    """Instructors publish the quiz under a short code the whole class can open"""
+    if not config.PUBLISH_ENABLED or not isinstance(quiz, Quiz) or st.session_state.fallback_reason is not None:
+        return
+    if config.INSTRUCTOR_KEY and session_priority() != PRIORITY_INSTRUCTOR:
+        return
+    with st.expander("📢 Publish to your class"):
+        published = st.session_state.get("published_code")
+        if published is None or published[0] != quiz.id:
+            st.caption("Students open the published quiz directly, with no AI request of their own.")
+            if not st.button("Publish this quiz", key="publish_btn"):
+                return
+            published = st.session_state.published_code = (quiz.id, get_published_quizzes().publish(quiz))
+        code = published[1]
+        st.markdown(f"Quiz code: **{code}**")
+        st.code(publish_link(code), language=None)
 
 def show_quiz_page():
     """Display the quiz interface"""
-    mcqs = st.session_state.mcqs
-    current_q = st.session_state.current_question
+    mcqs = session_quiz()
+    current_q = st.session_state.answers.current
+    stream = st.session_state.mcq_stream
+
+    if current_q >= len(mcqs) and stream is not None and not stream.done:
+        # The next question is still being generated
+        show_next_question_progress()
+        return
 
     if current_q >= len(mcqs):
-        st.session_state.quiz_completed = True
+        answers = st.session_state.answers
+        answers.completed = True
+        if config.ATTEMPTS_ENABLED:
+            get_attempt_recorder().finish(answers.attempt_id, answers.score(mcqs), len(mcqs))
         st.rerun()
         return
 
+    if config.ATTEMPTS_ENABLED and isinstance(mcqs, Quiz):
+        # A reload of this URL resumes the attempt
+        st.query_params["attempt"] = st.session_state.answers.attempt_id
+
+    if st.session_state.fallback_reason is not None:
+        st.info(fallback_notice(st.session_state.fallback_reason))
+    show_question_panel()
+    show_publish_panel(mcqs)
+
+@st.fragment
+@profiled("question panel")
+def show_question_panel():
+    """Question, answer form and feedback; answering reruns only this fragment"""
+    mcqs = session_quiz()
+    answers = st.session_state.answers
+    current_q = answers.current
+    stream = st.session_state.mcq_stream
+    total = stream.total if stream is not None else len(mcqs)
+
     # Progress bar
-    progress = (current_q + 1) / len(mcqs)
+    progress = (current_q + 1) / total
     st.progress(progress)
-    st.caption(f"Question {current_q + 1} of {len(mcqs)}")
+    st.caption(f"Question {current_q + 1} of {total}")
 
     question_data = mcqs[current_q]
     st.header(f"Question {current_q + 1}")
+    if question_data.get('near_duplicate'):
+        st.caption("🔁 Similar to a question generated recently for another quiz")
     st.markdown(f"**{question_data['question']}**")
 
     # Show answer options (always visible)
@@ -348,33 +1057,35 @@ def show_quiz_page():
         )
         submitted = st.form_submit_button("Submit Answer", type="primary")
         if submitted:
-            st.session_state.user_answers[current_q] = user_answer
-            st.session_state.last_user_answer = user_answer
-            st.session_state.show_feedback = True
-            st.rerun()
+            answers[current_q] = user_answer
+            answers.show_feedback = True
+            if config.ATTEMPTS_ENABLED:
+                get_attempt_recorder().answer(
+                    answers.attempt_id, current_q, user_answer, user_answer == question_data['correct_answer']
+                )
 
     # Show feedback below question and choices if needed
-    if st.session_state.show_feedback:
-        correct_answer = question_data['correct_answer']
-        is_correct = st.session_state.last_user_answer == correct_answer
-        st.markdown("---")
-        if is_correct:
-            st.success("✅ **That's correct!**")
-        else:
-            st.error("❌ **That's incorrect.**")
-        st.info(f"**Correct Answer:** {correct_answer}) {question_data['options'][correct_answer]}")
-        st.markdown("**Explanation:**")
-        st.markdown(question_data['explanation'])
-        col1, col2, col3 = st.columns([1, 1, 1])
-        with col2:
-            if st.button("Next Question", type="primary", key="next_btn"):
-                st.session_state.current_question += 1
-                st.session_state.show_feedback = False
-                st.rerun()
-        with col1:
-            if st.button("Back to Question", key="back_btn"):
-                st.session_state.show_feedback = False
-                st.rerun()
+    if answers.show_feedback:
+        show_answer_feedback(question_data, answers.last_answer, current_q)
+
+@st.fragment(run_every=config.JOB_POLL_SECONDS)
+def show_next_question_progress():
+    """Poll the streaming quiz until the question the student is on exists"""
+    stream = st.session_state.mcq_stream
+    current_q = st.session_state.answers.current
+    if stream is None or stream.done or len(stream.questions) > current_q:
+        st.rerun()
+    st.progress(
+        min(len(stream.questions) / max(stream.total, 1), 1.0),
+        text=f"🤖 Generating question {current_q + 1}... {stream.elapsed:.0f}s",
+    )
+
+def rerun_fragment():
+    """Rerun only the calling fragment, or the whole page when this run is a full one"""
+    ctx = get_script_run_ctx()
+    if ctx is not None and ctx.fragment_ids_this_run:
+        st.rerun(scope="fragment")
+    st.rerun()
 
 def show_answer_feedback(question_data, user_answer, question_index):
     """Show feedback for the answered question"""
@@ -398,28 +1109,55 @@ def show_answer_feedback(question_data, user_answer, question_index):
     
     with col2:
         if st.button("Next Question", type="primary", key="next_btn"):
-            st.session_state.current_question += 1
-            st.session_state.show_feedback = False
+            answers = st.session_state.answers
+            answers.current += 1
+            answers.show_feedback = False
+            if answers.current < len(st.session_state.mcqs):
+                rerun_fragment()
+            # Results page or a question still being generated: rebuild the page
             st.rerun()
     
-    # Add a back button for debugging
     with col1:
         if st.button("Back to Question", key="back_btn"):
-            st.session_state.show_feedback = False
-            st.rerun()
+            st.session_state.answers.show_feedback = False
+            rerun_fragment()
 
 def show_results_page():
     """Display final results"""
     st.header("📊 Quiz Results")
+    if st.session_state.fallback_reason is not None:
+        st.caption("⚡ This quiz was built from your notes without AI.")
+    show_results_review()
     
-    mcqs = st.session_state.mcqs
-    user_answers = st.session_state.user_answers
+    # Reset button
+    st.markdown("---")
+    prefetch = st.session_state.prefetch
+    prefetched = config.PREFETCH_ENABLED and get_prefetcher().usable(prefetch)
+    if st.button("🔄 Generate New Quiz", type="primary", key="newquiz_btn"):
+        st.session_state.mcqs = None
+        st.session_state.answers = AnswerSheet()
+        st.session_state.mcq_stream = None
+        leave_quiz()
+        if prefetched:
+            # Same topics again: the next practice set is ready or already generating
+            start_generation_job(*prefetch.request)
+        st.rerun()
+    if prefetched and st.button("✏️ Change topics", key="change_topics_btn"):
+        st.session_state.mcqs = None
+        st.session_state.answers = AnswerSheet()
+        st.session_state.mcq_stream = None
+        leave_quiz()
+        st.rerun()
+
+@st.fragment
+@profiled("results review")
+def show_results_review():
+    """Score and question review; filtering the review reruns only this fragment"""
+    mcqs = session_quiz()
+    user_answers = st.session_state.answers
     
     # Calculate score
-    correct_count = 0
-    for i, question_data in enumerate(mcqs):
-        if user_answers.get(i) == question_data['correct_answer']:
-            correct_count += 1
+    correct_count = user_answers.score(mcqs)
     
     score_percentage = (correct_count / len(mcqs)) * 100
     
@@ -429,11 +1167,14 @@ def show_results_page():
     # Display all questions with answers
     st.markdown("---")
     st.subheader("📝 Question Review")
+    only_incorrect = st.toggle("Show only incorrect answers", key="review_only_incorrect")
     
     for i, question_data in enumerate(mcqs):
         user_answer = user_answers.get(i, "Not answered")
         correct_answer = question_data['correct_answer']
         is_correct = user_answer == correct_answer
+        if only_incorrect and is_correct:
+            continue
         
         with st.expander(f"Question {i + 1}: {question_data['question'][:50]}..."):
             st.markdown(f"**Question:** {question_data['question']}")
@@ -450,17 +1191,6 @@ def show_results_page():
                     st.markdown(f"{option}) {text}")
             
             st.markdown(f"**Explanation:** {question_data['explanation']}")
-    
-    # Reset button
-    st.markdown("---")
-    if st.button("🔄 Generate New Quiz", type="primary", key="newquiz_btn"):
-        st.session_state.mcqs = None
-        st.session_state.current_question = 0
-        st.session_state.user_answers = {}
-        st.session_state.quiz_completed = False
-        st.session_state.show_feedback = False
-        st.session_state.last_user_answer = None
-        st.rerun()
 
 if __name__ == "__main__":
     main() 
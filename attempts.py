@@ -0,0 +1,287 @@
+"""Durable quiz attempts with write-behind batched persistence
+
+Sessions never write to the database themselves. They append events to an
+AttemptRecorder's in-memory queue, which returns immediately. The events
+are:
+
+- start: an attempt of a quiz begins, with the quiz content
+- answer: one question was answered
+- finish: the attempt was completed, with its score
+
+A single writer thread drains the queue in batches of up to `batch_size`
+events, each batch in one transaction. An event waits at most
+`flush_seconds` before its batch is written. `flush()` forces a write and
+waits for it. `close()` writes everything still queued, and runs at
+interpreter exit.
+
+Storage is pluggable: AttemptBackend defines `write(events)` and
+`load(attempt_id)`, and SQLiteAttemptBackend is the local implementation.
+"""
+import atexit
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class AttemptBackend:
+    """Persistent store for attempt events"""
+
+    def write(self, events):
+        """Persist a batch of events (tuples whose first item is the event kind)"""
+        raise NotImplementedError
+
+    def load(self, attempt_id):
+        """The stored attempt as a dict, or None"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class SQLiteAttemptBackend(AttemptBackend):
+    """Attempts, answers and quiz content in one SQLite file"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS quizzes (
+                quiz_id TEXT PRIMARY KEY,
+                questions TEXT NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS attempts (
+                attempt_id TEXT PRIMARY KEY,
+                quiz_id TEXT,
+                session_id TEXT,
+                started_at REAL,
+                completed_at REAL,
+                score INTEGER,
+                total INTEGER
+            );
+            CREATE TABLE IF NOT EXISTS answers (
+                attempt_id TEXT NOT NULL,
+                question_index INTEGER NOT NULL,
+                answer TEXT NOT NULL,
+                correct INTEGER NOT NULL,
+                answered_at REAL NOT NULL,
+                PRIMARY KEY (attempt_id, question_index)
+            );
+            CREATE INDEX IF NOT EXISTS attempts_quiz ON attempts (quiz_id);
+            """
+        )
+        self._conn.commit()
+
+    def write(self, events):
+        quizzes, starts, answers, finishes = [], [], [], []
+        for event in events:
+            kind = event[0]
+            if kind == "start":
+                _, attempt_id, quiz_id, questions, session_id, at = event
+                quizzes.append((quiz_id, json.dumps(questions, ensure_ascii=False, default=dict), at))
+                starts.append((attempt_id, quiz_id, session_id, at, len(questions)))
+            elif kind == "answer":
+                answers.append(event[1:])
+            elif kind == "finish":
+                finishes.append(event[1:])
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO quizzes (quiz_id, questions, created_at) VALUES (?, ?, ?)", quizzes
+            )
+            # Events of one attempt may arrive in any batch order, so every kind upserts
+            self._conn.executemany(
+                "INSERT INTO attempts (attempt_id, quiz_id, session_id, started_at, total) "
+                "VALUES (?, ?, ?, ?, ?) ON CONFLICT (attempt_id) DO UPDATE SET "
+                "quiz_id = excluded.quiz_id, session_id = excluded.session_id, "
+                "started_at = excluded.started_at, total = excluded.total",
+                starts,
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO answers (attempt_id, question_index, answer, correct, answered_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                answers,
+            )
+            self._conn.executemany(
+                "INSERT INTO attempts (attempt_id, score, total, completed_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (attempt_id) DO UPDATE SET score = excluded.score, "
+                "total = excluded.total, completed_at = excluded.completed_at",
+                finishes,
+            )
+
+    def load(self, attempt_id):
+        with self._lock:
+            row = self._conn.execute(
+                """SELECT a.quiz_id, q.questions, a.started_at, a.completed_at, a.score, a.total
+                   FROM attempts a LEFT JOIN quizzes q ON q.quiz_id = a.quiz_id
+                   WHERE a.attempt_id = ?""",
+                (attempt_id,),
+            ).fetchone()
+            if row is None:
+                return None
+            answers = self._conn.execute(
+                "SELECT question_index, answer FROM answers WHERE attempt_id = ? ORDER BY question_index",
+                (attempt_id,),
+            ).fetchall()
+        quiz_id, questions, started_at, completed_at, score, total = row
+        return {
+            "attempt_id": attempt_id,
+            "quiz_id": quiz_id,
+            "questions": json.loads(questions) if questions else None,
+            "answers": dict(answers),
+            "started_at": started_at,
+            "completed_at": completed_at,
+            "score": score,
+            "total": total,
+        }
+
+    def stats(self):
+        with self._lock:
+            attempts, completed = self._conn.execute(
+                "SELECT COUNT(*), COUNT(completed_at) FROM attempts"
+            ).fetchone()
+            answers = self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+        return {"attempts": attempts, "completed": completed, "answers": answers}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class AttemptRecorder:
+    """Write-behind queue in front of an AttemptBackend
+
+    `record` only appends to the queue. When `max_queue` events are waiting,
+    it blocks until the writer catches up instead of growing without bound.
+    A failed write is retried after `retry_seconds`, and its events stay at
+    the front of the queue.
+    """
+
+    def __init__(self, backend, flush_seconds=0.5, batch_size=500, max_queue=100_000, retry_seconds=1.0):
+        self.backend = backend
+        self.flush_seconds = flush_seconds
+        self.batch_size = batch_size
+        self.max_queue = max_queue
+        self.retry_seconds = retry_seconds
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._flush_to = 0
+        self._closed = False
+        self.recorded = 0
+        self.written = 0
+        self.batches = 0
+        self.failures = 0
+        self.write_seconds = 0.0
+        self.max_lag = 0.0
+        self._thread = threading.Thread(target=self._run, daemon=True, name="mcq-attempts")
+        self._thread.start()
+        atexit.register(self.close)
+
+    def record(self, *event):
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("attempt recorder is closed")
+            while self.max_queue and len(self._queue) >= self.max_queue:
+                self._cond.wait()
+            self._queue.append((time.monotonic(), event))
+            self.recorded += 1
+            if len(self._queue) >= self.batch_size:
+                self._cond.notify_all()
+
+    def start(self, attempt_id, quiz_id, questions, session_id=None):
+        self.record("start", attempt_id, quiz_id, [dict(q) for q in questions], session_id, time.time())
+
+    def answer(self, attempt_id, index, answer, correct):
+        self.record("answer", attempt_id, index, answer, int(correct), time.time())
+
+    def finish(self, attempt_id, score, total):
+        self.record("finish", attempt_id, score, total, time.time())
+
+    def _due_locked(self):
+        if not self._queue:
+            return False
+        return (self._closed or self.written < self._flush_to or len(self._queue) >= self.batch_size
+                or time.monotonic() - self._queue[0][0] >= self.flush_seconds)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._due_locked():
+                    if self._closed:
+                        return
+                    timeout = None
+                    if self._queue:
+                        timeout = self.flush_seconds - (time.monotonic() - self._queue[0][0])
+                    self._cond.wait(timeout)
+                count = min(len(self._queue), self.batch_size)
+                batch = [self._queue[i] for i in range(count)]
+            started = time.monotonic()
+            try:
+                self.backend.write([event for _, event in batch])
+            except Exception:
+                with self._cond:
+                    self.failures += 1
+                    if self._closed:
+                        logger.exception("Writing attempt events at shutdown failed; %d lost", len(self._queue))
+                        return
+                    logger.exception("Writing %d attempt events failed; retrying", len(batch))
+                    self._cond.wait(self.retry_seconds)
+                continue
+            finished = time.monotonic()
+            with self._cond:
+                for _ in range(count):
+                    self._queue.popleft()
+                self.written += count
+                self.batches += 1
+                self.write_seconds += finished - started
+                self.max_lag = max(self.max_lag, finished - batch[0][0])
+                self._cond.notify_all()
+
+    def flush(self, timeout=None):
+        """Write everything recorded so far; returns False if `timeout` ran out first"""
+        with self._cond:
+            target = self.recorded
+            self._flush_to = max(self._flush_to, target)
+            self._cond.notify_all()
+            return self._cond.wait_for(
+                lambda: self.written >= target or (self._closed and not self._queue), timeout
+            )
+
+    def close(self, timeout=10):
+        """Write all queued events and stop the writer; later records raise"""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        atexit.unregister(self.close)
+        if self._thread.is_alive():
+            logger.warning("Attempt writer still busy after %ss; %d events unwritten", timeout, len(self._queue))
+            return
+        self.backend.close()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "queued": len(self._queue),
+                "recorded": self.recorded,
+                "written": self.written,
+                "batches": self.batches,
+                "failed_writes": self.failures,
+                "avg_batch": round(self.written / self.batches, 1) if self.batches else 0.0,
+                "avg_write_ms": round(self.write_seconds / self.batches * 1000, 2) if self.batches else 0.0,
+                "max_lag_ms": round(self.max_lag * 1000, 1),
+            }
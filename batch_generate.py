@@ -0,0 +1,214 @@
+"""Headless batch MCQ generation
+
+Reads JSONL records of {"topics", "instructions", "n_questions"} and writes one
+result record per input line to an output JSONL file as each quiz finishes.
+Lines that already have an "ok" result in the output file are skipped, so an
+interrupted run can simply be started again.
+
+    python batch_generate.py semester.jsonl -o semester.out.jsonl --concurrency 8
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+import config
+from dedup import NearDuplicateIndex
+from generation import GenerationResources, build_quiz
+from llm_backends import BackendError, backend_from_config
+from mcq_cache import MCQCache
+from mcq_schema import OutputMetrics
+from hedging import HedgedBackend
+from question_bank import QuestionBank
+from scheduler import PRIORITY_BATCH, RequestScheduler
+import tracing
+
+
+def read_requests(path):
+    """Yield (line_number, record) for every non-blank input line"""
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_number, {"_error": f"invalid JSON: {e}"}
+                continue
+            yield line_number, record
+
+
+def completed_lines(output_path):
+    """Return the input line numbers that already have a successful result"""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                # A partially written last line from an interrupted run
+                continue
+            if result.get("status") == "ok":
+                done.add(result["line"])
+    return done
+
+
+async def generate_one(backend, record, resources, timeout, retries):
+    """Generate one quiz with a per-attempt timeout and exponential backoff
+
+    Each attempt runs the app's pipeline (generation.build_quiz) on a worker
+    thread, so batch quizzes get the same bank, cache, repair and dedup steps.
+    A timed-out attempt cannot be interrupted; it finishes in the background
+    and its result is discarded.
+    """
+    topics = record.get("topics") or ""
+    instructions = record.get("instructions") or ""
+    n_questions = int(record.get("n_questions") or config.DEFAULT_QUESTIONS_COUNT)
+    if not topics.strip():
+        raise ValueError("record has no topics")
+    if n_questions < 1:
+        raise ValueError("n_questions must be at least 1")
+
+    for attempt in range(1, retries + 2):
+        try:
+            mcqs = await asyncio.wait_for(
+                asyncio.to_thread(build_quiz, topics, instructions, n_questions, backend, resources),
+                timeout,
+            )
+            if not mcqs['questions']:
+                raise ValueError("no valid questions in response")
+            return mcqs, attempt
+        except Exception:
+            if attempt > retries:
+                raise
+            await asyncio.sleep(min(2 ** attempt, 30))
+
+
+async def run_batch(backend, input_path, output_path, concurrency=4, timeout=120.0,
+                    retries=2, use_cache=True):
+    """Generate every pending input line and append results to output_path"""
+    done = completed_lines(output_path)
+    pending = [(n, r) for n, r in read_requests(input_path) if n not in done]
+    print(f"{len(done)} already completed, {len(pending)} to generate", file=sys.stderr)
+    if not pending:
+        return 0
+
+    cache = None
+    if use_cache and config.CACHE_ENABLED:
+        cache = MCQCache(
+            memory_max_entries=config.CACHE_MEMORY_MAX_ENTRIES,
+            db_path=config.CACHE_DB_PATH,
+            ttl_seconds=config.CACHE_TTL_SECONDS,
+            disk_max_entries=config.CACHE_DISK_MAX_ENTRIES,
+        )
+
+    metrics = OutputMetrics()
+    # Pre-generated questions also feed the bank the app draws from
+    resources = GenerationResources(
+        cache=cache,
+        bank=QuestionBank(config.BANK_DB_PATH, config.BANK_MIN_TOPIC_OVERLAP) if config.BANK_ENABLED else None,
+        metrics=metrics,
+        dedup_index=(NearDuplicateIndex(config.DEDUP_WINDOW, config.DEDUP_THRESHOLD)
+                     if config.DEDUP_ENABLED and config.DEDUP_WINDOW else None),
+    )
+    queue = asyncio.Queue()
+    for item in pending:
+        queue.put_nowait(item)
+    failures = 0
+
+    with open(output_path, "a", encoding="utf-8") as out:
+        async def worker():
+            nonlocal failures
+            while True:
+                try:
+                    line_number, record = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                started = time.perf_counter()
+                result = {"line": line_number, "topics": None}
+                try:
+                    if not isinstance(record, dict):
+                        raise ValueError(f"record is not a JSON object: {json.dumps(record)[:80]}")
+                    result["topics"] = record.get("topics")
+                    if "_error" in record:
+                        raise ValueError(record["_error"])
+                    with tracing.request(f"batch-{line_number}"), tracing.span("generate"):
+                        mcqs, attempts = await generate_one(backend, record, resources, timeout, retries)
+                    result.update(status="ok", attempts=attempts, questions=mcqs['questions'])
+                except Exception as e:
+                    failures += 1
+                    result.update(status="error", error=f"{type(e).__name__}: {e}")
+                result["elapsed_seconds"] = round(time.perf_counter() - started, 3)
+
+                # Stream each result out as soon as it is ready
+                out.write(json.dumps(result, ensure_ascii=False) + "\n")
+                out.flush()
+                print(f"line {line_number}: {result['status']} "
+                      f"({result['elapsed_seconds']}s)", file=sys.stderr)
+
+        workers = [asyncio.create_task(worker()) for _ in range(min(concurrency, len(pending)))]
+        await asyncio.gather(*workers)
+
+    print(json.dumps(metrics.stats()), file=sys.stderr)
+    if tracing.enabled():
+        print(json.dumps(tracing.get_tracer().stats()), file=sys.stderr)
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate MCQ quizzes from a JSONL file")
+    parser.add_argument("input", help="JSONL file of {topics, instructions, n_questions} records")
+    parser.add_argument("-o", "--output", help="output JSONL file (default: <input>.out.jsonl)")
+    parser.add_argument("--concurrency", type=int, default=4, help="max in-flight requests")
+    parser.add_argument("--timeout", type=float, default=120.0, help="seconds per attempt")
+    parser.add_argument("--retries", type=int, default=2, help="retries after a failed attempt")
+    parser.add_argument("--no-cache", action="store_true", help="bypass the MCQ cache")
+    parser.add_argument("--backend", choices=["gemini", "mock", "http", "replay"],
+                        default=config.LLM_BACKEND, help="LLM backend to generate with")
+    args = parser.parse_args(argv)
+
+    try:
+        backend = backend_from_config(args.backend)
+    except BackendError as e:
+        parser.error(str(e))
+    # Batch calls respect the same per-minute quotas as the app and back off on 429s
+    scheduler = RequestScheduler(
+        requests_per_minute=config.SCHEDULER_REQUESTS_PER_MINUTE,
+        tokens_per_minute=config.SCHEDULER_TOKENS_PER_MINUTE,
+    )
+    if config.HEDGING_ENABLED:
+        backend = HedgedBackend(
+            backend,
+            window_size=config.LATENCY_WINDOW_SIZE,
+            min_samples=config.LATENCY_MIN_SAMPLES,
+            max_hedge_ratio=config.HEDGE_MAX_RATIO,
+            timeout_multiplier=config.TIMEOUT_MULTIPLIER,
+            min_timeout=config.LLM_MIN_TIMEOUT_SECONDS,
+            max_timeout=config.LLM_MAX_TIMEOUT_SECONDS,
+            allow_hedge=scheduler.hedge_gate(config.SCHEDULER_TOKENS_PER_QUESTION),
+        )
+    backend = scheduler.wrap(
+        backend, PRIORITY_BATCH, config.SCHEDULER_TOKENS_PER_QUESTION, config.SCHEDULER_MAX_RETRIES
+    )
+
+    if config.TRACE_ENABLED:
+        tracing.enable(tracing.Tracer(config.TRACE_PATH, config.TRACE_MAX_BYTES, config.TRACE_BACKUPS))
+
+    output = args.output or os.path.splitext(args.input)[0] + ".out.jsonl"
+    failures = asyncio.run(run_batch(
+        backend, args.input, output,
+        concurrency=max(1, args.concurrency),
+        timeout=args.timeout,
+        retries=max(0, args.retries),
+        use_cache=not args.no_cache,
+    ))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+"""Write throughput of the attempt store under concurrent students
+
+Each student is a thread that starts an attempt, answers every question
+with a think time between answers, and finishes the attempt. The same
+workload runs in two modes:
+
+- sync: one committed SQLite write per event, serialised on the connection
+- write-behind: events go to an AttemptRecorder and are flushed in batches
+
+For each mode it reports events written per second and the latency of the
+call a session makes to record an event. For write-behind it also reports
+the recorder's batch and lag counters. Each run uses a fresh database in a
+temporary directory.
+
+    python bench_attempts.py --students 300 --questions 10 --think 0.05 -o attempts.json
+"""
+import argparse
+import os
+import platform
+import random
+import sys
+import tempfile
+import threading
+import time
+
+from attempts import AttemptRecorder, SQLiteAttemptBackend
+from bench_latency import git_commit, summarize, write_json
+
+
+class SyncRecorder:
+    """The naive alternative: write and commit each event on the caller's thread"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._lock = threading.Lock()
+
+    def record(self, *event):
+        with self._lock:
+            self.backend.write([event])
+
+    def flush(self, timeout=None):
+        return True
+
+    def close(self):
+        self.backend.close()
+
+    def stats(self):
+        return {}
+
+
+def student(recorder, number, questions, quiz, think, latencies):
+    rng = random.Random(number)
+    attempt_id = f"bench-{number}"
+    samples = []
+
+    def timed(*event):
+        started = time.perf_counter()
+        recorder.record(*event)
+        samples.append(time.perf_counter() - started)
+
+    timed("start", attempt_id, "bench-quiz", quiz, f"session-{number}", time.time())
+    score = 0
+    for index in range(questions):
+        if think:
+            time.sleep(rng.uniform(0, 2 * think))
+        answer = rng.choice("ABCD")
+        score += answer == "A"
+        timed("answer", attempt_id, index, answer, int(answer == "A"), time.time())
+    timed("finish", attempt_id, score, questions, time.time())
+    latencies.extend(samples)
+
+
+def run_mode(mode, args):
+    directory = tempfile.mkdtemp(prefix="bench-attempts-")
+    backend = SQLiteAttemptBackend(os.path.join(directory, "attempts.sqlite3"))
+    if mode == "sync":
+        recorder = SyncRecorder(backend)
+    else:
+        recorder = AttemptRecorder(backend, args.flush_seconds, args.batch_size)
+    quiz = [
+        {"question": f"Question {i}?", "options": dict(zip("ABCD", "wxyz")), "correct_answer": "A",
+         "explanation": "Benchmark question."}
+        for i in range(args.questions)
+    ]
+    latencies = []
+    threads = [
+        threading.Thread(target=student, args=(recorder, i, args.questions, quiz, args.think, latencies))
+        for i in range(args.students)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    recorded = time.perf_counter() - started
+    recorder.flush()
+    durable = time.perf_counter() - started
+    stats = recorder.stats()
+    stored = backend.stats()
+    recorder.close()
+    events = args.students * (args.questions + 2)
+    return {
+        "events": events,
+        "stored_answers": stored["answers"],
+        "seconds_to_record": round(recorded, 3),
+        "seconds_to_durable": round(durable, 3),
+        "events_per_s": round(events / durable, 1),
+        "record_call": summarize(latencies),
+        "recorder": stats,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Attempt store write throughput")
+    parser.add_argument("--students", type=int, default=300)
+    parser.add_argument("--questions", type=int, default=10)
+    parser.add_argument("--think", type=float, default=0.05,
+                        help="mean seconds between a student's answers (0 for maximum load)")
+    parser.add_argument("--modes", nargs="+", choices=["sync", "write-behind"], default=["sync", "write-behind"])
+    parser.add_argument("--flush-seconds", type=float, default=0.5)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("-o", "--output", help="write JSON here instead of stdout")
+    args = parser.parse_args(argv)
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "students": args.students,
+            "questions": args.questions,
+            "think_s": args.think,
+        },
+        "results": {mode: run_mode(mode, args) for mode in args.modes},
+    }
+    write_json(report, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+"""Per-interaction server time and websocket bytes for the quiz flow
+
+Starts the app under `streamlit run` against the mock backend (or uses --url),
+drives a session over the websocket through a whole quiz and reports, for each
+kind of interaction, latency percentiles and bytes sent by the server. The
+JSON report has the same shape as bench_latency.py, so two runs can be diffed
+with `python bench_latency.py compare before.json after.json`.
+
+    python bench_interactions.py --quizzes 5 -o after.json
+"""
+import argparse
+import asyncio
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from collections import defaultdict
+
+from bench_latency import git_commit, make_topics, summarize, write_json
+from streamlit_client import StreamlitSession
+
+SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(port, env_overrides, cwd):
+    """Run the app headless on `port` and wait until it answers health checks"""
+    env = {**os.environ, **env_overrides}
+    process = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", SCRIPT,
+         "--server.headless", "true",
+         "--server.port", str(port),
+         "--server.enableXsrfProtection", "false",
+         "--browser.gatherUsageStats", "false"],
+        env=env, cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1).close()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError("streamlit server did not start")
+
+
+def on_quiz(session):
+    return session.find("Submit Answer", "button") is not None or session.has_text("Final Score")
+
+
+async def take_quiz(url, topics, samples, think=0.0):
+    """One session: load, submit, answer every question (with one Back), review results
+
+    `think` seconds pass between interactions, as a student would read the page.
+    """
+
+    def record(interaction):
+        samples[interaction.name]["seconds"].append(interaction.seconds)
+        samples[interaction.name]["bytes"].append(interaction.bytes)
+        return asyncio.sleep(think)
+
+    async with StreamlitSession(url) as session:
+        await record(await session.rerun("load"))
+        session.set_value("📚 Lecture Topics & Summary", topics)
+        await record(await session.click("🚀 Generate MCQs", "submit"))
+        await session.wait_for(on_quiz)
+
+        went_back = False
+        while not session.has_text("Final Score"):
+            if session.exceptions:
+                raise RuntimeError(session.exceptions[0])
+            radio = session.find("Select your answer:", "radio")
+            if radio is None:
+                await session.wait_for(on_quiz)
+                continue
+            session.set_value("Select your answer:", radio.options[0])
+            await record(await session.click("Submit Answer", name="answer"))
+            if not went_back:
+                await record(await session.click("Back to Question", name="back"))
+                await record(await session.click("Submit Answer", name="answer"))
+                went_back = True
+            await record(await session.click("Next Question", name="next"))
+
+        toggle = session.find("Show only incorrect answers")
+        if toggle is not None:
+            session._values[toggle.id] = ("bool_value", True)
+            await record(await session.rerun("review_filter", fragment_id=toggle.fragment_id))
+        await record(await session.click("🔄 Generate New Quiz", "new_quiz"))
+
+
+def run(args):
+    env = {
+        "MCQ_LLM_BACKEND": "mock",
+        "MCQ_MOCK_LATENCY_SECONDS": str(args.mock_latency),
+        "MCQ_CACHE_ENABLED": "0",
+        "MCQ_BANK_ENABLED": "0",
+    }
+    process = None
+    url = args.url
+    if url is None:
+        port = free_port()
+        process = start_server(port, env, args.workdir)
+        url = f"http://127.0.0.1:{port}"
+
+    samples = defaultdict(lambda: {"seconds": [], "bytes": []})
+    try:
+        topics = make_topics(args.topic_lines)
+        for _ in range(args.quizzes):
+            asyncio.run(take_quiz(url, topics, samples))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    results = {}
+    for name, data in samples.items():
+        sizes = sorted(data["bytes"])
+        results[name] = {
+            "stage": name,
+            **summarize(data["seconds"]),
+            "bytes_mean": round(sum(sizes) / len(sizes)),
+            "bytes_max": sizes[-1],
+        }
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "mock_latency_s": args.mock_latency,
+            "quizzes": args.quizzes,
+        },
+        "results": results,
+    }
+    write_json(report, args.output)
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Quiz interaction latency and websocket bytes")
+    parser.add_argument("--url", help="use an already running app instead of starting one")
+    parser.add_argument("--quizzes", type=int, default=5, help="sessions to drive, one after another")
+    parser.add_argument("--topic-lines", type=int, default=5)
+    parser.add_argument("--mock-latency", type=float, default=0.2)
+    parser.add_argument("--workdir", default=".", help="working directory for the started app")
+    parser.add_argument("-o", "--output", help="write JSON here instead of stdout")
+    return run(parser.parse_args(argv))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
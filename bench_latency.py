@@ -0,0 +1,349 @@
+"""End-to-end latency benchmarks against the mock LLM backend
+
+Runs every stage under a grid of topic lengths and question counts and prints
+p50/p95/p99 and throughput as JSON. Two result files can be diffed with
+`compare` to spot regressions between commits.
+
+    python bench_latency.py run -o before.json
+    python bench_latency.py run -o after.json
+    python bench_latency.py compare before.json after.json --threshold 10
+"""
+import argparse
+import atexit
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+# Benchmarks always run offline against the in-process mock. The cache and
+# the question bank would answer repeat requests without calling the LLM
+# path being measured, and every store lives in a scratch directory so a run
+# neither reads nor leaves behind ./.cache.
+os.environ.setdefault("MCQ_LLM_BACKEND", "mock")
+os.environ.setdefault("MCQ_CACHE_ENABLED", "0")
+os.environ.setdefault("MCQ_BANK_ENABLED", "0")
+_SCRATCH = tempfile.mkdtemp(prefix="bench-latency-")
+atexit.register(shutil.rmtree, _SCRATCH, ignore_errors=True)
+for _name, _file in [
+    ("MCQ_CACHE_DB_PATH", "mcq_cache.sqlite3"),
+    ("MCQ_BANK_DB_PATH", "question_bank.sqlite3"),
+    ("MCQ_ATTEMPTS_DB_PATH", "attempts.sqlite3"),
+    ("MCQ_PUBLISHED_DB_PATH", "published.sqlite3"),
+    ("MCQ_BACKEND_HEALTH_PATH", "backend_health.json"),
+    ("MCQ_SYLLABUS_CHECKPOINT_DIR", "syllabus"),
+    ("MCQ_TRACE_PATH", "trace.jsonl"),
+]:
+    os.environ.setdefault(_name, os.path.join(_SCRATCH, _file))
+
+import config
+from llm_backends import MockBackend
+from mcq_prompt import build_prompt, parse_mcq_response
+from mcq_stream import QuestionStreamParser
+
+
+def percentile(sorted_values, pct):
+    """Linearly interpolated percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = (len(sorted_values) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+def summarize(samples):
+    """Reduce a list of durations in seconds to a report entry"""
+    values = sorted(samples)
+    total = sum(values)
+    return {
+        "n": len(values),
+        "mean_ms": round(total / len(values) * 1000, 3) if values else 0.0,
+        "p50_ms": round(percentile(values, 50) * 1000, 3),
+        "p95_ms": round(percentile(values, 95) * 1000, 3),
+        "p99_ms": round(percentile(values, 99) * 1000, 3),
+        "throughput_per_s": round(len(values) / total, 3) if total else None,
+    }
+
+
+def make_topics(lines):
+    """Synthetic lecture topics with the given number of lines"""
+    return "\n".join(
+        f"Topic {i + 1}: definition, governing equation and units of concept {i + 1}"
+        for i in range(lines)
+    )
+
+
+def time_calls(fn, iterations):
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def bench_parse(topics, question_count, iterations):
+    """JSON extraction on a complete response, whole-text and incremental"""
+    backend = MockBackend(latency=0)
+    text = "```json\n" + backend.generate(build_prompt(topics, "", question_count)) + "\n```"
+
+    def incremental():
+        parser = QuestionStreamParser()
+        for i in range(0, len(text), 64):
+            parser.feed(text[i:i + 64])
+
+    return {
+        "parse_mcq_response": time_calls(lambda: parse_mcq_response(text), iterations),
+        "stream_parser": time_calls(incremental, iterations),
+    }
+
+
+def bench_generate(app, topics, question_count, iterations):
+    """generate_mcqs plus time to first streamed question"""
+    backend = app.get_llm_backend()
+    first_question = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        stream = app.stream_mcqs(topics, "", backend, None, question_count)
+        next(stream)
+        first_question.append(time.perf_counter() - started)
+        for _ in stream:
+            pass
+
+    return {
+        "generate_mcqs": time_calls(
+            lambda: app.generate_mcqs(topics, "", question_count), iterations
+        ),
+        "stream_first_question": first_question,
+    }
+
+
+def synthetic_question(rng, words):
+    return {
+        "question": " ".join(rng.choices(words, k=12)) + "?",
+        "options": {key: " ".join(rng.choices(words, k=3)) for key in "ABCD"},
+        "correct_answer": rng.choice("ABCD"),
+    }
+
+
+def bench_dedup(window, iterations):
+    """Near-duplicate check of one new question against a full window"""
+    from dedup import NearDuplicateIndex, QuizDeduper, answer_key, signature
+
+    rng = random.Random(0)
+    words = [f"word{i}" for i in range(5000)]
+    index = NearDuplicateIndex(window)
+    for _ in range(window):
+        question = synthetic_question(rng, words)
+        index.seen_recently(signature(question), answer_key(question))
+    deduper = QuizDeduper(index)
+    questions = iter([synthetic_question(rng, words) for _ in range(iterations)])
+    return time_calls(lambda: deduper.filter(next(questions)), iterations)
+
+
+def is_last_question(at):
+    """Whether "Next Question" on the current question leads to the results page"""
+    stream = at.session_state["mcq_stream"]
+    total = stream.total if stream is not None else len(at.session_state["mcqs"])
+    return at.session_state["answers"].current + 1 >= total
+
+
+def run_until(at, ready, timeout, poll=0.05):
+    """Rerun the app until ready(at), the way the polling fragments would"""
+    deadline = time.monotonic() + timeout
+    at.run()
+    while not ready(at) and not at.exception:
+        if time.monotonic() > deadline:
+            raise TimeoutError("page did not become ready")
+        time.sleep(poll)
+        at.run()
+
+
+def on_quiz_or_results(at):
+    return bool(at.radio or at.metric or at.error)
+
+
+def bench_pages(topics, iterations, timeout):
+    """Drive the three page functions through Streamlit's app-testing API"""
+    from streamlit.testing.v1 import AppTest
+
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+    samples = {
+        "show_input_page": [],
+        "submit_to_first_question": [],
+        "show_quiz_page_answer": [],
+        "show_quiz_page_next": [],
+        "show_results_page": [],
+    }
+
+    def timed(name, action):
+        started = time.perf_counter()
+        action()
+        samples[name].append(time.perf_counter() - started)
+
+    for _ in range(iterations):
+        at = AppTest.from_file(script, default_timeout=timeout)
+        timed("show_input_page", at.run)
+
+        at.text_area[0].input(topics)
+        submit = next(b for b in at.button if b.label.startswith("🚀"))
+        submit.click()
+        timed("submit_to_first_question", lambda: run_until(at, on_quiz_or_results, timeout))
+        if at.error:
+            raise RuntimeError(at.error[0].value)
+
+        while not at.metric:
+            at.radio[0].set_value(at.radio[0].options[0])
+            answer = next(b for b in at.button if b.label == "Submit Answer")
+            timed("show_quiz_page_answer", lambda: answer.click().run())
+            stage = "show_results_page" if is_last_question(at) else "show_quiz_page_next"
+            next_button = at.button(key="next_btn")
+            next_button.click()
+            timed(stage, lambda: run_until(at, on_quiz_or_results, timeout))
+            if at.exception:
+                raise RuntimeError(at.exception[0].message)
+
+    return samples
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    import app
+
+    config.MOCK_LATENCY_SECONDS = args.mock_latency
+    config.MOCK_JITTER_SECONDS = args.mock_jitter
+    app.get_backend_registry.clear()
+    app.get_hedged_backend.clear()
+
+    results = {}
+
+    def record(stage, topic_lines, question_count, samples):
+        results[f"{stage}[topics={topic_lines},questions={question_count}]"] = {
+            "stage": stage,
+            "topic_lines": topic_lines,
+            "question_count": question_count,
+            **summarize(samples),
+        }
+
+    for topic_lines in args.topic_lines:
+        topics = make_topics(topic_lines)
+        for question_count in args.question_counts:
+            for stage, samples in bench_parse(topics, question_count, args.parse_iterations).items():
+                record(stage, topic_lines, question_count, samples)
+            for stage, samples in bench_generate(app, topics, question_count, args.iterations).items():
+                record(stage, topic_lines, question_count, samples)
+
+        if not args.skip_pages:
+            # Pages run at the form's default question count
+            for stage, samples in bench_pages(topics, args.iterations, args.timeout).items():
+                if samples:
+                    record(stage, topic_lines, config.DEFAULT_QUESTIONS_COUNT, samples)
+
+    for window in args.dedup_windows:
+        results[f"dedup_check[window={window}]"] = {
+            "stage": "dedup_check",
+            "window": window,
+            **summarize(bench_dedup(window, args.parse_iterations)),
+        }
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "mock_latency_s": args.mock_latency,
+            "mock_jitter_s": args.mock_jitter,
+            "iterations": args.iterations,
+        },
+        "results": results,
+    }
+    write_json(report, args.output)
+    return 0
+
+
+def compare(args):
+    """Diff two reports; exit non-zero if any percentile regressed past the threshold"""
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.candidate, encoding="utf-8") as f:
+        candidate = json.load(f)
+
+    diff = {}
+    regressions = []
+    for name, new in candidate["results"].items():
+        old = baseline["results"].get(name)
+        if old is None:
+            continue
+        entry = {}
+        for metric in ("p50_ms", "p95_ms", "p99_ms"):
+            change = new[metric] - old[metric]
+            pct = (change / old[metric] * 100) if old[metric] else 0.0
+            entry[metric] = {"before": old[metric], "after": new[metric], "change_pct": round(pct, 1)}
+            if pct > args.threshold:
+                regressions.append(f"{name} {metric}")
+        diff[name] = entry
+
+    report = {
+        "baseline": baseline["meta"].get("commit"),
+        "candidate": candidate["meta"].get("commit"),
+        "threshold_pct": args.threshold,
+        "regressions": regressions,
+        "diff": diff,
+    }
+    write_json(report, args.output)
+    return 1 if regressions else 0
+
+
+def write_json(report, path):
+    text = json.dumps(report, indent=2)
+    if path:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="MCQ generator latency benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the benchmarks")
+    run_parser.add_argument("--topic-lines", type=int, nargs="+", default=[5, 20, 80])
+    run_parser.add_argument("--question-counts", type=int, nargs="+", default=[3, 10, 30])
+    run_parser.add_argument("--iterations", type=int, default=20)
+    run_parser.add_argument("--parse-iterations", type=int, default=500)
+    run_parser.add_argument("--dedup-windows", type=int, nargs="+", default=[1000, 100000],
+                            help="questions already in the near-duplicate window")
+    run_parser.add_argument("--mock-latency", type=float, default=0.2)
+    run_parser.add_argument("--mock-jitter", type=float, default=0.05)
+    run_parser.add_argument("--timeout", type=float, default=30.0, help="seconds per page rerun")
+    run_parser.add_argument("--skip-pages", action="store_true", help="skip the Streamlit page stages")
+    run_parser.add_argument("-o", "--output", help="write JSON here instead of stdout")
+
+    compare_parser = commands.add_parser("compare", help="diff two benchmark reports")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("candidate")
+    compare_parser.add_argument("--threshold", type=float, default=10.0,
+                                help="percent slowdown that counts as a regression")
+    compare_parser.add_argument("-o", "--output", help="write JSON here instead of stdout")
+
+    args = parser.parse_args(argv)
+    return run(args) if args.command == "run" else compare(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
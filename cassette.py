@@ -0,0 +1,203 @@
+"""Record LLM responses to a cassette file and replay them offline
+
+RecordingBackend wraps a live backend and appends one JSON line per call to
+a cassette, gzip-compressed when the path ends in .gz. Each line holds:
+
+- the prompt and its key
+- the response text, or the stream's chunks with their offsets from the start of the call
+- total latency
+- the token usage the SDK reported
+- any error
+
+ReplayBackend serves a cassette back without network access. A prompt that
+was recorded several times replays its recordings in order, then starts
+over. Delays follow the recorded timing divided by `speed`, and a speed of 0
+replays instantly. Replays are deterministic, so a cassette recorded from
+Gemini becomes a benchmark corpus or a regression fixture.
+"""
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+
+import tracing
+from llm_backends import BackendError, LLMBackend, take_usage
+
+
+def prompt_key(prompt, response_schema=None):
+    """Cassette key for a prompt and the schema it was sent with"""
+    schema = json.dumps(response_schema, sort_keys=True) if response_schema is not None else ""
+    return hashlib.sha256(f"{schema}\n{prompt}".encode("utf-8")).hexdigest()[:16]
+
+
+def _open(path, mode):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+class Cassette:
+    """Prompt/response records on disk, indexed by prompt key"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._records = {}
+        self._played = {}
+        if os.path.exists(path):
+            with _open(path, "r") as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        self._records.setdefault(record["key"], []).append(record)
+
+    def __len__(self):
+        return sum(len(records) for records in self._records.values())
+
+    def append(self, record):
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            # Appending to a .gz file adds a gzip member; gzip.open reads them all
+            with _open(self.path, "a") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._records.setdefault(record["key"], []).append(record)
+
+    def next(self, key):
+        """The next recording for `key` in replay order, or None"""
+        with self._lock:
+            records = self._records.get(key)
+            if not records:
+                return None
+            played = self._played.get(key, 0)
+            self._played[key] = played + 1
+            return records[played % len(records)]
+
+    def model_name(self):
+        for records in self._records.values():
+            return records[0].get("model", "replay")
+        return "replay"
+
+
+class RecordingBackend(LLMBackend):
+    """Backend wrapper that appends every call to a cassette"""
+
+    def __init__(self, backend, cassette):
+        self.backend = backend
+        self.cassette = cassette
+        self.name = backend.name
+        self.model_name = backend.model_name
+
+    def _record(self, prompt, response_schema, kind, started, text=None, chunks=None, error=None):
+        usage = take_usage()
+        self.cassette.append({
+            "key": prompt_key(prompt, response_schema),
+            "kind": kind,
+            "model": self.model_name,
+            "recorded_at": round(time.time(), 3),
+            "latency": round(time.perf_counter() - started, 4),
+            "prompt": prompt,
+            "text": text,
+            "chunks": chunks,
+            "usage": {"prompt_tokens": usage[0], "output_tokens": usage[1]} if usage else None,
+            "error": f"{type(error).__name__}: {error}" if error is not None else None,
+        })
+
+    def generate(self, prompt, response_schema=None):
+        started = time.perf_counter()
+        try:
+            text = self.backend.generate(prompt, response_schema=response_schema)
+        except Exception as e:
+            self._record(prompt, response_schema, "generate", started, error=e)
+            raise
+        self._record(prompt, response_schema, "generate", started, text=text)
+        return text
+
+    def stream(self, prompt, response_schema=None):
+        started = time.perf_counter()
+        chunks = []
+        try:
+            for chunk in self.backend.stream(prompt, response_schema=response_schema):
+                chunks.append([round(time.perf_counter() - started, 4), chunk])
+                yield chunk
+        except Exception as e:
+            self._record(prompt, response_schema, "stream", started, chunks=chunks, error=e)
+            raise
+        self._record(prompt, response_schema, "stream", started, chunks=chunks)
+
+    async def generate_async(self, prompt, response_schema=None):
+        started = time.perf_counter()
+        try:
+            text = await self.backend.generate_async(prompt, response_schema=response_schema)
+        except Exception as e:
+            self._record(prompt, response_schema, "generate", started, error=e)
+            raise
+        self._record(prompt, response_schema, "generate", started, text=text)
+        return text
+
+    def warm_up(self):
+        return self.backend.warm_up()
+
+
+class ReplayBackend(LLMBackend):
+    """Serves recorded responses with their original (or scaled) timing"""
+
+    name = "replay"
+
+    def __init__(self, cassette, speed=1.0):
+        if not isinstance(cassette, Cassette):
+            cassette = Cassette(cassette)
+        self.cassette = cassette
+        self.speed = speed
+        self.model_name = cassette.model_name()
+
+    def _delay(self, seconds):
+        return seconds / self.speed if self.speed > 0 else 0.0
+
+    def _lookup(self, prompt, response_schema):
+        record = self.cassette.next(prompt_key(prompt, response_schema))
+        if record is None:
+            raise BackendError(f"No recording for this prompt in {self.cassette.path}")
+        usage = record.get("usage")
+        if usage:
+            tracing.add_tokens(usage["prompt_tokens"], usage["output_tokens"])
+        return record
+
+    @staticmethod
+    def _text(record):
+        if record.get("text") is not None:
+            return record["text"]
+        return "".join(chunk for _, chunk in record.get("chunks") or [])
+
+    def generate(self, prompt, response_schema=None):
+        record = self._lookup(prompt, response_schema)
+        time.sleep(self._delay(record["latency"]))
+        if record.get("error"):
+            raise BackendError(record["error"])
+        return self._text(record)
+
+    def stream(self, prompt, response_schema=None):
+        record = self._lookup(prompt, response_schema)
+        chunks = record.get("chunks")
+        if chunks is None:
+            # Recorded as a whole response: deliver it as one chunk at the end
+            chunks = [[record["latency"], record.get("text") or ""]]
+        started = time.perf_counter()
+        for offset, chunk in chunks:
+            time.sleep(max(0.0, self._delay(offset) - (time.perf_counter() - started)))
+            yield chunk
+        if record.get("error"):
+            raise BackendError(record["error"])
+
+    async def generate_async(self, prompt, response_schema=None):
+        record = self._lookup(prompt, response_schema)
+        await asyncio.sleep(self._delay(record["latency"]))
+        if record.get("error"):
+            raise BackendError(record["error"])
+        return self._text(record)
+
+    def warm_up(self):
+        if not len(self.cassette):
+            raise BackendError(f"Cassette {self.cassette.path} is empty")
@@ -16,4 +16,121 @@ DEFAULT_QUESTIONS_COUNT = 3
 
 # UI Configuration
 QUESTION_HEIGHT = 200
-INSTRUCTIONS_HEIGHT = 100 
\ No newline at end of file
+INSTRUCTIONS_HEIGHT = 100 
+
+# Cache Configuration
+CACHE_ENABLED = os.getenv('MCQ_CACHE_ENABLED', '1') == '1'
+CACHE_MEMORY_MAX_ENTRIES = int(os.getenv('MCQ_CACHE_MEMORY_MAX_ENTRIES', '256'))
+CACHE_DB_PATH = os.getenv('MCQ_CACHE_DB_PATH', '.cache/mcq_cache.sqlite3')
+CACHE_TTL_SECONDS = int(os.getenv('MCQ_CACHE_TTL_SECONDS', str(7 * 24 * 3600)))
+CACHE_DISK_MAX_ENTRIES = int(os.getenv('MCQ_CACHE_DISK_MAX_ENTRIES', '5000'))
+
+# Diagnostics Configuration
+SHOW_DIAGNOSTICS = os.getenv('MCQ_SHOW_DIAGNOSTICS', '0') == '1'
+
+# Profiler Configuration (?profile=1 also enables it for one session)
+PROFILE_ENABLED = os.getenv('MCQ_PROFILE_ENABLED', '0') == '1'
+PROFILE_QUERY_PARAM_ENABLED = os.getenv('MCQ_PROFILE_QUERY_PARAM_ENABLED', '0') == '1'
+PROFILE_HISTORY = int(os.getenv('MCQ_PROFILE_HISTORY', '10'))
+PROFILE_TOP_N = int(os.getenv('MCQ_PROFILE_TOP_N', '25'))
+
+# Streaming Configuration
+STREAMING_ENABLED = os.getenv('MCQ_STREAMING_ENABLED', '1') == '1'
+STREAM_QUESTION_TIMEOUT_SECONDS = float(os.getenv('MCQ_STREAM_QUESTION_TIMEOUT_SECONDS', '60'))
+
+# Background Generation Configuration
+GENERATION_WORKERS = int(os.getenv('MCQ_GENERATION_WORKERS', '16'))
+JOB_POLL_SECONDS = float(os.getenv('MCQ_JOB_POLL_SECONDS', '0.5'))
+
+# Syllabus Configuration (one quiz per lecture of an uploaded syllabus)
+SYLLABUS_WORKERS = int(os.getenv('MCQ_SYLLABUS_WORKERS', '4'))
+SYLLABUS_CHECKPOINT_DIR = os.getenv('MCQ_SYLLABUS_CHECKPOINT_DIR', '.cache/syllabus')
+
+# Prefetch Configuration (generate the next practice set while a quiz is being taken)
+PREFETCH_ENABLED = os.getenv('MCQ_PREFETCH_ENABLED', '0') == '1'
+PREFETCH_WORKERS = int(os.getenv('MCQ_PREFETCH_WORKERS', '2'))
+PREFETCH_TTL_SECONDS = int(os.getenv('MCQ_PREFETCH_TTL_SECONDS', '1800'))
+PREFETCH_MAX_BYTES = int(os.getenv('MCQ_PREFETCH_MAX_BYTES', str(256 * 1024)))
+PREFETCH_MAX_PENDING = int(os.getenv('MCQ_PREFETCH_MAX_PENDING', '32'))
+
+# Fallback Configuration (rule-based quiz from the topics when the LLM fails or is too slow)
+FALLBACK_ENABLED = os.getenv('MCQ_FALLBACK_ENABLED', '1') == '1'
+FALLBACK_AFTER_SECONDS = float(os.getenv('MCQ_FALLBACK_AFTER_SECONDS', '20'))
+
+# Attempt Store Configuration (answers persisted in batches; ?attempt=<id> resumes an attempt)
+ATTEMPTS_ENABLED = os.getenv('MCQ_ATTEMPTS_ENABLED', '1') == '1'
+ATTEMPTS_DB_PATH = os.getenv('MCQ_ATTEMPTS_DB_PATH', '.cache/attempts.sqlite3')
+ATTEMPTS_FLUSH_SECONDS = float(os.getenv('MCQ_ATTEMPTS_FLUSH_SECONDS', '0.5'))
+ATTEMPTS_BATCH_SIZE = int(os.getenv('MCQ_ATTEMPTS_BATCH_SIZE', '500'))
+ATTEMPTS_MAX_QUEUE = int(os.getenv('MCQ_ATTEMPTS_MAX_QUEUE', '100000'))
+
+# Published Quiz Configuration (instructors publish a quiz once; students open ?quiz=<code>)
+PUBLISH_ENABLED = os.getenv('MCQ_PUBLISH_ENABLED', '1') == '1'
+PUBLISHED_DB_PATH = os.getenv('MCQ_PUBLISHED_DB_PATH', '.cache/published.sqlite3')
+PUBLISHED_MEMORY_ENTRIES = int(os.getenv('MCQ_PUBLISHED_MEMORY_ENTRIES', '256'))
+
+# LLM Backend Configuration ('gemini', 'mock', 'http' or 'replay')
+LLM_BACKEND = os.getenv('MCQ_LLM_BACKEND', 'gemini')
+MOCK_LATENCY_SECONDS = float(os.getenv('MCQ_MOCK_LATENCY_SECONDS', '1.0'))
+MOCK_JITTER_SECONDS = float(os.getenv('MCQ_MOCK_JITTER_SECONDS', '0.0'))
+MOCK_ERROR_RATE = float(os.getenv('MCQ_MOCK_ERROR_RATE', '0.0'))
+MOCK_MALFORMED_RATE = float(os.getenv('MCQ_MOCK_MALFORMED_RATE', '0.0'))
+MOCK_MODE = os.getenv('MCQ_MOCK_MODE', 'template')
+MOCK_INVALID_RATE = float(os.getenv('MCQ_MOCK_INVALID_RATE', '0.0'))
+MOCK_SEED = int(os.environ['MCQ_MOCK_SEED']) if os.getenv('MCQ_MOCK_SEED') else None
+MOCK_SERVER_URL = os.getenv('MCQ_MOCK_SERVER_URL', 'http://127.0.0.1:8765')
+
+# Cassette Configuration (record live responses, or replay them with MCQ_LLM_BACKEND=replay)
+CASSETTE_PATH = os.getenv('MCQ_CASSETTE_PATH', '.cache/cassette.jsonl.gz')
+CASSETTE_RECORD = os.getenv('MCQ_CASSETTE_RECORD', '0') == '1'
+REPLAY_SPEED = float(os.getenv('MCQ_REPLAY_SPEED', '1.0'))
+
+# Backend Client Configuration
+GEMINI_TRANSPORT = os.getenv('MCQ_GEMINI_TRANSPORT') or None
+WARMUP_ON_START = os.getenv('MCQ_WARMUP_ON_START', '0') == '1'
+BACKEND_HEALTH_PATH = os.getenv('MCQ_BACKEND_HEALTH_PATH', '.cache/backend_health.json')
+BACKEND_HEALTH_HEARTBEAT_SECONDS = float(os.getenv('MCQ_BACKEND_HEALTH_HEARTBEAT_SECONDS', '60'))
+
+# Fan-out Configuration
+MAX_QUESTIONS_COUNT = int(os.getenv('MCQ_MAX_QUESTIONS_COUNT', '20'))
+FANOUT_QUESTIONS_PER_CALL = int(os.getenv('MCQ_FANOUT_QUESTIONS_PER_CALL', '5'))
+FANOUT_MAX_WORKERS = int(os.getenv('MCQ_FANOUT_MAX_WORKERS', '8'))
+
+# Structured Output Configuration
+STRUCTURED_OUTPUT = os.getenv('MCQ_STRUCTURED_OUTPUT', '1') == '1'
+REPAIR_MAX_ROUNDS = int(os.getenv('MCQ_REPAIR_MAX_ROUNDS', '1'))
+
+# Question Bank Configuration
+BANK_ENABLED = os.getenv('MCQ_BANK_ENABLED', '1') == '1'
+BANK_DB_PATH = os.getenv('MCQ_BANK_DB_PATH', '.cache/question_bank.sqlite3')
+BANK_MIN_TOPIC_OVERLAP = float(os.getenv('MCQ_BANK_MIN_TOPIC_OVERLAP', '0.6'))
+
+# Near-Duplicate Configuration (a window of 0 only checks within each quiz)
+DEDUP_ENABLED = os.getenv('MCQ_DEDUP_ENABLED', '1') == '1'
+DEDUP_THRESHOLD = float(os.getenv('MCQ_DEDUP_THRESHOLD', '0.45'))
+DEDUP_WINDOW = int(os.getenv('MCQ_DEDUP_WINDOW', '5000'))
+DEDUP_RECENT_ACTION = os.getenv('MCQ_DEDUP_RECENT_ACTION', 'flag')
+
+# Scheduler Configuration (0 disables a limit)
+SCHEDULER_REQUESTS_PER_MINUTE = int(os.getenv('MCQ_SCHEDULER_REQUESTS_PER_MINUTE', '0'))
+SCHEDULER_TOKENS_PER_MINUTE = int(os.getenv('MCQ_SCHEDULER_TOKENS_PER_MINUTE', '0'))
+SCHEDULER_MAX_QUEUE = int(os.getenv('MCQ_SCHEDULER_MAX_QUEUE', '200'))
+SCHEDULER_TOKENS_PER_QUESTION = int(os.getenv('MCQ_SCHEDULER_TOKENS_PER_QUESTION', '250'))
+SCHEDULER_MAX_RETRIES = int(os.getenv('MCQ_SCHEDULER_MAX_RETRIES', '2'))
+INSTRUCTOR_KEY = os.getenv('MCQ_INSTRUCTOR_KEY', '')
+
+# Tail Latency Configuration
+HEDGING_ENABLED = os.getenv('MCQ_HEDGING_ENABLED', '1') == '1'
+HEDGE_MAX_RATIO = float(os.getenv('MCQ_HEDGE_MAX_RATIO', '0.1'))
+LATENCY_WINDOW_SIZE = int(os.getenv('MCQ_LATENCY_WINDOW_SIZE', '200'))
+LATENCY_MIN_SAMPLES = int(os.getenv('MCQ_LATENCY_MIN_SAMPLES', '20'))
+TIMEOUT_MULTIPLIER = float(os.getenv('MCQ_TIMEOUT_MULTIPLIER', '3'))
+LLM_MIN_TIMEOUT_SECONDS = float(os.getenv('MCQ_LLM_MIN_TIMEOUT_SECONDS', '10'))
+LLM_MAX_TIMEOUT_SECONDS = float(os.getenv('MCQ_LLM_MAX_TIMEOUT_SECONDS', '120'))
+
+# Tracing Configuration (an empty trace path or a metrics port of 0 disables that output)
+TRACE_ENABLED = os.getenv('MCQ_TRACE_ENABLED', '0') == '1'
+TRACE_PATH = os.getenv('MCQ_TRACE_PATH', '.cache/trace.jsonl')
+TRACE_MAX_BYTES = int(os.getenv('MCQ_TRACE_MAX_BYTES', str(10 * 1024 * 1024)))
+TRACE_BACKUPS = int(os.getenv('MCQ_TRACE_BACKUPS', '3'))
+METRICS_PORT = int(os.getenv('MCQ_METRICS_PORT', '0'))
@@ -0,0 +1,200 @@
+"""Near-duplicate detection for generated questions
+
+A question is reduced to a set of shingles:
+
+- the words and word pairs of its text
+- the words of its options
+
+The shingle set is summarised as a MinHash signature of NUM_PERM values. The
+fraction of positions where two signatures agree estimates the Jaccard
+similarity of their shingle sets. Two questions are near-duplicates when
+they have the same correct answer text and that estimate is at least the
+threshold. Requiring the same answer keeps apart questions that share a
+template but ask about different things.
+
+NearDuplicateIndex keeps the signatures of the most recent `capacity`
+questions in a NumPy ring buffer. Locality-sensitive hashing splits each
+signature into bands of BAND_ROWS values and files the question under one
+bucket per band. A lookup only compares the few questions that share a
+bucket, so it costs the same at a hundred entries as at hundreds of
+thousands. QuizDeduper applies both checks to one quiz. It drops repeats
+within the quiz, and drops or flags questions that match the recent window.
+"""
+import re
+import threading
+import time
+import zlib
+
+import numpy as np
+
+NUM_PERM = 48
+BAND_ROWS = 3
+BANDS = NUM_PERM // BAND_ROWS
+
+_WORD = re.compile(r"\w+")
+
+_rng = np.random.default_rng(0x5EED)
+# Multiply-shift hashing: odd 64-bit multipliers, keep the high 32 bits
+_PERM_A = _rng.integers(1, 2**63, NUM_PERM, dtype=np.uint64) | np.uint64(1)
+_PERM_B = _rng.integers(0, 2**63, NUM_PERM, dtype=np.uint64)
+_BAND_MIX = _rng.integers(1, 2**63, BAND_ROWS, dtype=np.uint64) | np.uint64(1)
+_BAND_INDEX = np.arange(BANDS)
+
+
+def shingles(question):
+    """Words and word pairs of the question text, plus the words of its options"""
+    words = _WORD.findall(str(question.get("question", "")).casefold())
+    items = set(words)
+    items.update(f"{a} {b}" for a, b in zip(words, words[1:]))
+    options = question.get("options")
+    if isinstance(options, dict):
+        for text in options.values():
+            items.update("o:" + word for word in _WORD.findall(str(text).casefold()))
+    return items
+
+
+def signature(question):
+    """MinHash signature of the question's shingles (NUM_PERM uint32 values)"""
+    hashes = np.fromiter(
+        (zlib.crc32(item.encode("utf-8")) for item in shingles(question)), dtype=np.uint64
+    )
+    if not hashes.size:
+        hashes = np.zeros(1, dtype=np.uint64)
+    values = (_PERM_A[:, None] * hashes + _PERM_B[:, None]) >> np.uint64(32)
+    return values.min(axis=1).astype(np.uint32)
+
+
+def answer_key(question):
+    """Hash of the normalized correct answer text"""
+    options = question.get("options")
+    correct = question.get("correct_answer")
+    text = options.get(correct, correct) if isinstance(options, dict) else correct
+    normalized = re.sub(r"[\W_]+", " ", str(text).casefold()).strip()
+    return zlib.crc32(normalized.encode("utf-8"))
+
+
+class NearDuplicateIndex:
+    """Signatures of the most recent `capacity` questions, searchable by LSH
+
+    Each band hashes to one bucket of `bucket_width` entries. A full bucket
+    overwrites its oldest entry, so a very crowded bucket may forget a match
+    that is still in the window. Entries hold int32 insertion numbers, which
+    cover 2**31 insertions. Memory is at most
+    `capacity * 4 * (NUM_PERM + 1 + 2 * BANDS * bucket_width)` bytes, because
+    the bucket table is rounded up to a power of two. At the defaults that is
+    about 2 MB for 5,000 questions and 36 MB for 100,000.
+    """
+
+    def __init__(self, capacity=5000, threshold=0.45, bucket_width=2):
+        self.capacity = capacity
+        self.threshold = threshold
+        bits = max(4, (capacity - 1).bit_length())
+        self._shift = np.uint64(64 - bits)
+        self._table = np.full((BANDS, 1 << bits, bucket_width), -1, dtype=np.int32)
+        self._signatures = np.zeros((capacity, NUM_PERM), dtype=np.uint32)
+        self._answers = np.zeros(capacity, dtype=np.uint32)
+        self._count = 0
+        self._lock = threading.Lock()
+        self.checked = 0
+        self.matches = 0
+        self.check_seconds = 0.0
+
+    def __len__(self):
+        return min(self._count, self.capacity)
+
+    def _buckets(self, sig):
+        keys = (sig.reshape(BANDS, BAND_ROWS).astype(np.uint64) * _BAND_MIX).sum(axis=1)
+        return (keys >> self._shift).astype(np.intp)
+
+    def _similarity_locked(self, sig, answer, buckets):
+        seqs = self._table[_BAND_INDEX, buckets].ravel()
+        # Empty entries are -1; entries older than the window point at reused slots
+        seqs = np.unique(seqs[seqs >= max(0, self._count - self.capacity)])
+        if not seqs.size:
+            return 0.0
+        slots = seqs % self.capacity
+        slots = slots[self._answers[slots] == answer]
+        if not slots.size:
+            return 0.0
+        return float((self._signatures[slots] == sig).mean(axis=1).max())
+
+    def _add_locked(self, sig, answer, buckets):
+        seq = self._count
+        slot = seq % self.capacity
+        self._signatures[slot] = sig
+        self._answers[slot] = answer
+        # argmin picks an empty entry (-1) first, otherwise the oldest one
+        column = self._table[_BAND_INDEX, buckets].argmin(axis=1)
+        self._table[_BAND_INDEX, buckets, column] = seq
+        self._count += 1
+
+    def seen_recently(self, sig, answer, add=True):
+        """True if a near-duplicate is in the window; the question is then added unless add=False"""
+        started = time.perf_counter()
+        buckets = self._buckets(sig)
+        with self._lock:
+            similarity = self._similarity_locked(sig, answer, buckets)
+            if add:
+                self._add_locked(sig, answer, buckets)
+            match = similarity >= self.threshold
+            self.checked += 1
+            self.matches += match
+            self.check_seconds += time.perf_counter() - started
+        return match
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self),
+                "capacity": self.capacity,
+                "checked": self.checked,
+                "recent_matches": self.matches,
+                "avg_check_us": round(self.check_seconds / self.checked * 1e6, 1) if self.checked else 0.0,
+            }
+
+
+class QuizDeduper:
+    """Near-duplicate filter for the questions of one quiz
+
+    Repeats within the quiz are dropped. A question matching the recent
+    window is dropped when `recent_action` is "drop". Otherwise it is kept
+    with near_duplicate=True. Pass metrics (an OutputMetrics) to count both.
+    """
+
+    def __init__(self, index=None, threshold=0.45, recent_action="flag", metrics=None):
+        self.index = index
+        self.threshold = threshold
+        self.recent_action = recent_action
+        self.metrics = metrics
+        self._signatures = []
+        self._answers = []
+
+    def _in_quiz(self, sig, answer):
+        same = [s for s, a in zip(self._signatures, self._answers) if a == answer]
+        if not same:
+            return False
+        return (np.vstack(same) == sig).mean(axis=1).max() >= self.threshold
+
+    def remember(self, question):
+        """Count a question (e.g. from the bank) as part of the quiz without checking it"""
+        self._signatures.append(signature(question))
+        self._answers.append(answer_key(question))
+
+    def filter(self, question):
+        """The question to keep, flagged if seen recently, or None to drop it"""
+        sig, answer = signature(question), answer_key(question)
+        if self._in_quiz(sig, answer):
+            if self.metrics is not None:
+                self.metrics.count(near_duplicates_dropped=1)
+            return None
+        self._signatures.append(sig)
+        self._answers.append(answer)
+        if self.index is None or not self.index.seen_recently(sig, answer):
+            return question
+        if self.recent_action == "drop":
+            if self.metrics is not None:
+                self.metrics.count(near_duplicates_dropped=1)
+            return None
+        if self.metrics is not None:
+            self.metrics.count(near_duplicates_flagged=1)
+        return dict(question, near_duplicate=True)
@@ -0,0 +1,173 @@
+"""Split large question counts into concurrent sub-requests
+
+A quiz of N questions becomes ceil(N / per_call) sub-requests, each over one
+contiguous partition of the topic list. The partial quizzes are merged in
+partition order and de-duplicated, so wall-clock time tracks the slowest
+sub-request rather than the total question count.
+"""
+import queue
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import tracing
+from mcq_prompt import build_prompt
+from mcq_schema import parse_response
+from mcq_stream import stream_questions
+
+
+def split_counts(num_questions, per_call):
+    """Spread num_questions over as few calls as possible, as evenly as possible"""
+    calls = max(1, -(-num_questions // per_call))
+    base, extra = divmod(num_questions, calls)
+    return [base + (1 if i < extra else 0) for i in range(calls)]
+
+
+def partition_topics(lecture_topics, parts):
+    """Split topic lines into `parts` contiguous chunks of similar length
+
+    Returns None when there are fewer lines than parts, in which case every
+    sub-request works from the full topic list.
+    """
+    lines = [line for line in lecture_topics.splitlines() if line.strip()]
+    if parts <= 1 or len(lines) < parts:
+        return None
+
+    target = sum(len(line) for line in lines) / parts
+    chunks, current, size = [], [], 0
+    for index, line in enumerate(lines):
+        current.append(line)
+        size += len(line)
+        remaining_lines = len(lines) - index - 1
+        remaining_parts = parts - len(chunks) - 1
+        if remaining_parts and (size >= target or remaining_lines == remaining_parts):
+            chunks.append("\n".join(current))
+            current, size = [], 0
+    chunks.append("\n".join(current))
+    return chunks
+
+
+def plan_subrequests(lecture_topics, ai_instructions, num_questions, per_call):
+    """Return one prompt per sub-request"""
+    counts = split_counts(num_questions, per_call)
+    partitions = partition_topics(lecture_topics, len(counts))
+    prompts = []
+    for index, count in enumerate(counts):
+        if partitions is not None:
+            topics, instructions = partitions[index], ai_instructions
+        else:
+            # Same topics for every call: steer each one to different concepts
+            topics = lecture_topics
+            hint = (f"This is batch {index + 1} of {len(counts)}; "
+                    "cover different concepts than the other batches.")
+            instructions = f"{ai_instructions.strip()}\n{hint}".strip()
+        prompts.append(build_prompt(topics, instructions, count))
+    return prompts
+
+
+def question_fingerprint(question):
+    """Normalized question text used to drop exact duplicates"""
+    text = str(question.get("question", "")).casefold()
+    return re.sub(r"[\W_]+", " ", text).strip()
+
+
+class QuestionMerger:
+    """Accumulates questions in order, skipping duplicates, up to a limit"""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.questions = []
+        self.duplicates = 0
+        self._seen = set()
+
+    @property
+    def full(self):
+        return len(self.questions) >= self.limit
+
+    def add(self, question):
+        """Add one question; return True if it was kept"""
+        if self.full or not isinstance(question, dict):
+            return False
+        fingerprint = question_fingerprint(question)
+        if fingerprint in self._seen:
+            self.duplicates += 1
+            return False
+        self._seen.add(fingerprint)
+        self.questions.append(question)
+        return True
+
+
+def merge_results(results, num_questions):
+    """Merge parsed sub-request results (in partition order) into one quiz"""
+    merger = QuestionMerger(num_questions)
+    for mcqs in results:
+        for question in (mcqs or {}).get("questions", []):
+            merger.add(question)
+    return merger
+
+
+def _generate_part(backend, prompt, response_schema, metrics):
+    with tracing.span("llm_call"):
+        text = backend.generate(prompt, response_schema=response_schema)
+    with tracing.span("parse"):
+        return parse_response(text, metrics)
+
+
+def generate_fanout(backend, lecture_topics, ai_instructions, num_questions, per_call,
+                    max_workers=8, response_schema=None, metrics=None):
+    """Generate a large quiz with concurrent sub-requests on a thread pool"""
+    prompts = plan_subrequests(lecture_topics, ai_instructions, num_questions, per_call)
+    results = [None] * len(prompts)
+    errors = []
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(prompts))) as pool:
+        futures = {
+            pool.submit(tracing.bind(_generate_part), backend, p, response_schema, metrics): i
+            for i, p in enumerate(prompts)
+        }
+        for future in as_completed(futures):
+            try:
+                results[futures[future]] = future.result()
+            except Exception as e:
+                errors.append(e)
+
+    merger = merge_results(results, num_questions)
+    if not merger.questions and errors:
+        raise errors[0]
+    return {"questions": merger.questions}
+
+
+_DONE = object()
+
+
+def stream_fanout(backend, lecture_topics, ai_instructions, num_questions, per_call,
+                  response_schema=None, metrics=None):
+    """Yield questions from concurrent streamed sub-requests as they complete"""
+    prompts = plan_subrequests(lecture_topics, ai_instructions, num_questions, per_call)
+    results = queue.Queue()
+
+    def run(prompt):
+        try:
+            for question in stream_questions(backend, prompt, response_schema, metrics):
+                results.put(question)
+        except Exception as e:
+            results.put(e)
+        finally:
+            results.put(_DONE)
+
+    for prompt in prompts:
+        threading.Thread(target=tracing.bind(run), args=(prompt,), daemon=True).start()
+
+    merger = QuestionMerger(num_questions)
+    errors = []
+    running = len(prompts)
+    while running and not merger.full:
+        item = results.get()
+        if item is _DONE:
+            running -= 1
+        elif isinstance(item, Exception):
+            errors.append(item)
+        elif merger.add(item):
+            yield item
+
+    if not merger.questions and errors:
+        raise errors[0]
@@ -0,0 +1,267 @@
+"""The quiz generation pipeline shared by the app and the batch CLI
+
+A request is filled from the question bank first. The shortfall comes from
+the MCQ cache or the LLM, fanned out into sub-requests for large quizzes.
+Invalid questions, near-duplicates and any a response left out are replaced
+by one targeted repair call. New questions are stored back in the bank, and
+a full quiz is cached. Nothing here uses Streamlit: app.py hands in the
+helpers it resolved on the script thread, and batch_generate.py builds its own.
+"""
+import config
+from dedup import QuizDeduper
+from fanout import generate_fanout, question_fingerprint, stream_fanout
+from mcq_cache import make_cache_key
+from mcq_prompt import SYSTEM_PROMPT, build_prompt
+from mcq_schema import (
+    MCQ_RESPONSE_SCHEMA, parse_response, repair_questions, shortfall, validate_and_repair,
+    validate_question,
+)
+from mcq_stream import stream_questions
+import tracing
+
+# Why a dropped near-duplicate is sent to repair_questions
+DUPLICATE_PROBLEM = "too similar to another question; ask about a different point"
+
+
+class GenerationResources:
+    """The process-wide helpers a generation uses
+
+    Any of them may be None: no cache, no bank, no metrics, no health
+    registry to mark warm, no coalescing, or no recent-question window.
+    """
+
+    def __init__(self, cache=None, bank=None, metrics=None, registry=None, single_flight=None,
+                 dedup_index=None):
+        self.cache = cache
+        self.bank = bank
+        self.metrics = metrics
+        self.registry = registry
+        self.single_flight = single_flight
+        self.dedup_index = dedup_index
+
+    def deduper(self):
+        """Near-duplicate filter for one new quiz, or None when disabled"""
+        if not config.DEDUP_ENABLED:
+            return None
+        return QuizDeduper(self.dedup_index, config.DEDUP_THRESHOLD, config.DEDUP_RECENT_ACTION,
+                           self.metrics)
+
+
+def response_schema():
+    """Schema to constrain backend output with, or None when disabled"""
+    return MCQ_RESPONSE_SCHEMA if config.STRUCTURED_OUTPUT else None
+
+
+def request_key(lecture_topics, ai_instructions, model_name, num_questions):
+    """Normalized key shared by the cache and single-flight layers"""
+    return make_cache_key(SYSTEM_PROMPT, lecture_topics, ai_instructions, model_name, num_questions)
+
+
+def generate_quiz(lecture_topics, ai_instructions, num_questions, backend, resources):
+    """Generate MCQs, sharing one call among concurrent identical requests; raises on failure"""
+    if resources.single_flight is None:
+        return build_quiz(lecture_topics, ai_instructions, num_questions, backend, resources)
+    key = request_key(lecture_topics, ai_instructions, backend.model_name, num_questions)
+    return resources.single_flight.do(
+        key, lambda: build_quiz(lecture_topics, ai_instructions, num_questions, backend, resources)
+    )
+
+
+def earlier_questions(earlier_sets):
+    """The questions of a session's earlier practice sets, flattened"""
+    return [question for questions in earlier_sets for question in questions]
+
+
+def build_quiz(lecture_topics, ai_instructions, num_questions, backend, resources, earlier_sets=()):
+    """Fill from the question bank before calling the LLM; raises on failure
+
+    Banked questions already served in `earlier_sets` are skipped. May run on
+    behalf of other sessions, so errors are raised instead of shown.
+    """
+    bank = resources.bank
+    with tracing.span("bank_lookup"):
+        banked = (bank.find_questions(lecture_topics, num_questions, earlier_questions(earlier_sets),
+                                      ai_instructions)
+                  if bank is not None else [])
+    if len(banked) >= num_questions:
+        return {'questions': banked}
+
+    deduper = resources.deduper()
+    if deduper is not None:
+        for question in banked:
+            deduper.remember(question)
+    # Only the shortfall goes to the LLM
+    try:
+        mcqs = generate_llm_mcqs(lecture_topics, ai_instructions, num_questions - len(banked), backend,
+                                 resources, deduper)
+    except Exception:
+        if banked:
+            return {'questions': banked}
+        raise
+
+    seen = {question_fingerprint(q) for q in banked}
+    new_questions = [q for q in mcqs['questions'] if question_fingerprint(q) not in seen]
+    if bank is not None:
+        bank.add_questions(new_questions, lecture_topics, ai_instructions)
+    return {'questions': banked + new_questions}
+
+
+def generate_llm_mcqs(lecture_topics, ai_instructions, num_questions, backend, resources, deduper=None):
+    """Generate MCQs using the configured LLM backend; raises on failure
+
+    Fresh questions pass through `deduper` (a QuizDeduper); cached ones were filtered when generated.
+    """
+    cache = resources.cache
+    metrics = resources.metrics
+    cache_key = request_key(lecture_topics, ai_instructions, backend.model_name, num_questions)
+    if cache is not None:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    if num_questions > config.FANOUT_QUESTIONS_PER_CALL:
+        # Large quizzes are split into concurrent sub-requests
+        with tracing.span("fanout", questions=num_questions):
+            mcqs = generate_fanout(
+                backend, lecture_topics, ai_instructions, num_questions,
+                config.FANOUT_QUESTIONS_PER_CALL, config.FANOUT_MAX_WORKERS,
+                response_schema(), metrics,
+            )
+    else:
+        with tracing.span("prompt"):
+            prompt = build_prompt(lecture_topics, ai_instructions, num_questions)
+        with tracing.span("llm_call", questions=num_questions):
+            response_text = backend.generate(prompt, response_schema=response_schema())
+        with tracing.span("parse"):
+            mcqs = parse_response(response_text, metrics)
+
+    if resources.registry is not None:
+        resources.registry.mark_warm(backend)
+
+    # Regenerate only the questions that fail local validation
+    with tracing.span("validate"):
+        mcqs = {'questions': validate_and_repair(
+            backend, lecture_topics, ai_instructions, mcqs['questions'], metrics,
+            response_schema(), config.REPAIR_MAX_ROUNDS, expected=num_questions,
+        )}
+    if deduper is not None:
+        with tracing.span("dedup", questions=len(mcqs['questions'])):
+            questions, duplicates = dedup_questions(deduper, mcqs['questions'])
+        if duplicates:
+            # Dropped near-duplicates are replaced by the same targeted call as invalid questions
+            with tracing.span("repair", questions=len(duplicates)):
+                replacements = repair_questions(backend, lecture_topics, ai_instructions, duplicates,
+                                                metrics, response_schema(), config.REPAIR_MAX_ROUNDS)
+            questions += dedup_questions(deduper, replacements)[0]
+        mcqs = {'questions': questions}
+    # A short quiz is served but not cached, so the next request tries again
+    if cache is not None and len(mcqs['questions']) >= num_questions:
+        cache.set(cache_key, mcqs)
+    return mcqs
+
+
+def dedup_questions(deduper, questions):
+    """(kept, dropped) where dropped are (question, problems) pairs ready for repair_questions"""
+    kept, dropped = [], []
+    for question in questions:
+        filtered = deduper.filter(question)
+        if filtered is None:
+            dropped.append((question, [DUPLICATE_PROBLEM]))
+        else:
+            kept.append(filtered)
+    return kept, dropped
+
+
+def whole_quiz_questions(lecture_topics, ai_instructions, num_questions, backend, resources, earlier_sets=()):
+    """Yield the questions of a quiz generated in one piece (streaming disabled)"""
+    quiz = build_quiz(lecture_topics, ai_instructions, num_questions, backend, resources, earlier_sets)
+    yield from quiz['questions']
+
+
+def stream_mcqs(lecture_topics, ai_instructions, backend, cache=None,
+                num_questions=config.DEFAULT_QUESTIONS_COUNT, metrics=None, bank=None, deduper=None,
+                earlier_sets=()):
+    """Yield banked MCQs immediately, then stream the shortfall from the LLM
+
+    Streamed questions that `deduper` (a QuizDeduper) rejects are skipped, and
+    so are banked questions already served in `earlier_sets`.
+
+    Runs off the script thread, so errors are raised instead of shown with st.error.
+    """
+    with tracing.span("bank_lookup"):
+        banked = (bank.find_questions(lecture_topics, num_questions, earlier_questions(earlier_sets),
+                                      ai_instructions)
+                  if bank is not None else [])
+    yield from banked
+    if len(banked) >= num_questions:
+        return
+
+    seen = {question_fingerprint(q) for q in banked}
+    if deduper is not None:
+        for question in banked:
+            deduper.remember(question)
+    new_questions = []
+    try:
+        for question in stream_llm_mcqs(lecture_topics, ai_instructions, backend, cache,
+                                        num_questions - len(banked), metrics, deduper):
+            if question_fingerprint(question) in seen:
+                continue
+            new_questions.append(question)
+            yield question
+    finally:
+        if bank is not None and new_questions:
+            bank.add_questions(new_questions, lecture_topics, ai_instructions)
+
+
+def stream_llm_mcqs(lecture_topics, ai_instructions, backend, cache, num_questions, metrics, deduper=None):
+    """Yield MCQs one at a time as the streamed response completes them"""
+    cache_key = request_key(lecture_topics, ai_instructions, backend.model_name, num_questions)
+    if cache is not None:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            yield from cached['questions']
+            return
+
+    schema = response_schema()
+    if num_questions > config.FANOUT_QUESTIONS_PER_CALL:
+        source = stream_fanout(backend, lecture_topics, ai_instructions, num_questions,
+                               config.FANOUT_QUESTIONS_PER_CALL, schema, metrics)
+    else:
+        with tracing.span("prompt"):
+            prompt = build_prompt(lecture_topics, ai_instructions, num_questions)
+        source = stream_questions(backend, prompt, schema, metrics)
+
+    # Invalid questions, near-duplicates and any the stream left out are replaced once it ends
+    questions = []
+    rejected = []
+    for question in source:
+        problems = validate_question(question)
+        if metrics is not None:
+            metrics.count(questions_checked=1, invalid_questions=1 if problems else 0)
+        if problems:
+            rejected.append((question, problems))
+            continue
+        if deduper is not None:
+            filtered = deduper.filter(question)
+            if filtered is None:
+                rejected.append((question, [DUPLICATE_PROBLEM]))
+                continue
+            question = filtered
+        questions.append(question)
+        yield question
+
+    rejected += shortfall(num_questions - len(questions) - len(rejected), metrics)
+    if rejected:
+        with tracing.span("repair", questions=len(rejected)):
+            repaired = list(repair_questions(backend, lecture_topics, ai_instructions, rejected,
+                                             metrics, schema, config.REPAIR_MAX_ROUNDS))
+        for question in repaired:
+            if deduper is not None:
+                question = deduper.filter(question)
+                if question is None:
+                    continue
+            questions.append(question)
+            yield question
+
+    if cache is not None and len(questions) >= num_questions:
+        cache.set(cache_key, {'questions': questions})
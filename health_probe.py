@@ -0,0 +1,43 @@
+"""Report whether the running app's LLM connection pool is warm
+
+Reads the health file the app's BackendRegistry keeps up to date and exits 0
+when every backend is warm, so it can serve as a container readiness probe.
+The app rewrites the file every MCQ_BACKEND_HEALTH_HEARTBEAT_SECONDS (default
+60), so `--max-age` well above that catches a process that has stopped.
+
+    python health_probe.py            # exit 1 while cold
+    python health_probe.py --max-age 600
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import config
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check LLM backend warm state")
+    parser.add_argument("--path", default=config.BACKEND_HEALTH_PATH, help="health file to read")
+    parser.add_argument("--max-age", type=float,
+                        help="fail if the health file was last written more than this many seconds ago")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.path):
+        print(json.dumps({"warm": False, "error": "no health file; the app has not started a session yet"}))
+        return 1
+
+    with open(args.path, encoding="utf-8") as f:
+        health = json.load(f)
+    age = time.time() - os.path.getmtime(args.path)
+    health["age_seconds"] = round(age, 1)
+    print(json.dumps(health, indent=2))
+
+    if args.max_age is not None and age > args.max_age:
+        return 1
+    return 0 if health.get("warm") else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,329 @@
+"""Adaptive deadlines and hedged requests for tail-latency control
+
+HedgedBackend keeps a rolling window of observed latencies for each requested
+question count. Once a window has enough samples:
+
+* every call gets a deadline of p99 x `timeout_multiplier`, clamped to
+  [min_timeout, max_timeout], after which it fails with BackendError;
+* a call still running after p95 gets one hedged duplicate, and the first
+  valid response wins.
+
+Hedges are capped at `max_hedge_ratio` of all calls so a slow backend is not
+hit with twice the load. `allow_hedge(prompt)` is asked last and may veto a
+hedge; below a RequestScheduler it takes the hedge's quota (see
+RequestScheduler.hedge_gate), so duplicates are counted against the limits.
+The losing call is cancelled where the transport allows it: asyncio tasks
+are cancelled, and a losing stream is closed at its next chunk. A blocking
+generate() cannot be interrupted, so the loser runs until its own timeout
+and its result is discarded.
+"""
+import asyncio
+import collections
+import queue
+import threading
+import time
+
+import tracing
+from llm_backends import BackendError, LLMBackend
+from mcq_prompt import requested_count
+from mcq_schema import parse_response
+
+
+class LatencyWindow:
+    """The most recent `size` latencies, in seconds"""
+
+    def __init__(self, size=200):
+        self._samples = collections.deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self):
+        return len(self._samples)
+
+    def percentile(self, pct):
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        index = min(len(samples) - 1, max(0, round(pct / 100 * len(samples)) - 1))
+        return samples[index]
+
+
+def is_valid_response(text):
+    """True when text parses into an MCQ response with a questions list"""
+    try:
+        parse_response(text)
+    except Exception:
+        return False
+    return True
+
+
+_DONE = object()
+
+
+class HedgedBackend(LLMBackend):
+    """Backend wrapper that applies adaptive deadlines and hedges slow calls"""
+
+    def __init__(self, backend, window_size=200, min_samples=20, max_hedge_ratio=0.1,
+                 timeout_multiplier=3.0, min_timeout=10.0, max_timeout=120.0,
+                 allow_hedge=None, validate=is_valid_response):
+        self.backend = backend
+        self.name = backend.name
+        self.model_name = backend.model_name
+        self.window_size = window_size
+        self.min_samples = min_samples
+        self.max_hedge_ratio = max_hedge_ratio
+        self.timeout_multiplier = timeout_multiplier
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.allow_hedge = allow_hedge
+        self.validate = validate
+        self._lock = threading.Lock()
+        self._windows = {}
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.timeouts = 0
+
+    def _window(self, key):
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None:
+                window = self._windows[key] = LatencyWindow(self.window_size)
+            return window
+
+    def plan(self, key):
+        """(hedge_after, deadline) in seconds for a call in window `key`
+
+        hedge_after is None until the window has `min_samples` samples.
+        """
+        window = self._window(key)
+        if len(window) < self.min_samples:
+            return None, self.max_timeout
+        deadline = window.percentile(99) * self.timeout_multiplier
+        deadline = min(self.max_timeout, max(self.min_timeout, deadline))
+        return window.percentile(95), deadline
+
+    def _may_hedge(self, prompt):
+        with self._lock:
+            if self.hedges + 1 > self.max_hedge_ratio * self.calls:
+                return False
+        # Asked only once the ratio allows a hedge, since it may take quota
+        if self.allow_hedge is not None and not self.allow_hedge(prompt):
+            return False
+        with self._lock:
+            self.hedges += 1
+            return True
+
+    def _count(self, **increments):
+        with self._lock:
+            for name, value in increments.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def _timed_out(self, deadline):
+        self._count(timeouts=1)
+        return BackendError(f"LLM call timed out after {deadline:.1f}s")
+
+    def generate(self, prompt, response_schema=None):
+        key = ("generate", requested_count(prompt))
+        hedge_after, deadline = self.plan(key)
+        self._count(calls=1)
+        results = queue.Queue()
+
+        def attempt(hedge):
+            started = time.perf_counter()
+            try:
+                text = self.backend.generate(prompt, response_schema=response_schema)
+            except Exception as e:
+                results.put((hedge, None, e))
+                return
+            self._window(key).add(time.perf_counter() - started)
+            results.put((hedge, text, None))
+
+        started = time.monotonic()
+        threading.Thread(target=tracing.bind(attempt), args=(False,), daemon=True).start()
+        pending, fallback, error = 1, None, None
+        while pending:
+            elapsed = time.monotonic() - started
+            wake = hedge_after if hedge_after is not None else deadline
+            try:
+                hedge, text, e = results.get(timeout=max(0.0, wake - elapsed))
+            except queue.Empty:
+                if hedge_after is not None:
+                    if self._may_hedge(prompt):
+                        threading.Thread(target=tracing.bind(attempt), args=(True,), daemon=True).start()
+                        pending += 1
+                    hedge_after = None
+                    continue
+                raise self._timed_out(deadline)
+            pending -= 1
+            if e is not None:
+                error = error or e
+            elif self.validate(text):
+                if hedge:
+                    self._count(hedge_wins=1)
+                return text
+            else:
+                fallback = fallback if fallback is not None else text
+        # Nothing valid came back: let the caller parse, repair or report what did
+        if fallback is not None:
+            return fallback
+        raise error
+
+    async def generate_async(self, prompt, response_schema=None):
+        key = ("generate", requested_count(prompt))
+        hedge_after, deadline = self.plan(key)
+        self._count(calls=1)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+
+        async def attempt():
+            begun = loop.time()
+            text = await self.backend.generate_async(prompt, response_schema=response_schema)
+            self._window(key).add(loop.time() - begun)
+            return text
+
+        primary = asyncio.ensure_future(attempt())
+        tasks = {primary}
+        fallback, error = None, None
+        try:
+            while tasks:
+                wake = hedge_after if hedge_after is not None else deadline
+                done, _ = await asyncio.wait(
+                    tasks, timeout=max(0.0, wake - (loop.time() - started)),
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    if hedge_after is not None:
+                        if self._may_hedge(prompt):
+                            tasks.add(asyncio.ensure_future(attempt()))
+                        hedge_after = None
+                        continue
+                    raise self._timed_out(deadline)
+                for task in done:
+                    tasks.discard(task)
+                    if task.exception() is not None:
+                        error = error or task.exception()
+                    elif self.validate(task.result()):
+                        if task is not primary:
+                            self._count(hedge_wins=1)
+                        return task.result()
+                    elif fallback is None:
+                        fallback = task.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+        if fallback is not None:
+            return fallback
+        raise error
+
+    def stream(self, prompt, response_schema=None):
+        """Hedge on time to first chunk, then follow whichever stream started first"""
+        key = ("first_chunk", requested_count(prompt))
+        hedge_after, deadline = self.plan(key)
+        _, total_deadline = self.plan(("generate", requested_count(prompt)))
+        self._count(calls=1)
+        chunks = queue.Queue()
+        cancelled = {}
+
+        def attempt(hedge, stop):
+            begun = time.perf_counter()
+            first = True
+            try:
+                for chunk in self.backend.stream(prompt, response_schema=response_schema):
+                    # Leaving the loop closes the losing stream's connection
+                    if stop.is_set():
+                        return
+                    if first:
+                        self._window(key).add(time.perf_counter() - begun)
+                        first = False
+                    chunks.put((hedge, chunk))
+            except Exception as e:
+                chunks.put((hedge, e))
+            finally:
+                chunks.put((hedge, _DONE))
+
+        def launch(hedge):
+            cancelled[hedge] = threading.Event()
+            threading.Thread(
+                target=tracing.bind(attempt), args=(hedge, cancelled[hedge]), daemon=True
+            ).start()
+
+        started = time.monotonic()
+        launch(False)
+        running, winner, error = {False}, None, None
+        try:
+            while True:
+                elapsed = time.monotonic() - started
+                if winner is None:
+                    wake = hedge_after if hedge_after is not None else deadline
+                else:
+                    wake = total_deadline
+                try:
+                    source, item = chunks.get(timeout=max(0.0, wake - elapsed))
+                except queue.Empty:
+                    if winner is None and hedge_after is not None:
+                        if self._may_hedge(prompt):
+                            launch(True)
+                            running.add(True)
+                        hedge_after = None
+                        continue
+                    raise self._timed_out(wake)
+
+                if winner is not None and source != winner:
+                    continue
+                if item is _DONE:
+                    running.discard(source)
+                    if winner is not None or not running:
+                        break
+                elif isinstance(item, Exception):
+                    if winner is not None:
+                        raise item
+                    error = error or item
+                else:
+                    if winner is None:
+                        winner = source
+                        for other, stop in cancelled.items():
+                            if other != winner:
+                                stop.set()
+                        if winner:
+                            self._count(hedge_wins=1)
+                    yield item
+            if winner is None and error is not None:
+                raise error
+        finally:
+            # Stop every attempt, including the winner if the caller stopped early
+            for stop in cancelled.values():
+                stop.set()
+
+    def warm_up(self):
+        return self.backend.warm_up()
+
+    def stats(self):
+        with self._lock:
+            windows = dict(self._windows)
+            stats = {
+                "calls": self.calls,
+                "hedges": self.hedges,
+                "hedge_ratio": round(self.hedges / self.calls, 4) if self.calls else 0.0,
+                "hedge_wins": self.hedge_wins,
+                "timeouts": self.timeouts,
+            }
+        for (kind, count), window in sorted(windows.items(), key=lambda item: str(item[0])):
+            hedge_after, deadline = self.plan((kind, count))
+            stats[f"{kind}_{count}q"] = {
+                "samples": len(window),
+                "p50_s": _round(window.percentile(50)),
+                "p95_s": _round(window.percentile(95)),
+                "p99_s": _round(window.percentile(99)),
+                "hedge_after_s": _round(hedge_after),
+                "deadline_s": _round(deadline),
+            }
+        return stats
+
+
+def _round(value):
+    return round(value, 3) if value is not None else None
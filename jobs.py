@@ -0,0 +1,49 @@
+"""Shared worker pool for quiz generation jobs
+
+Generation runs here instead of on a session's script thread. The session
+keeps the job handle (a StreamingQuiz) in st.session_state and polls it from
+a fragment, so a slow LLM call never holds a script-runner thread.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import tracing
+
+
+class JobExecutor:
+    """Bounded thread pool with queued/running/finished counters"""
+
+    def __init__(self, max_workers=16):
+        self.max_workers = max_workers
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="mcq-job")
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.running = 0
+        self.finished = 0
+
+    def submit(self, fn, *args):
+        with self._lock:
+            self.submitted += 1
+        return self._pool.submit(tracing.bind(self._run), fn, args)
+
+    def _run(self, fn, args):
+        with self._lock:
+            self.running += 1
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self.running -= 1
+                self.finished += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "queued": self.submitted - self.running - self.finished,
+                "running": self.running,
+                "finished": self.finished,
+            }
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait)
@@ -0,0 +1,499 @@
+"""LLM backends that generate_mcqs calls into
+
+Every backend turns a prompt into response text. `stream` yields the text in
+chunks and `generate_async` can be awaited on an event loop; both fall back to
+`generate` when a backend has nothing better. Backends that support
+structured output constrain their reply to `response_schema` when given one.
+"""
+import asyncio
+import json
+import logging
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import tracing
+from mcq_prompt import MODEL_NAME, requested_count
+
+logger = logging.getLogger(__name__)
+
+_usage = threading.local()
+
+
+def take_usage():
+    """(prompt_tokens, output_tokens) of this thread's last SDK response, then forget it"""
+    usage = getattr(_usage, "value", None)
+    _usage.value = None
+    return usage
+
+
+class BackendError(RuntimeError):
+    """Raised when a backend fails to produce a response"""
+
+
+class RateLimitError(BackendError):
+    """Raised when the backend rejects a call for exceeding its quota"""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class LLMBackend:
+    """Base class for text generation backends"""
+
+    name = "base"
+    model_name = None
+
+    def generate(self, prompt, response_schema=None):
+        raise NotImplementedError
+
+    def stream(self, prompt, response_schema=None):
+        yield self.generate(prompt, response_schema)
+
+    async def generate_async(self, prompt, response_schema=None):
+        return await asyncio.to_thread(self.generate, prompt, response_schema)
+
+    def warm_up(self):
+        """Open connections ahead of the first real request"""
+
+
+class GeminiBackend(LLMBackend):
+    """Google AI Studio (Gemini) backend"""
+
+    name = "gemini"
+
+    def __init__(self, api_key, model_name=MODEL_NAME, transport=None, timeout=None):
+        if not api_key:
+            raise BackendError("Google API key not found. Please set GOOGLE_API_KEY in your environment variables.")
+        import google.generativeai as genai
+
+        # The SDK keeps one client (and its connection pool) per process after this
+        if transport:
+            genai.configure(api_key=api_key, transport=transport)
+        else:
+            genai.configure(api_key=api_key)
+        self.model_name = model_name
+        self.model = genai.GenerativeModel(model_name)
+        # generate_content waits indefinitely unless given a timeout
+        self.request_options = {"timeout": timeout} if timeout else None
+
+    @staticmethod
+    def _generation_config(response_schema):
+        if response_schema is None:
+            return None
+        return {"response_mime_type": "application/json", "response_schema": response_schema}
+
+    @staticmethod
+    def _record_usage(response):
+        usage = getattr(response, "usage_metadata", None)
+        if usage is not None:
+            _usage.value = (usage.prompt_token_count, usage.candidates_token_count)
+            tracing.add_tokens(*_usage.value)
+
+    def generate(self, prompt, response_schema=None):
+        generation_config = self._generation_config(response_schema)
+        response = self.model.generate_content(
+            prompt, generation_config=generation_config, request_options=self.request_options
+        )
+        self._record_usage(response)
+        return response.text
+
+    def stream(self, prompt, response_schema=None):
+        generation_config = self._generation_config(response_schema)
+        chunk = None
+        for chunk in self.model.generate_content(
+            prompt, generation_config=generation_config, stream=True,
+            request_options=self.request_options,
+        ):
+            yield chunk.text
+        # The final chunk carries the usage for the whole response
+        self._record_usage(chunk)
+
+    async def generate_async(self, prompt, response_schema=None):
+        generation_config = self._generation_config(response_schema)
+        response = await self.model.generate_content_async(
+            prompt, generation_config=generation_config, request_options=self.request_options
+        )
+        self._record_usage(response)
+        return response.text
+
+    def warm_up(self):
+        # count_tokens is a cheap authenticated round trip that generates nothing
+        self.model.count_tokens("warm-up")
+
+
+# Canned quiz served by the mock backend when no topics can be found in the prompt
+DUMMY_MCQS = [
+    {
+        "question": "What is the capital of France?",
+        "options": {
+            "A": "Berlin",
+            "B": "Madrid",
+            "C": "Paris",
+            "D": "Rome"
+        },
+        "correct_answer": "C",
+        "explanation": "Paris is the capital and most populous city of France."
+    },
+    {
+        "question": "Which element has the chemical symbol 'O'?",
+        "options": {
+            "A": "Gold",
+            "B": "Oxygen",
+            "C": "Silver",
+            "D": "Iron"
+        },
+        "correct_answer": "B",
+        "explanation": "'O' is the chemical symbol for Oxygen."
+    },
+    {
+        "question": "What is 2 + 2?",
+        "options": {
+            "A": "3",
+            "B": "4",
+            "C": "5",
+            "D": "22"
+        },
+        "correct_answer": "B",
+        "explanation": "2 + 2 equals 4."
+    }
+]
+
+
+class MockBackend(LLMBackend):
+    """Offline stand-in that returns canned or templated quizzes
+
+    Latency is `latency` seconds plus uniform jitter of up to +/- `jitter`.
+    `error_rate` is the fraction of calls that raise BackendError,
+    `malformed_rate` the fraction that return truncated, unparseable JSON and
+    `invalid_rate` the fraction of questions whose correct_answer is not an option.
+    """
+
+    name = "mock"
+
+    def __init__(self, latency=1.0, jitter=0.0, error_rate=0.0, malformed_rate=0.0,
+                 mode="template", chunk_count=8, seed=None, invalid_rate=0.0):
+        self.model_name = f"mock-{mode}"
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.malformed_rate = malformed_rate
+        self.invalid_rate = invalid_rate
+        self.mode = mode
+        self.chunk_count = max(1, chunk_count)
+        self.random = random.Random(seed)
+
+    def _delay(self):
+        return max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+
+    def _respond(self, prompt):
+        """Pick the outcome for one call: (delay, text) or raise"""
+        delay = self._delay()
+        roll = self.random.random()
+        if roll < self.error_rate:
+            time.sleep(delay)
+            raise BackendError("Mock backend injected error")
+        questions = self.build_questions(prompt)
+        for i, question in enumerate(questions):
+            if self.random.random() < self.invalid_rate:
+                questions[i] = dict(question, correct_answer="E")
+        text = json.dumps({"questions": questions}, indent=2)
+        if roll < self.error_rate + self.malformed_rate:
+            text = text[:len(text) // 2]
+        return delay, text
+
+    def generate(self, prompt, response_schema=None):
+        delay, text = self._respond(prompt)
+        time.sleep(delay)
+        return text
+
+    def stream(self, prompt, response_schema=None):
+        delay, text = self._respond(prompt)
+        size = -(-len(text) // self.chunk_count)
+        for i in range(0, len(text), size):
+            time.sleep(delay / self.chunk_count)
+            yield text[i:i + size]
+
+    async def generate_async(self, prompt, response_schema=None):
+        delay, text = self._respond(prompt)
+        await asyncio.sleep(delay)
+        return text
+
+    def build_questions(self, prompt):
+        count = _question_count(prompt)
+        topics = _topics_from_prompt(prompt)
+        if self.mode == "canned" or not topics:
+            return [DUMMY_MCQS[i % len(DUMMY_MCQS)] for i in range(count)]
+
+        questions = []
+        for i in range(count):
+            topic = topics[i % len(topics)]
+            variant = f" (variant {i // len(topics) + 1})" if i >= len(topics) else ""
+            others = [t for t in topics if t != topic]
+            others = others[i % len(others):] + others[:i % len(others)] if others else []
+            fillers = [f"A topic not covered in this lecture ({k})" for k in range(1, 4)]
+            distractors = (others + fillers)[:3]
+            correct = "ABCD"[i % 4]
+            choices = distractors[:]
+            choices.insert("ABCD".index(correct), topic)
+            questions.append({
+                "question": f"Which lecture topic begins with '{topic[:16]}'?{variant}",
+                "options": dict(zip("ABCD", choices)),
+                "correct_answer": correct,
+                "explanation": f"'{topic}' appears in the lecture topic list.",
+            })
+        return questions
+
+
+def _question_count(prompt):
+    return requested_count(prompt) or len(DUMMY_MCQS)
+
+
+def _topics_from_prompt(prompt):
+    match = re.search(r"Lecture Topics:\n(.*?)\n\nAdditional Instructions:", prompt, re.S)
+    if not match:
+        return []
+    parts = re.split(r"[\n;]+", match.group(1))
+    return [p.strip(" -*\t") for p in parts if p.strip(" -*\t")]
+
+
+class HTTPBackend(LLMBackend):
+    """Client for the local mock server in mock_llm_server.py"""
+
+    name = "http"
+
+    def __init__(self, url, timeout=120.0):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self.model_name = f"http-{self.url}"
+
+    def _post(self, path, prompt):
+        request = urllib.request.Request(
+            self.url + path,
+            data=json.dumps({"prompt": prompt}).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+        )
+        try:
+            return urllib.request.urlopen(request, timeout=self.timeout)
+        except urllib.error.HTTPError as e:
+            if e.code == 429:
+                retry_after = e.headers.get("Retry-After")
+                raise RateLimitError(
+                    "Mock server rate limit exceeded",
+                    retry_after=float(retry_after) if retry_after else None,
+                ) from e
+            raise BackendError(f"Mock server request failed: {e}") from e
+        except OSError as e:
+            raise BackendError(f"Mock server request failed: {e}") from e
+
+    def generate(self, prompt, response_schema=None):
+        with self._post("/generate", prompt) as response:
+            return json.loads(response.read())["text"]
+
+    def stream(self, prompt, response_schema=None):
+        # The server sends one {"text": ...} JSON object per line, or {"error": ...} if it failed
+        with self._post("/stream", prompt) as response:
+            for line in response:
+                if line.strip():
+                    payload = json.loads(line)
+                    if "error" in payload:
+                        raise BackendError(f"Mock server stream failed: {payload['error']}")
+                    yield payload["text"]
+
+    def warm_up(self):
+        try:
+            urllib.request.urlopen(self.url + "/health", timeout=self.timeout).close()
+        except OSError as e:
+            raise BackendError(f"Mock server health check failed: {e}") from e
+
+
+def create_backend(name, api_key=None, **options):
+    """Build a backend by name ('gemini', 'mock', 'http' or 'replay')"""
+    if name == "gemini":
+        return GeminiBackend(api_key, **options)
+    if name == "mock":
+        return MockBackend(**options)
+    if name == "http":
+        return HTTPBackend(**options)
+    if name == "replay":
+        from cassette import ReplayBackend
+
+        return ReplayBackend(**options)
+    raise ValueError(f"Unknown LLM backend: {name}")
+
+
+def backend_from_config(name=None, api_key=None):
+    """Build the backend selected in config.py, recording to a cassette if asked"""
+    import config
+
+    name = name or config.LLM_BACKEND
+    if name == "replay":
+        from cassette import ReplayBackend
+
+        return ReplayBackend(config.CASSETTE_PATH, speed=config.REPLAY_SPEED)
+    if name == "mock":
+        backend = MockBackend(
+            latency=config.MOCK_LATENCY_SECONDS,
+            jitter=config.MOCK_JITTER_SECONDS,
+            error_rate=config.MOCK_ERROR_RATE,
+            malformed_rate=config.MOCK_MALFORMED_RATE,
+            mode=config.MOCK_MODE,
+            seed=config.MOCK_SEED,
+            invalid_rate=config.MOCK_INVALID_RATE,
+        )
+    elif name == "http":
+        backend = HTTPBackend(config.MOCK_SERVER_URL)
+    elif name == "gemini":
+        backend = GeminiBackend(
+            api_key or config.GOOGLE_API_KEY,
+            transport=config.GEMINI_TRANSPORT,
+            timeout=config.LLM_MAX_TIMEOUT_SECONDS,
+        )
+    else:
+        backend = create_backend(name, api_key=api_key or config.GOOGLE_API_KEY)
+    if config.CASSETTE_RECORD:
+        from cassette import Cassette, RecordingBackend
+
+        backend = RecordingBackend(backend, Cassette(config.CASSETTE_PATH))
+    return backend
+
+
+class BackendRegistry:
+    """Process-wide home for constructed backends and their warm state
+
+    Backends (and the SDK clients and connections behind them) are built once
+    and reused by every rerun and session. When `health_path` is set, the
+    health report is also written there as JSON so an external probe can read it.
+    It is rewritten on every state change and, once a backend exists, every
+    `heartbeat_seconds`, so the file's age shows whether the process is alive.
+    """
+
+    def __init__(self, health_path=None, heartbeat_seconds=60.0):
+        self.health_path = health_path
+        self.heartbeat_seconds = heartbeat_seconds
+        self._backends = {}
+        self._state = {}
+        self._lock = threading.Lock()
+        self._health_error = None
+        if health_path and heartbeat_seconds:
+            threading.Thread(target=self._heartbeat, daemon=True, name="mcq-health").start()
+
+    def get(self, name=None, api_key=None):
+        import config
+
+        name = name or config.LLM_BACKEND
+        with self._lock:
+            if name not in self._backends:
+                self._backends[name] = backend_from_config(name, api_key=api_key)
+                self._state[name] = {"warm": False, "warming": False, "error": None}
+            return self._backends[name]
+
+    def warm_up(self, name=None, api_key=None, background=True):
+        """Send a warm-up request, on a daemon thread unless background is False"""
+        try:
+            backend = self.get(name, api_key)
+        except Exception as e:
+            self._update(name or "unknown", warm=False, error=str(e))
+            return None
+        self._update(backend.name, warming=True)
+        if background:
+            thread = threading.Thread(target=self._warm, args=(backend,), daemon=True)
+            thread.start()
+            return thread
+        self._warm(backend)
+        return None
+
+    def _warm(self, backend):
+        started = time.perf_counter()
+        try:
+            backend.warm_up()
+        except Exception as e:
+            self._update(backend.name, warming=False, error=f"{type(e).__name__}: {e}")
+            return
+        self._update(
+            backend.name,
+            warm=True,
+            warming=False,
+            error=None,
+            warmed_at=time.time(),
+            warmup_ms=round((time.perf_counter() - started) * 1000, 1),
+        )
+
+    def mark_warm(self, backend):
+        """Record that a real request succeeded, which also leaves the pool warm"""
+        now = time.time()
+        with self._lock:
+            state = self._state.get(backend.name)
+            already_warm = state is not None and state.get("warm")
+            if already_warm:
+                # Written out by the next heartbeat rather than on every request
+                state["last_success_at"] = now
+        if not already_warm:
+            self._update(backend.name, warm=True, warmed_at=now, last_success_at=now)
+
+    def _update(self, name, **fields):
+        with self._lock:
+            self._state.setdefault(name, {"warm": False, "warming": False, "error": None})
+            self._state[name].update(fields)
+        self._write_health()
+
+    def health(self):
+        """Report which backends exist and whether their connections are warm"""
+        with self._lock:
+            backends = {
+                name: {"model": getattr(self._backends.get(name), "model_name", None), **state}
+                for name, state in self._state.items()
+            }
+        return {
+            "pid": os.getpid(),
+            "updated_at": time.time(),
+            "warm": bool(backends) and all(b["warm"] for b in backends.values()),
+            "backends": backends,
+        }
+
+    def _heartbeat(self):
+        while True:
+            time.sleep(self.heartbeat_seconds)
+            with self._lock:
+                started = bool(self._state)
+            if started:
+                self._write_health()
+
+    def _write_health(self):
+        """Replace the health file; failures are logged, never raised into a request
+
+        A full or read-only disk shows up as a stale file, which the probe reports.
+        """
+        if not self.health_path:
+            return
+        directory = os.path.dirname(self.health_path)
+        tmp_path = None
+        try:
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Unique per write: request threads and the heartbeat may write at once
+            fd, tmp_path = tempfile.mkstemp(
+                dir=directory or ".", prefix=os.path.basename(self.health_path) + ".", suffix=".tmp"
+            )
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(self.health(), f)
+            os.replace(tmp_path, self.health_path)
+        except OSError as e:
+            if tmp_path is not None:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+            error = f"{type(e).__name__}: {e}"
+            # Logged once per distinct failure so a broken path doesn't flood the log
+            if error != self._health_error:
+                logger.warning("Writing backend health to %s failed: %s", self.health_path, error)
+            self._health_error = error
+        else:
+            self._health_error = None
@@ -0,0 +1,223 @@
+"""Concurrent-session load test for one Streamlit server process
+
+Starts the app under `streamlit run` against the mock backend (or uses --url)
+and, for each concurrency level, runs that many websocket sessions at once,
+each taking whole quizzes through the input, quiz and results pages the way
+bench_interactions.py does. Per level it reports quiz and rerun throughput,
+rerun latency percentiles, server CPU and RSS, and failed sessions; the knee
+is the last level whose p95 rerun latency stays within --knee-factor of the
+lowest level's.
+
+    python load_test.py --levels 1 2 4 8 16 32 --mock-latency 2 --think 0.5 -o load.json
+
+Server CPU and RSS are read from /proc, so they are only reported on Linux
+and only for a server this script started. The client runs in one process
+too; its own CPU is reported so a saturated client is easy to spot.
+"""
+import argparse
+import asyncio
+import os
+import platform
+import sys
+import time
+from collections import defaultdict
+
+from bench_interactions import free_port, start_server, take_quiz
+from bench_latency import git_commit, make_topics, summarize, write_json
+
+
+class ProcessSampler:
+    """Samples CPU time and RSS of a process from /proc while a level runs"""
+
+    def __init__(self, pid, interval=0.2):
+        self.pid = pid
+        self.interval = interval
+        self.peak_rss = 0
+        self._task = None
+
+    def cpu_seconds(self):
+        try:
+            with open(f"/proc/{self.pid}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+        except OSError:
+            return None
+        # utime and stime are fields 14 and 15, in clock ticks
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+    def rss_bytes(self):
+        try:
+            with open(f"/proc/{self.pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        return int(line.split()[1]) * 1024
+        except OSError:
+            pass
+        return None
+
+    async def _sample(self):
+        while True:
+            self.peak_rss = max(self.peak_rss, self.rss_bytes() or 0)
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        self.peak_rss = 0
+        self._task = asyncio.ensure_future(self._sample())
+
+    async def stop(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+
+async def session(url, topics, quizzes, think, samples):
+    """One simulated student taking `quizzes` quizzes; returns the error, if any"""
+    try:
+        for _ in range(quizzes):
+            await take_quiz(url, topics, samples, think)
+    except Exception as e:
+        return e
+    return None
+
+
+async def run_level(url, concurrency, args, sampler, level_index):
+    samples = defaultdict(lambda: {"seconds": [], "bytes": []})
+    # Distinct topics per session so identical requests are not coalesced
+    topics = [
+        make_topics(args.topic_lines) + f"\nLoad test level {level_index} session {i}"
+        for i in range(concurrency)
+    ]
+    cpu_before = sampler.cpu_seconds() if sampler else None
+    client_cpu_before = time.process_time()
+    if sampler:
+        sampler.start()
+    started = time.perf_counter()
+    errors = await asyncio.gather(*(
+        session(url, topics[i], args.quizzes_per_session, args.think, samples)
+        for i in range(concurrency)
+    ))
+    wall = time.perf_counter() - started
+    if sampler:
+        await sampler.stop()
+
+    reruns = [s for data in samples.values() for s in data["seconds"]]
+    failed = [e for e in errors if e is not None]
+    level = {
+        "concurrency": concurrency,
+        "wall_s": round(wall, 3),
+        "quizzes_per_s": round((concurrency - len(failed)) * args.quizzes_per_session / wall, 3),
+        "reruns_per_s": round(len(reruns) / wall, 3),
+        "rerun": summarize(reruns) if reruns else None,
+        "by_interaction": {name: summarize(data["seconds"]) for name, data in samples.items()},
+        "failed_sessions": len(failed),
+        "errors": sorted({f"{type(e).__name__}: {e}" for e in failed})[:5],
+        "client_cpu_s": round(time.process_time() - client_cpu_before, 3),
+    }
+    if sampler:
+        cpu_after = sampler.cpu_seconds()
+        if cpu_before is not None and cpu_after is not None:
+            level["server_cpu_pct"] = round((cpu_after - cpu_before) / wall * 100, 1)
+        level["server_rss_peak_mb"] = round(sampler.peak_rss / 2 ** 20, 1)
+    return level
+
+
+def find_knee(levels, factor):
+    """Highest concurrency whose p95 rerun latency is within `factor` x the first level's"""
+    measured = [level for level in levels if level["rerun"]]
+    if not measured:
+        return None
+    baseline = measured[0]["rerun"]["p95_ms"]
+    knee = measured[0]["concurrency"]
+    for level in measured[1:]:
+        if level["rerun"]["p95_ms"] > baseline * factor or level["failed_sessions"]:
+            break
+        knee = level["concurrency"]
+    return knee
+
+
+def print_header():
+    print(f"{'sessions':>8} {'quiz/s':>8} {'rerun/s':>8} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'p99 ms':>8} {'cpu %':>6} {'rss MB':>7} {'failed':>6}", file=sys.stderr)
+
+
+def print_level(level):
+    rerun = level["rerun"] or {}
+    print(f"{level['concurrency']:>8} {level['quizzes_per_s']:>8} {level['reruns_per_s']:>8} "
+          f"{rerun.get('p50_ms', '-'):>8} {rerun.get('p95_ms', '-'):>8} {rerun.get('p99_ms', '-'):>8} "
+          f"{level.get('server_cpu_pct', '-'):>6} {level.get('server_rss_peak_mb', '-'):>7} "
+          f"{level['failed_sessions']:>6}", file=sys.stderr)
+
+
+def run(args):
+    env = {
+        "MCQ_LLM_BACKEND": "mock",
+        "MCQ_MOCK_LATENCY_SECONDS": str(args.mock_latency),
+        "MCQ_MOCK_JITTER_SECONDS": str(args.mock_jitter),
+        "MCQ_CACHE_ENABLED": "0",
+        "MCQ_BANK_ENABLED": "0",
+    }
+    process = None
+    url = args.url
+    if url is None:
+        port = free_port()
+        process = start_server(port, env, args.workdir)
+        url = f"http://127.0.0.1:{port}"
+    sampler = ProcessSampler(process.pid) if process is not None and sys.platform == "linux" else None
+
+    async def ramp():
+        levels = []
+        for index, concurrency in enumerate(args.levels):
+            levels.append(await run_level(url, concurrency, args, sampler, index))
+            print_level(levels[-1])
+        return levels
+
+    try:
+        print_header()
+        levels = asyncio.run(ramp())
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    knee = find_knee(levels, args.knee_factor)
+    print(f"knee: {knee} concurrent sessions (p95 within {args.knee_factor}x of {args.levels[0]})",
+          file=sys.stderr)
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+            "mock_latency_s": args.mock_latency,
+            "mock_jitter_s": args.mock_jitter,
+            "think_s": args.think,
+            "quizzes_per_session": args.quizzes_per_session,
+            "knee_factor": args.knee_factor,
+        },
+        "levels": levels,
+        "knee_concurrency": knee,
+    }
+    write_json(report, args.output)
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ramp concurrent sessions against one app process")
+    parser.add_argument("--url", help="use an already running app instead of starting one")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32],
+                        help="concurrent sessions per step")
+    parser.add_argument("--quizzes-per-session", type=int, default=1)
+    parser.add_argument("--think", type=float, default=0.5, help="seconds between interactions")
+    parser.add_argument("--topic-lines", type=int, default=5)
+    parser.add_argument("--mock-latency", type=float, default=2.0)
+    parser.add_argument("--mock-jitter", type=float, default=0.5)
+    parser.add_argument("--knee-factor", type=float, default=2.0,
+                        help="p95 growth over the first level that counts as degraded")
+    parser.add_argument("--workdir", default=".", help="working directory for the started app")
+    parser.add_argument("-o", "--output", help="write JSON here instead of stdout")
+    return run(parser.parse_args(argv))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,224 @@
+import copy
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def _normalize(text):
+    """Collapse whitespace and case so trivially different inputs share a key"""
+    return " ".join((text or "").split()).casefold()
+
+
+def make_cache_key(system_prompt, lecture_topics, ai_instructions, model_name, question_count):
+    """Build a content-addressed key for one generation request"""
+    payload = json.dumps(
+        [
+            system_prompt,
+            _normalize(lecture_topics),
+            _normalize(ai_instructions),
+            model_name,
+            int(question_count),
+        ],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LRUCache:
+    """Size-bounded in-process cache (least recently used entries go first)
+
+    With `ttl_seconds`, an entry expires that long after `created_at`
+    (default: when it is set), like a row of SQLiteCache.
+    """
+
+    def __init__(self, max_entries=256, ttl_seconds=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and time.time() > expires_at:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, created_at=None):
+        expires_at = None
+        if self.ttl_seconds is not None:
+            expires_at = (time.time() if created_at is None else created_at) + self.ttl_seconds
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteCache:
+    """On-disk cache with a TTL and an entry cap"""
+
+    def __init__(self, path, ttl_seconds=7 * 24 * 3600, max_entries=5000):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS mcq_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )"""
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS mcq_cache_accessed ON mcq_cache (accessed_at)"
+        )
+        self._conn.commit()
+
+    def get(self, key):
+        entry = self.lookup(key)
+        return entry[0] if entry is not None else None
+
+    def lookup(self, key):
+        """(value, created_at) for a live entry, or None"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM mcq_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, created_at = row
+            if now - created_at > self.ttl_seconds:
+                self._conn.execute("DELETE FROM mcq_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute(
+                "UPDATE mcq_cache SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+        return json.loads(value), created_at
+
+    def set(self, key, value):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO mcq_cache (key, value, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now, now),
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now):
+        """Drop expired rows, then the least recently used rows above the cap"""
+        self._conn.execute(
+            "DELETE FROM mcq_cache WHERE created_at < ?", (now - self.ttl_seconds,)
+        )
+        self._conn.execute(
+            """DELETE FROM mcq_cache WHERE key IN (
+                SELECT key FROM mcq_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+            )""",
+            (self.max_entries,),
+        )
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM mcq_cache")
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM mcq_cache").fetchone()[0]
+
+
+class MCQCache:
+    """Memory LRU in front of a SQLite store, with hit/miss counters
+
+    `ttl_seconds` applies to both tiers. An entry promoted from disk keeps
+    its original creation time, so it expires from memory when it would
+    have expired on disk.
+
+    Callers get their own copy of a cached value, so editing the questions
+    of one quiz cannot change what later lookups return.
+    """
+
+    def __init__(self, memory_max_entries=256, db_path=None,
+                 ttl_seconds=7 * 24 * 3600, disk_max_entries=5000):
+        self.memory = LRUCache(memory_max_entries, ttl_seconds)
+        self.disk = SQLiteCache(db_path, ttl_seconds, disk_max_entries) if db_path else None
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is not None:
+            self._count("memory_hits")
+            return copy.deepcopy(value)
+
+        if self.disk is not None:
+            entry = self.disk.lookup(key)
+            if entry is not None:
+                value, created_at = entry
+                # Promote so the next lookup skips the disk
+                self.memory.set(key, value, created_at)
+                self._count("disk_hits")
+                return copy.deepcopy(value)
+
+        self._count("misses")
+        return None
+
+    def set(self, key, value):
+        self.memory.set(key, copy.deepcopy(value))
+        if self.disk is not None:
+            self.disk.set(key, value)
+        self._count("stores")
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def stats(self):
+        """Return counters for sizing the cache"""
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        hits = self.memory_hits + self.disk_hits
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "memory_entries": len(self.memory),
+            "disk_entries": len(self.disk) if self.disk is not None else 0,
+        }
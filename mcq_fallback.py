@@ -0,0 +1,176 @@
+"""Rule-based MCQs built from the lecture topics text, with no LLM
+
+The degraded mode used when the LLM fails or misses its deadline. The
+topics text is split into statements. Statements shaped like a definition
+("Term: ...", "Term - ...", "Term is ...") give two kinds of question:
+which term a definition describes, and which definition fits a term. Any
+statement can give a cloze question with one content word blanked out.
+
+Distractors come from the topics' own vocabulary: other terms, other
+definitions, and other content words of a similar length. Extra vocabulary,
+such as option texts from the question bank, fills in when the notes are
+short. Output is deterministic for a given text and needs no network.
+"""
+import random
+import re
+import zlib
+from collections import Counter
+
+from question_bank import STOPWORDS
+
+OPTION_KEYS = "ABCD"
+MIN_CLOZE_WORDS = 6
+
+_STATEMENT_SPLIT = re.compile(r"[\n;]+|(?<=[.!?])\s+")
+_BULLET = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s*")
+# "Term: definition", "Term = definition" or "Term - definition"
+_LABELLED = re.compile(r"^(?P<term>[^:=]{2,60}?)\s*(?::|=|\s[-–—]\s)\s*(?P<definition>.{8,})$")
+# "Term is definition": only short subjects, so ordinary sentences don't count
+_COPULA = re.compile(r"^(?P<term>(?:\S+\s){0,2}\S+)\s(?:is|are|means|refers to)\s(?P<definition>.{8,})$",
+                     re.IGNORECASE)
+_WORD = re.compile(r"[A-Za-z][A-Za-z\-']{3,}")
+
+
+def statements(text):
+    """Non-trivial lines and sentences of the topics text, bullets stripped"""
+    found = []
+    for part in _STATEMENT_SPLIT.split(text or ""):
+        part = _BULLET.sub("", part).strip().rstrip(".")
+        if len(part.split()) >= 3:
+            found.append(part)
+    return found
+
+
+def definitions(sentences):
+    """(term, definition, statement) for statements shaped like a definition"""
+    found = []
+    seen = set()
+    for sentence in sentences:
+        match = _LABELLED.match(sentence) or _COPULA.match(sentence)
+        if not match or len(match.group("definition").split()) < 3:
+            continue
+        term = match.group("term").strip(" -*")
+        definition = match.group("definition").strip()
+        if len(term.split()) > 6 or term.casefold() in seen:
+            continue
+        seen.add(term.casefold())
+        found.append((term, definition, sentence))
+    return found
+
+
+def content_words(sentence):
+    return [w for w in _WORD.findall(sentence) if w.casefold() not in STOPWORDS]
+
+
+def _distinct(candidates, exclude):
+    """Candidates in order, skipping repeats and anything in `exclude` (case-insensitive)"""
+    seen = {text.casefold() for text in exclude}
+    picked = []
+    for text in candidates:
+        key = text.casefold()
+        if text and key not in seen:
+            seen.add(key)
+            picked.append(text)
+    return picked
+
+
+class FallbackGenerator:
+    """Builds cloze and definition MCQs from one topics text"""
+
+    def __init__(self, lecture_topics, extra_vocabulary=()):
+        self.sentences = statements(lecture_topics)
+        self.definitions = definitions(self.sentences)
+        counts = Counter(w.casefold() for s in self.sentences for w in content_words(s))
+        self.vocabulary = [w for w, _ in counts.most_common()]
+        self.extra = [str(t).strip() for t in extra_vocabulary if str(t).strip()]
+        self.random = random.Random(zlib.crc32((lecture_topics or "").encode("utf-8")))
+
+    def _question(self, text, correct, distractors, explanation):
+        choices = distractors[:3]
+        position = self.random.randrange(4)
+        choices.insert(position, correct)
+        return {
+            "question": text,
+            "options": dict(zip(OPTION_KEYS, choices)),
+            "correct_answer": OPTION_KEYS[position],
+            "explanation": explanation,
+        }
+
+    def _pick(self, pool, correct, count=3):
+        pool = _distinct(pool, [correct])
+        self.random.shuffle(pool)
+        return pool[:count]
+
+    def term_question(self, index):
+        term, definition, sentence = self.definitions[index]
+        others = [t for t, _, _ in self.definitions]
+        distractors = self._pick(others, term)
+        if len(distractors) < 3:
+            distractors += self._pick(self.extra, term, 3 - len(distractors))
+        distractors = _distinct(distractors, [term])
+        if len(distractors) < 3:
+            return None
+        return self._question(
+            f"Which term matches this description: “{definition}”?", term, distractors,
+            f"From your lecture notes: “{sentence}”.",
+        )
+
+    def definition_question(self, index):
+        term, definition, sentence = self.definitions[index]
+        distractors = self._pick([d for _, d, _ in self.definitions], definition)
+        if len(distractors) < 3:
+            return None
+        return self._question(
+            f"Which statement best describes {term}?", definition, distractors,
+            f"From your lecture notes: “{sentence}”.",
+        )
+
+    def cloze_question(self, index):
+        sentence = self.sentences[index]
+        words = sorted({w.casefold() for w in content_words(sentence)}, key=lambda w: (-len(w), w))
+        if len(sentence.split()) < MIN_CLOZE_WORDS or not words:
+            return None
+        answer = words[self.random.randrange(min(3, len(words)))]
+        # Distractors of a similar length read as plausible fill-ins
+        pool = sorted(self.vocabulary, key=lambda w: abs(len(w) - len(answer)))[:12]
+        in_sentence = set(words)
+        distractors = self._pick([w for w in pool if w not in in_sentence], answer)
+        if len(distractors) < 3:
+            distractors += self._pick(
+                [t for t in self.extra if len(t.split()) == 1], answer, 3 - len(distractors)
+            )
+        distractors = _distinct(distractors, [answer])
+        if len(distractors) < 3:
+            return None
+        blanked = re.sub(rf"\b{re.escape(answer)}\b", "_____", sentence, count=1, flags=re.IGNORECASE)
+        return self._question(
+            f"Fill in the blank: “{blanked}”", answer, distractors,
+            f"From your lecture notes: “{sentence}”.",
+        )
+
+    def candidates(self):
+        """Question builders in the order they are tried: one kind per statement, then the rest"""
+        first, rest = [], []
+        for i in range(len(self.definitions)):
+            first.append((self.term_question, i))
+            rest.append((self.definition_question, i))
+        defined = {sentence for _, _, sentence in self.definitions}
+        for i, sentence in enumerate(self.sentences):
+            (rest if sentence in defined else first).append((self.cloze_question, i))
+        return first + rest
+
+    def generate(self, num_questions):
+        questions = []
+        for build, index in self.candidates():
+            if len(questions) >= num_questions:
+                break
+            question = build(index)
+            if question is not None:
+                questions.append(question)
+        return questions
+
+
+def generate_fallback_mcqs(lecture_topics, num_questions, extra_vocabulary=()):
+    """Up to num_questions rule-based MCQs as {'questions': [...]}; may be fewer for short notes"""
+    generator = FallbackGenerator(lecture_topics, extra_vocabulary)
+    return {"questions": generator.generate(num_questions)}
@@ -0,0 +1,67 @@
+import json
+import re
+
+
+MODEL_NAME = 'gemini-2.5-flash'
+
+# Enhanced system prompt for better API integration
+SYSTEM_PROMPT = """You are a highly qualified MCQ generator for an engineering college lecture. Your task is to create the requested number of multiple-choice questions (MCQs) based strictly on the list of topics provided from a lecture. These MCQs serve as exit ticket questions to assess students' understanding of core concepts.
+
+Instructions:
+- Only use concepts that were explicitly covered in the given topic list
+- Do not include or infer content beyond the provided topics
+- Focus on the most essential technical points, definitions, principles, or equations
+- Each question must have one correct answer and three plausible distractors
+- The correct answer must be factually accurate
+- Write short, clear, and professional questions and answer choices
+- Use standard engineering terminology and units
+- Keep all technical details precise and concise
+
+Output Format (JSON):
+{
+  "questions": [
+    {
+      "question": "Question text here?",
+      "options": {
+        "A": "Option A text",
+        "B": "Option B text", 
+        "C": "Option C text",
+        "D": "Option D text"
+      },
+      "correct_answer": "C",
+      "explanation": "Brief explanation of why this answer is correct"
+    }
+  ]
+}
+
+Requirements:
+- Return ONLY valid JSON format
+- Ensure all questions are relevant to the provided topics
+- Make explanations educational and clear
+- Use engineering-appropriate language and precision"""
+
+def build_prompt(lecture_topics, ai_instructions, num_questions):
+    """Create the prompt with system prompt"""
+    return f"""{SYSTEM_PROMPT}
+
+Lecture Topics:
+{lecture_topics}
+
+Additional Instructions:
+{ai_instructions if ai_instructions.strip() else "No additional instructions provided."}
+
+Please generate exactly {num_questions} MCQs based on the above topics and instructions.
+Return ONLY the JSON format as specified above."""
+
+def requested_count(prompt):
+    """Number of questions a build_prompt prompt asks for, or None"""
+    match = re.search(r"generate exactly (\d+) MCQs", prompt)
+    return int(match.group(1)) if match else None
+
+def parse_mcq_response(response_text):
+    """Extract the MCQ JSON from a model response (raises json.JSONDecodeError)"""
+    # Find JSON content (handle cases where response might have extra text)
+    start_idx = response_text.find('{')
+    end_idx = response_text.rfind('}') + 1
+    json_str = response_text[start_idx:end_idx]
+    return json.loads(json_str)
@@ -0,0 +1,233 @@
+"""MCQ response schema, local validation and targeted repair
+
+Backends that support structured output are asked for JSON matching
+MCQ_RESPONSE_SCHEMA. Every question is still checked locally; invalid ones are
+replaced by a follow-up call that asks for just that many new questions.
+"""
+import json
+import threading
+
+from mcq_prompt import build_prompt, parse_mcq_response
+
+OPTION_KEYS = ("A", "B", "C", "D")
+
+MCQ_RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "questions": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "question": {"type": "string"},
+                    "options": {
+                        "type": "object",
+                        "properties": {key: {"type": "string"} for key in OPTION_KEYS},
+                        "required": list(OPTION_KEYS),
+                    },
+                    "correct_answer": {"type": "string", "enum": list(OPTION_KEYS)},
+                    "explanation": {"type": "string"},
+                },
+                "required": ["question", "options", "correct_answer", "explanation"],
+            },
+        },
+    },
+    "required": ["questions"],
+}
+
+
+def validate_question(question):
+    """Return a list of problems with one question (empty when valid)"""
+    if not isinstance(question, dict):
+        return ["question is not an object"]
+
+    problems = []
+    text = question.get("question")
+    if not isinstance(text, str) or not text.strip():
+        problems.append("missing question text")
+
+    options = question.get("options")
+    if not isinstance(options, dict):
+        problems.append("options is not an object")
+        options = {}
+    else:
+        if sorted(options) != list(OPTION_KEYS):
+            problems.append(f"options must be exactly {', '.join(OPTION_KEYS)}")
+        if any(not isinstance(v, str) or not v.strip() for v in options.values()):
+            problems.append("empty option text")
+        texts = [str(v).strip().casefold() for v in options.values()]
+        if len(set(texts)) != len(texts):
+            problems.append("duplicate options")
+
+    correct_answer = question.get("correct_answer")
+    if not isinstance(correct_answer, str):
+        problems.append("correct_answer is not a string")
+    elif correct_answer not in options:
+        problems.append("correct_answer is not one of the options")
+
+    explanation = question.get("explanation")
+    if not isinstance(explanation, str) or not explanation.strip():
+        problems.append("missing explanation")
+    return problems
+
+
+class OutputMetrics:
+    """Process-wide counters for parse failures and question repairs"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.responses = 0
+        self.parse_failures = 0
+        self.questions_checked = 0
+        self.invalid_questions = 0
+        self.questions_missing = 0
+        self.repair_calls = 0
+        self.questions_repaired = 0
+        self.questions_dropped = 0
+        self.near_duplicates_dropped = 0
+        self.near_duplicates_flagged = 0
+
+    def count(self, **increments):
+        with self._lock:
+            for name, value in increments.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "responses": self.responses,
+                "parse_failures": self.parse_failures,
+                "parse_failure_rate": _rate(self.parse_failures, self.responses),
+                "questions_checked": self.questions_checked,
+                "invalid_questions": self.invalid_questions,
+                "invalid_rate": _rate(self.invalid_questions, self.questions_checked),
+                "questions_missing": self.questions_missing,
+                "repair_calls": self.repair_calls,
+                "questions_repaired": self.questions_repaired,
+                "repair_success_rate": _rate(
+                    self.questions_repaired,
+                    self.invalid_questions + self.questions_missing + self.near_duplicates_dropped,
+                ),
+                "questions_dropped": self.questions_dropped,
+                "near_duplicates_dropped": self.near_duplicates_dropped,
+                "near_duplicates_flagged": self.near_duplicates_flagged,
+            }
+
+
+def _rate(part, whole):
+    return round(part / whole, 4) if whole else 0.0
+
+
+def parse_response(response_text, metrics=None):
+    """parse_mcq_response that also counts parse failures"""
+    if metrics is not None:
+        metrics.count(responses=1)
+    try:
+        mcqs = parse_mcq_response(response_text)
+    except json.JSONDecodeError:
+        if metrics is not None:
+            metrics.count(parse_failures=1)
+        raise
+    if not isinstance(mcqs, dict) or not isinstance(mcqs.get("questions"), list):
+        if metrics is not None:
+            metrics.count(parse_failures=1)
+        raise json.JSONDecodeError("response has no 'questions' list", response_text, 0)
+    return mcqs
+
+
+def _repair_label(question):
+    if question is None:
+        return "(missing)"
+    if not isinstance(question, dict):
+        return "(invalid)"
+    return str(question.get("question", "(no text)"))[:200]
+
+
+def build_repair_prompt(lecture_topics, ai_instructions, rejected):
+    """Prompt for replacements of the rejected (question, problems) pairs"""
+    notes = "\n".join(f"- {_repair_label(q)} [{'; '.join(problems)}]" for q, problems in rejected)
+    instructions = (
+        f"{ai_instructions.strip()}\n"
+        "These earlier questions were rejected and must be replaced with new ones "
+        "on different points. Every question needs options A, B, C and D, and "
+        f"correct_answer must be one of those keys:\n{notes}"
+    ).strip()
+    return build_prompt(lecture_topics, instructions, len(rejected))
+
+
+def split_valid(questions, metrics=None):
+    """Separate valid questions from (question, problems) pairs"""
+    valid, rejected = [], []
+    for question in questions:
+        problems = validate_question(question)
+        if problems:
+            rejected.append((question, problems))
+        else:
+            valid.append(question)
+    if metrics is not None:
+        metrics.count(questions_checked=len(questions), invalid_questions=len(rejected))
+    return valid, rejected
+
+
+def shortfall(count, metrics=None):
+    """Placeholder (question, problems) pairs for questions a response left out
+
+    Passed to repair_questions along with the rejected ones, so a short or
+    truncated response is topped up by the same targeted call.
+    """
+    count = max(0, count)
+    if metrics is not None and count:
+        metrics.count(questions_missing=count)
+    return [(None, ["missing from the response"])] * count
+
+
+def repair_questions(backend, lecture_topics, ai_instructions, rejected, metrics=None,
+                     response_schema=None, max_rounds=1):
+    """Regenerate only the rejected questions; return the valid replacements"""
+    replacements = []
+    for _ in range(max_rounds):
+        if not rejected:
+            break
+        if metrics is not None:
+            metrics.count(repair_calls=1)
+        prompt = build_repair_prompt(lecture_topics, ai_instructions, rejected)
+        try:
+            text = backend.generate(prompt, response_schema=response_schema)
+            candidates = parse_response(text, metrics)["questions"][:len(rejected)]
+        except Exception:
+            continue
+        valid, still_rejected = split_valid(candidates, metrics)
+        replacements.extend(valid)
+        # Anything the follow-up call didn't return still needs replacing
+        missing = len(rejected) - len(candidates)
+        rejected = still_rejected + rejected[:missing]
+
+    if metrics is not None:
+        metrics.count(questions_repaired=len(replacements), questions_dropped=len(rejected))
+    return replacements
+
+
+def validate_and_repair(backend, lecture_topics, ai_instructions, questions, metrics=None,
+                        response_schema=None, max_rounds=1, expected=None):
+    """Keep valid questions in order and slot repaired ones where invalid ones were
+
+    With `expected`, questions the response left out are requested in the
+    same repair call and appended.
+    """
+    _, rejected = split_valid(questions, metrics)
+    if expected is not None:
+        rejected += shortfall(expected - len(questions), metrics)
+    if not rejected:
+        return questions
+    replacements = iter(repair_questions(
+        backend, lecture_topics, ai_instructions, rejected, metrics, response_schema, max_rounds
+    ))
+    result = []
+    for question in questions:
+        if validate_question(question):
+            question = next(replacements, None)
+            if question is None:
+                continue
+        result.append(question)
+    result.extend(replacements)
+    return result
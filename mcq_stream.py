@@ -0,0 +1,187 @@
+import json
+import threading
+import time
+
+import tracing
+from mcq_schema import parse_response
+
+
+class QuestionStreamParser:
+    """Incrementally scan streamed JSON and emit each finished question object
+
+    Only objects that are direct children of the top-level "questions" array
+    are emitted. Text before the first brace (e.g. a markdown fence) is ignored.
+    `finished` becomes True once the top-level object closes, so a response
+    that was cut off can be told apart from a complete one.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.emitted = 0
+        self.finished = False
+        self._pos = 0
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        self._last_key = None
+        self._in_questions = False
+        self._item_start = None
+
+    def feed(self, chunk):
+        """Consume a chunk of text and return the questions it completed"""
+        self.buffer += chunk
+        completed = []
+        buf = self.buffer
+
+        for i in range(self._pos, len(buf)):
+            ch = buf[i]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if len(self._stack) == 1:
+                        self._last_key = buf[self._string_start + 1:i]
+                continue
+
+            if ch == '"':
+                if self._stack:
+                    self._in_string = True
+                    self._string_start = i
+            elif ch in "{[":
+                if (ch == "[" and self._stack == ["{"]
+                        and self._last_key == "questions"):
+                    self._in_questions = True
+                elif ch == "{" and self._in_questions and len(self._stack) == 2:
+                    self._item_start = i
+                self._stack.append(ch)
+            elif ch in "}]":
+                if not self._stack:
+                    continue
+                self._stack.pop()
+                if not self._stack:
+                    self.finished = True
+                if ch == "}" and self._in_questions and len(self._stack) == 2:
+                    question = self._load(buf[self._item_start:i + 1])
+                    if question is not None:
+                        completed.append(question)
+                    self._item_start = None
+                elif ch == "]" and self._in_questions and len(self._stack) == 1:
+                    self._in_questions = False
+
+        self._pos = len(buf)
+        self.emitted += len(completed)
+        return completed
+
+    @staticmethod
+    def _load(text):
+        try:
+            question = json.loads(text)
+        except json.JSONDecodeError:
+            return None
+        return question if isinstance(question, dict) else None
+
+
+def stream_questions(backend, prompt, response_schema=None, metrics=None):
+    """Yield each question of one streamed response as soon as it is complete
+
+    A response that is cut off after some questions counts as a parse failure
+    in `metrics` (an OutputMetrics); the questions before the cut are kept and
+    the caller tops up the rest. One with no questions at all raises.
+    """
+    if metrics is not None:
+        metrics.count(responses=1)
+    parser = QuestionStreamParser()
+    if not tracing.enabled():
+        for chunk in backend.stream(prompt, response_schema=response_schema):
+            yield from parser.feed(chunk)
+    else:
+        # Time spent waiting on the network and in the parser is reported separately
+        started = time.perf_counter()
+        first = True
+        parse_seconds = 0.0
+        with tracing.span("llm_stream"):
+            for chunk in backend.stream(prompt, response_schema=response_schema):
+                if first:
+                    tracing.observe("first_chunk", time.perf_counter() - started)
+                    first = False
+                parse_started = time.perf_counter()
+                questions = parser.feed(chunk)
+                parse_seconds += time.perf_counter() - parse_started
+                yield from questions
+        tracing.observe("parse", parse_seconds, streamed=True)
+
+    # Fall back to whole-response parsing if the stream didn't match the expected shape
+    if not parser.emitted:
+        try:
+            mcqs = parse_response(parser.buffer)
+        except json.JSONDecodeError:
+            if metrics is not None:
+                metrics.count(parse_failures=1)
+            raise
+        yield from mcqs['questions']
+    elif not parser.finished and metrics is not None:
+        metrics.count(parse_failures=1)
+
+
+class StreamingQuiz:
+    """Question list that a background thread fills while the quiz is shown"""
+
+    def __init__(self, expected_count, backend=None):
+        self.expected_count = expected_count
+        self.backend = backend
+        self.questions = []
+        self.started = False
+        self.done = False
+        self.error = None
+        self.created_at = time.monotonic()
+        self._cond = threading.Condition()
+
+    def start(self, question_iter, executor=None):
+        """Drain an iterator of questions on `executor`, or on a daemon thread"""
+        if executor is not None:
+            return executor.submit(self._run, question_iter)
+        thread = threading.Thread(target=self._run, args=(question_iter,), daemon=True)
+        thread.start()
+        return thread
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.created_at
+
+    def _run(self, question_iter):
+        self.started = True
+        try:
+            with tracing.span("generate", questions=self.expected_count):
+                for question in question_iter:
+                    with self._cond:
+                        self.questions.append(question)
+                        self._cond.notify_all()
+        except Exception as e:
+            self.error = e
+        finally:
+            with self._cond:
+                self.done = True
+                self._cond.notify_all()
+
+    def wait_for(self, count, timeout=None):
+        """Block until at least `count` questions exist or the stream ends"""
+        with self._cond:
+            self._cond.wait_for(lambda: len(self.questions) >= count or self.done, timeout)
+            return len(self.questions) >= count
+
+    def queue_status(self):
+        """(position, eta_seconds) while the backend waits for quota, else (0, 0)"""
+        position = getattr(self.backend, "queue_position", 0)
+        return position, getattr(self.backend, "queue_eta", 0.0) if position else 0.0
+
+    @property
+    def total(self):
+        """Best current estimate of how many questions the quiz will have"""
+        if self.done:
+            return len(self.questions)
+        return max(self.expected_count, len(self.questions))
@@ -0,0 +1,153 @@
+"""Local HTTP stand-in for the LLM API
+
+Serves MockBackend responses so the app can be load-tested over a real socket
+with no network access. Point the app at it with MCQ_LLM_BACKEND=http.
+
+    python mock_llm_server.py --port 8765 --latency 2 --jitter 1 --error-rate 0.05
+
+A failure in the middle of a /stream response is sent as an {"error": ...}
+line, since the 200 status has already gone out.
+
+With --rate-limit-rpm, POSTs beyond that many per rolling minute get a 429
+with a Retry-After header, like a real quota.
+"""
+import argparse
+import collections
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from llm_backends import BackendError, MockBackend
+
+
+def make_handler(backend, rate_limit_rpm=0):
+    lock = threading.Lock()
+    recent = collections.deque()
+
+    def retry_after():
+        """Seconds until the request window has room, or 0 if it has room now"""
+        now = time.monotonic()
+        with lock:
+            while recent and now - recent[0] >= 60:
+                recent.popleft()
+            if len(recent) >= rate_limit_rpm:
+                return 60 - (now - recent[0])
+            recent.append(now)
+            return 0
+
+    class MockLLMHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send_json(200, {"status": "ok"})
+            else:
+                self._send_json(404, {"error": "not found"})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            try:
+                prompt = json.loads(self.rfile.read(length))["prompt"]
+            except (ValueError, KeyError):
+                self._send_json(400, {"error": "expected {\"prompt\": ...}"})
+                return
+
+            if rate_limit_rpm:
+                wait = retry_after()
+                if wait:
+                    self._send_json(429, {"error": "rate limit exceeded"},
+                                    {"Retry-After": str(max(1, round(wait)))})
+                    return
+
+            try:
+                if self.path == "/generate":
+                    self._send_json(200, {"text": backend.generate(prompt)})
+                elif self.path == "/stream":
+                    self._send_stream(backend.stream(prompt))
+                else:
+                    self._send_json(404, {"error": "not found"})
+            except BackendError as e:
+                self._send_json(503, {"error": str(e)})
+
+        def _send_json(self, status, payload, headers=None):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _send_stream(self, chunks):
+            # The backend raises on the first chunk, which must still become a 503
+            chunks = iter(chunks)
+            first = next(chunks, None)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            try:
+                if first is not None:
+                    self._send_line({"text": first})
+                for text in chunks:
+                    self._send_line({"text": text})
+            except BackendError as e:
+                # Too late for a status code: HTTPBackend.stream raises on this line
+                self._send_line({"error": str(e)})
+            self.wfile.write(b"0\r\n\r\n")
+
+        def _send_line(self, payload):
+            line = (json.dumps(payload) + "\n").encode("utf-8")
+            self.wfile.write(f"{len(line):X}\r\n".encode() + line + b"\r\n")
+            self.wfile.flush()
+
+        def log_message(self, format, *args):
+            pass
+
+    return MockLLMHandler
+
+
+def serve(host="127.0.0.1", port=8765, backend=None, rate_limit_rpm=0):
+    """Run the mock server until interrupted"""
+    server = ThreadingHTTPServer((host, port), make_handler(backend or MockBackend(), rate_limit_rpm))
+    print(f"Mock LLM server listening on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve canned MCQ responses over HTTP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=1.0, help="mean seconds per response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="+/- seconds of uniform jitter")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    parser.add_argument("--invalid-rate", type=float, default=0.0,
+                        help="fraction of questions with a correct_answer that is not an option")
+    parser.add_argument("--mode", choices=["template", "canned"], default="template")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--rate-limit-rpm", type=int, default=0,
+                        help="answer 429 beyond this many requests per minute (0 = no limit)")
+    args = parser.parse_args(argv)
+
+    backend = MockBackend(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        malformed_rate=args.malformed_rate,
+        invalid_rate=args.invalid_rate,
+        mode=args.mode,
+        seed=args.seed,
+    )
+    serve(args.host, args.port, backend, args.rate_limit_rpm)
+
+
+if __name__ == "__main__":
+    main()
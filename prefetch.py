@@ -0,0 +1,144 @@
+"""Speculative generation of a session's next quiz
+
+Once a quiz is served, the session can queue a background generation of the
+next practice set for the same topics. Each set adds a hint to the
+instructions, which asks for different details and gives the set its own
+cache key. Practice again, or resubmitting the same request, then takes the
+prefetched job instead of starting a cold one.
+
+A Prefetch lives in the session's state. Prefetcher is process-wide. It
+limits how many prefetches may generate at once, enforces the per-session
+TTL and memory cap, and counts how each prefetch ended:
+
+- hit: the session used it
+- wasted: it was expired, too large, replaced, failed, or its session went away
+"""
+import threading
+import time
+import weakref
+
+from quiz_state import deep_sizeof
+
+PRACTICE_HINT = ("This is practice set {number} on these topics; "
+                 "ask about different details than the earlier sets.")
+
+
+def practice_instructions(ai_instructions, practice_set):
+    """Instructions for a practice set; set 1 is the request as entered"""
+    if practice_set <= 1:
+        return ai_instructions
+    return f"{ai_instructions.strip()}\n{PRACTICE_HINT.format(number=practice_set)}".strip()
+
+
+class Prefetch:
+    """A session's prefetched next quiz: the request it answers and its job"""
+
+    __slots__ = ("request", "practice_set", "job", "started_at", "size", "outcome", "__weakref__")
+
+    def __init__(self, request, practice_set, job):
+        self.request = request
+        self.practice_set = practice_set
+        self.job = job
+        self.started_at = time.monotonic()
+        self.size = None
+        # Shared with the finalizer, which must not hold a reference to the Prefetch
+        self.outcome = [None]
+
+
+class Prefetcher:
+    """Process-wide limits and hit/waste counters for prefetched quizzes"""
+
+    def __init__(self, ttl_seconds=1800, max_bytes=256 * 1024, max_pending=32):
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._live = weakref.WeakSet()
+        self.started = 0
+        self.skipped = 0
+        self.hits = 0
+        self.waiting_hits = 0
+        self.misses = 0
+        self.wasted = {}
+
+    def pending(self):
+        with self._lock:
+            return sum(1 for prefetch in self._live if not prefetch.job.done)
+
+    def start(self, request, practice_set, start_job):
+        """Prefetch via start_job() unless max_pending are already generating; returns a Prefetch or None"""
+        if self.max_pending and self.pending() >= self.max_pending:
+            with self._lock:
+                self.skipped += 1
+            return None
+        prefetch = Prefetch(request, practice_set, start_job())
+        weakref.finalize(prefetch, self._finalized, prefetch.outcome)
+        with self._lock:
+            self._live.add(prefetch)
+            self.started += 1
+        return prefetch
+
+    def _finalized(self, outcome):
+        if outcome[0] is None:
+            self._settle(outcome, "abandoned")
+
+    def _settle(self, outcome, result):
+        with self._lock:
+            if outcome[0] is not None:
+                return
+            outcome[0] = result
+            if result == "hit":
+                self.hits += 1
+            else:
+                self.wasted[result] = self.wasted.get(result, 0) + 1
+
+    def discard(self, prefetch, reason):
+        """Give up on a prefetch that was not used"""
+        if prefetch is not None:
+            self._settle(prefetch.outcome, reason)
+
+    def usable(self, prefetch):
+        """False (and discarded) once a prefetch has expired, failed or outgrown the cap"""
+        if prefetch is None or prefetch.outcome[0] is not None:
+            return False
+        if time.monotonic() - prefetch.started_at > self.ttl_seconds:
+            self.discard(prefetch, "expired")
+            return False
+        job = prefetch.job
+        if job.done:
+            if not job.questions:
+                self.discard(prefetch, "failed")
+                return False
+            if prefetch.size is None:
+                prefetch.size = deep_sizeof(job.questions)
+            if self.max_bytes and prefetch.size > self.max_bytes:
+                self.discard(prefetch, "over_cap")
+                return False
+        return True
+
+    def claim(self, prefetch, request):
+        """The prefetched job if it answers `request`, else None; counts a hit or a miss"""
+        if prefetch is not None and prefetch.request == request and self.usable(prefetch):
+            if not prefetch.job.done:
+                with self._lock:
+                    self.waiting_hits += 1
+            self._settle(prefetch.outcome, "hit")
+            return prefetch.job
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def stats(self):
+        with self._lock:
+            wasted = sum(self.wasted.values())
+            settled = self.hits + wasted
+            return {
+                "started": self.started,
+                "skipped_at_limit": self.skipped,
+                "hits": self.hits,
+                "hits_still_generating": self.waiting_hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / (self.hits + self.misses), 4) if self.hits + self.misses else 0.0,
+                "wasted": dict(self.wasted),
+                "waste_rate": round(wasted / settled, 4) if settled else 0.0,
+            }
@@ -0,0 +1,67 @@
+"""Opt-in cProfile capture of script reruns
+
+`profile_call` runs a function under cProfile and hands the result to a sink
+as a RerunProfile. A thread that is already being profiled is not profiled
+again, so a fragment rendered inside a profiled full run is part of that run's
+profile instead of replacing it. Profiles keep only the raw pstats table;
+`dump()` returns it in the .prof format that snakeviz, flameprof and
+gprof2dot read.
+"""
+import cProfile
+import marshal
+import pstats
+import threading
+import time
+
+_active = threading.local()
+
+SORT_KEYS = {"cumulative": 3, "tottime": 2, "calls": 1}
+
+
+class RerunProfile:
+    """One profiled rerun: what ran, when, how long, and its pstats table"""
+
+    __slots__ = ("label", "started_at", "seconds", "stats")
+
+    def __init__(self, label, started_at, seconds, stats):
+        self.label = label
+        self.started_at = started_at
+        self.seconds = seconds
+        self.stats = stats
+
+    def top(self, n=25, sort="cumulative"):
+        """The n most expensive functions as rows of name, calls and times"""
+        index = SORT_KEYS[sort]
+        entries = sorted(self.stats.items(), key=lambda item: item[1][index], reverse=True)
+        return [
+            {
+                "function": pstats.func_std_string(pstats.func_strip_path(func)),
+                "calls": calls,
+                "tottime_ms": round(tottime * 1000, 3),
+                "cumtime_ms": round(cumtime * 1000, 3),
+            }
+            for func, (_, calls, tottime, cumtime, _) in entries[:n]
+        ]
+
+    def dump(self):
+        """The profile in the marshal format written by pstats.Stats.dump_stats"""
+        return marshal.dumps(self.stats)
+
+
+def profile_call(fn, label, sink):
+    """Call fn under cProfile and pass the RerunProfile to sink, even if fn raises"""
+    if getattr(_active, "profiling", False):
+        return fn()
+    profiler = cProfile.Profile()
+    _active.profiling = True
+    started_at = time.time()
+    started = time.perf_counter()
+    profiler.enable()
+    try:
+        return fn()
+    finally:
+        profiler.disable()
+        seconds = time.perf_counter() - started
+        _active.profiling = False
+        profiler.create_stats()
+        sink(RerunProfile(label, started_at, seconds, profiler.stats))
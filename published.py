@@ -0,0 +1,134 @@
+"""Quizzes published once under a short code for a whole class
+
+An instructor generates a quiz and publishes it. The quiz is stored in
+SQLite under a six-character code, and students open it with `?quiz=<code>`
+without making an LLM call of their own. Publishing the same quiz again
+returns its existing code.
+
+Lookups read through a memory LRU of shared Quiz objects. Only the first
+student after a restart, or after the quiz was evicted, reads the database.
+Concurrent misses are serialised, so one read serves them all.
+"""
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+
+from mcq_cache import LRUCache
+from quiz_state import Quiz, quiz_id
+
+# No 0/O, 1/I/L: codes are read aloud and copied from a projector
+CODE_ALPHABET = "23456789ABCDEFGHJKMNPQRSTUVWXYZ"
+CODE_LENGTH = 6
+
+
+def normalize_code(code):
+    return "".join(str(code or "").split()).upper()
+
+
+class PublishedQuizzes:
+    """Published quizzes in SQLite, read through a memory LRU of Quiz objects
+
+    Pass a QuizStore as `store` so a published quiz is the same object as
+    the one sessions that generated it already hold.
+    """
+
+    def __init__(self, path, memory_max_entries=256, store=None):
+        self.path = path
+        self.store = store
+        self.memory = LRUCache(memory_max_entries)
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS published (
+                   code TEXT PRIMARY KEY,
+                   quiz_id TEXT NOT NULL UNIQUE,
+                   questions TEXT NOT NULL,
+                   published_at REAL NOT NULL
+               )"""
+        )
+        self._conn.commit()
+        self.published = 0
+        self.memory_hits = 0
+        self.loads = 0
+        self.unknown = 0
+        self.load_seconds = 0.0
+
+    def _quiz(self, questions):
+        if self.store is not None:
+            return self.store.intern(questions)
+        return Quiz(quiz_id(questions), questions)
+
+    def publish(self, questions):
+        """The code for this quiz, publishing it if it has none yet"""
+        questions = [dict(q, options=dict(q["options"])) for q in questions]
+        key = quiz_id(questions)
+        payload = json.dumps(questions, ensure_ascii=False)
+        with self._lock:
+            row = self._conn.execute("SELECT code FROM published WHERE quiz_id = ?", (key,)).fetchone()
+            if row is not None:
+                return row[0]
+            while True:
+                code = "".join(secrets.choice(CODE_ALPHABET) for _ in range(CODE_LENGTH))
+                with self._conn:
+                    inserted = self._conn.execute(
+                        "INSERT OR IGNORE INTO published (code, quiz_id, questions, published_at) "
+                        "VALUES (?, ?, ?, ?)",
+                        (code, key, payload, time.time()),
+                    ).rowcount
+                if inserted:
+                    break
+            self.published += 1
+        self.memory.set(code, self._quiz(questions))
+        return code
+
+    def get(self, code):
+        """The published Quiz for a code, or None if there is none"""
+        code = normalize_code(code)
+        quiz = self.memory.get(code)
+        if quiz is not None:
+            with self._lock:
+                self.memory_hits += 1
+            return quiz
+        with self._load_lock:
+            # Another session may have loaded it while this one waited
+            quiz = self.memory.get(code)
+            if quiz is not None:
+                with self._lock:
+                    self.memory_hits += 1
+                return quiz
+            started = time.perf_counter()
+            with self._lock:
+                row = self._conn.execute("SELECT questions FROM published WHERE code = ?", (code,)).fetchone()
+            if row is None:
+                with self._lock:
+                    self.unknown += 1
+                return None
+            quiz = self._quiz(json.loads(row[0]))
+            self.memory.set(code, quiz)
+            with self._lock:
+                self.loads += 1
+                self.load_seconds += time.perf_counter() - started
+        return quiz
+
+    def stats(self):
+        with self._lock:
+            stored = self._conn.execute("SELECT COUNT(*) FROM published").fetchone()[0]
+            lookups = self.memory_hits + self.loads
+            return {
+                "published": stored,
+                "published_here": self.published,
+                "memory_entries": len(self.memory),
+                "memory_hits": self.memory_hits,
+                "loads": self.loads,
+                "unknown_codes": self.unknown,
+                "hit_rate": round(self.memory_hits / lookups, 4) if lookups else 0.0,
+                "avg_load_ms": round(self.load_seconds / self.loads * 1000, 2) if self.loads else 0.0,
+            }
@@ -0,0 +1,217 @@
+"""Persistent bank of validated questions with a full-text topic index
+
+Every validated question is stored with the lecture topics it was generated
+from. New requests are filled from the bank first; only the shortfall goes to
+the LLM. Matching uses an FTS5 index over question text, options, explanation
+and source topics, then keeps questions whose source topics are mostly covered
+by the new request's topics. Questions are only served to requests with the
+same AI instructions (compared ignoring case and whitespace), so a request for
+"numerical problems only" is not filled with questions written for another.
+"""
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from fanout import question_fingerprint
+from mcq_schema import validate_question
+
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have in into is it its of on or that the
+their there these this to was were which with what when where who why how not
+use using used about also such than then them they can may will should
+""".split())
+
+
+def topic_keywords(text):
+    """Lower-case content words used for matching"""
+    words = re.findall(r"[a-z0-9]+", (text or "").lower())
+    return {w for w in words if len(w) >= 3 and w not in STOPWORDS}
+
+
+def instructions_key(ai_instructions):
+    """Instructions as stored and matched: case and whitespace don't count"""
+    return " ".join((ai_instructions or "").split()).casefold()
+
+
+class QuestionBank:
+    """SQLite store of questions with an FTS5 index"""
+
+    def __init__(self, path, min_overlap=0.6):
+        self.path = path
+        self.min_overlap = min_overlap
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.questions_served = 0
+        self.full_fills = 0
+        self.partial_fills = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS questions (
+                id INTEGER PRIMARY KEY,
+                fingerprint TEXT NOT NULL UNIQUE,
+                question TEXT NOT NULL,
+                options TEXT NOT NULL,
+                correct_answer TEXT NOT NULL,
+                explanation TEXT NOT NULL,
+                topics TEXT NOT NULL,
+                instructions TEXT NOT NULL DEFAULT '',
+                created_at REAL NOT NULL,
+                served_count INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE VIRTUAL TABLE IF NOT EXISTS questions_fts USING fts5(
+                question, options, explanation, topics,
+                content='questions', content_rowid='id'
+            );
+            CREATE TRIGGER IF NOT EXISTS questions_ai AFTER INSERT ON questions BEGIN
+                INSERT INTO questions_fts (rowid, question, options, explanation, topics)
+                VALUES (new.id, new.question, new.options, new.explanation, new.topics);
+            END;
+            CREATE TRIGGER IF NOT EXISTS questions_ad AFTER DELETE ON questions BEGIN
+                INSERT INTO questions_fts (questions_fts, rowid, question, options, explanation, topics)
+                VALUES ('delete', old.id, old.question, old.options, old.explanation, old.topics);
+            END;
+            """
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(questions)")}
+        if "instructions" not in columns:
+            # Banks created before instructions were matched; their questions count as uninstructed
+            self._conn.execute("ALTER TABLE questions ADD COLUMN instructions TEXT NOT NULL DEFAULT ''")
+        self._conn.commit()
+
+    def add_questions(self, questions, lecture_topics, ai_instructions=""):
+        """Store valid questions; exact duplicates are ignored. Returns the number added"""
+        now = time.time()
+        instructions = instructions_key(ai_instructions)
+        rows = [
+            (
+                question_fingerprint(q),
+                q["question"],
+                json.dumps(q["options"], ensure_ascii=False),
+                q["correct_answer"],
+                q["explanation"],
+                lecture_topics,
+                instructions,
+                now,
+            )
+            for q in questions
+            if not validate_question(q)
+        ]
+        with self._lock:
+            cursor = self._conn.executemany(
+                "INSERT OR IGNORE INTO questions "
+                "(fingerprint, question, options, correct_answer, explanation, topics, instructions, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+            return max(cursor.rowcount, 0)
+
+    def find_questions(self, lecture_topics, limit, exclude=(), ai_instructions=""):
+        """Return up to `limit` stored questions that match the given topics
+
+        A question matches when it was stored with the same `ai_instructions`
+        and at least `min_overlap` of its source-topic keywords appear in
+        `lecture_topics`. Less-served questions come first so recurring
+        requests rotate through the bank.
+        """
+        keywords = topic_keywords(lecture_topics)
+        if not keywords or limit <= 0:
+            return []
+        query = " OR ".join(f'"{w}"' for w in sorted(keywords))
+        excluded = {question_fingerprint(q) for q in exclude}
+
+        with self._lock:
+            self.lookups += 1
+            rows = self._conn.execute(
+                """SELECT q.id, q.fingerprint, q.question, q.options, q.correct_answer,
+                          q.explanation, q.topics, q.served_count
+                   FROM questions_fts
+                   JOIN questions q ON q.id = questions_fts.rowid
+                   WHERE questions_fts MATCH ? AND q.instructions = ?
+                   ORDER BY bm25(questions_fts)
+                   LIMIT ?""",
+                (query, instructions_key(ai_instructions), max(limit * 20, 200)),
+            ).fetchall()
+
+            candidates = []
+            for row in rows:
+                row_id, fingerprint, _, _, _, _, topics, _ = row
+                if fingerprint in excluded:
+                    continue
+                source = topic_keywords(topics)
+                if source and len(source & keywords) / len(source) >= self.min_overlap:
+                    excluded.add(fingerprint)
+                    candidates.append(row)
+            # Stable sort keeps bm25 order among equally served questions
+            candidates.sort(key=lambda row: row[7])
+
+            found, ids = [], []
+            for row_id, _, question, options, correct, explanation, _, _ in candidates[:limit]:
+                ids.append(row_id)
+                found.append({
+                    "question": question,
+                    "options": json.loads(options),
+                    "correct_answer": correct,
+                    "explanation": explanation,
+                })
+
+            if ids:
+                self._conn.executemany(
+                    "UPDATE questions SET served_count = served_count + 1 WHERE id = ?",
+                    [(i,) for i in ids],
+                )
+                self._conn.commit()
+            self.questions_served += len(found)
+            if len(found) >= limit:
+                self.full_fills += 1
+            elif found:
+                self.partial_fills += 1
+        return found
+
+    def option_texts(self, lecture_topics, limit=100, max_words=4):
+        """Short option texts of stored questions that mention the topics; read-only
+
+        Used as distractor vocabulary, so unlike find_questions this does not
+        count anything as served.
+        """
+        keywords = topic_keywords(lecture_topics)
+        if not keywords or limit <= 0:
+            return []
+        query = " OR ".join(f'"{w}"' for w in sorted(keywords))
+        with self._lock:
+            rows = self._conn.execute(
+                """SELECT q.options FROM questions_fts
+                   JOIN questions q ON q.id = questions_fts.rowid
+                   WHERE questions_fts MATCH ?
+                   ORDER BY bm25(questions_fts)
+                   LIMIT ?""",
+                (query, limit),
+            ).fetchall()
+        texts = {}
+        for (options,) in rows:
+            for text in json.loads(options).values():
+                if isinstance(text, str) and len(text.split()) <= max_words:
+                    texts.setdefault(text.casefold(), text)
+        return list(texts.values())
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM questions").fetchone()[0]
+
+    def stats(self):
+        return {
+            "questions_stored": len(self),
+            "lookups": self.lookups,
+            "questions_served": self.questions_served,
+            "full_fills": self.full_fills,
+            "partial_fills": self.partial_fills,
+        }
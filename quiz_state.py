@@ -0,0 +1,184 @@
+"""Compact per-session quiz state and shared immutable quizzes
+
+A finished quiz is interned in a process-wide QuizStore: sessions taking the
+same quiz hold the same read-only Quiz object, identified by a content hash,
+and it is freed when the last session drops it. Each session's own progress
+is an AnswerSheet: one byte per answer plus the current position and flags.
+
+SessionMemory keeps the most recent state size reported by each session so
+the diagnostics sidebar can show bytes per session and the total.
+"""
+import hashlib
+import json
+import sys
+import threading
+import time
+import uuid
+import weakref
+from array import array
+from types import MappingProxyType
+
+from mcq_schema import OPTION_KEYS
+
+UNANSWERED = -1
+
+
+def quiz_id(questions):
+    """Stable ID for a list of question dicts (same content, same ID)"""
+    canonical = json.dumps(list(questions), sort_keys=True, ensure_ascii=False, default=dict)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+
+
+def freeze_question(question):
+    """Read-only copy of a question dict; indexing works as before"""
+    frozen = dict(question)
+    frozen["options"] = MappingProxyType(dict(question["options"]))
+    return MappingProxyType(frozen)
+
+
+class Quiz:
+    """An immutable quiz shared by every session that takes it"""
+
+    __slots__ = ("id", "questions", "__weakref__")
+
+    def __init__(self, quiz_id, questions):
+        self.id = quiz_id
+        self.questions = tuple(freeze_question(q) for q in questions)
+
+    def __len__(self):
+        return len(self.questions)
+
+    def __getitem__(self, index):
+        return self.questions[index]
+
+    def __iter__(self):
+        return iter(self.questions)
+
+
+class QuizStore:
+    """Interns quizzes by content so each distinct quiz is held once per process"""
+
+    def __init__(self):
+        self._quizzes = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+        self.interned = 0
+        self.shared = 0
+
+    def intern(self, questions):
+        """The shared Quiz for these questions, creating it if no session holds one"""
+        key = quiz_id(questions)
+        with self._lock:
+            self.interned += 1
+            quiz = self._quizzes.get(key)
+            if quiz is not None:
+                self.shared += 1
+                return quiz
+            quiz = self._quizzes[key] = Quiz(key, questions)
+            return quiz
+
+    def get(self, quiz_id):
+        """The live Quiz with this ID, or None once no session holds it"""
+        return self._quizzes.get(quiz_id)
+
+    def stats(self):
+        with self._lock:
+            quizzes = list(self._quizzes.values())
+            interned, shared = self.interned, self.shared
+        return {
+            "quizzes": len(quizzes),
+            "bytes": sum(deep_sizeof(quiz, shared=()) for quiz in quizzes),
+            "interned": interned,
+            "shared": shared,
+        }
+
+
+class AnswerSheet:
+    """One session's progress through a quiz
+
+    Answers are stored one signed byte per question (an index into
+    OPTION_KEYS, or UNANSWERED) instead of a dict of strings. attempt_id
+    names the attempt in the attempt store.
+    """
+
+    __slots__ = ("answers", "current", "completed", "show_feedback", "attempt_id")
+
+    def __init__(self, attempt_id=None):
+        self.answers = array("b")
+        self.current = 0
+        self.completed = False
+        self.show_feedback = False
+        self.attempt_id = attempt_id or uuid.uuid4().hex
+
+    def __setitem__(self, index, option):
+        if index >= len(self.answers):
+            self.answers.extend([UNANSWERED] * (index + 1 - len(self.answers)))
+        self.answers[index] = OPTION_KEYS.index(option)
+
+    def get(self, index, default=None):
+        if index < len(self.answers) and self.answers[index] != UNANSWERED:
+            return OPTION_KEYS[self.answers[index]]
+        return default
+
+    @property
+    def last_answer(self):
+        """The answer given to the current question"""
+        return self.get(self.current)
+
+    def score(self, quiz):
+        return sum(1 for i, question in enumerate(quiz) if self.get(i) == question["correct_answer"])
+
+
+def deep_sizeof(obj, shared=(Quiz,), _seen=None):
+    """Approximate bytes reachable from obj, not counting instances of `shared`
+
+    Follows builtin containers and __slots__ objects; any other object is
+    counted shallowly, since it is usually a handle to something the process
+    shares (a backend, a generation job, an exception).
+    """
+    if _seen is None:
+        _seen = set()
+    if id(obj) in _seen or (shared and isinstance(obj, shared)):
+        return 0
+    _seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (dict, MappingProxyType)):
+        for key, value in obj.items():
+            size += deep_sizeof(key, shared, _seen) + deep_sizeof(value, shared, _seen)
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        for item in obj:
+            size += deep_sizeof(item, shared, _seen)
+    elif hasattr(type(obj), "__slots__"):
+        for cls in type(obj).__mro__:
+            for name in getattr(cls, "__slots__", ()):
+                if name != "__weakref__" and hasattr(obj, name):
+                    size += deep_sizeof(getattr(obj, name), shared, _seen)
+    return size
+
+
+class SessionMemory:
+    """Latest session-state size reported by each live session"""
+
+    def __init__(self):
+        self._sizes = {}
+        self._lock = threading.Lock()
+
+    def record(self, session_id, state):
+        """Measure a session's state (a dict of its keys) and remember the size"""
+        size = deep_sizeof(state)
+        with self._lock:
+            self._sizes[session_id] = (size, time.monotonic())
+        return size
+
+    def stats(self, is_active=None):
+        """Sessions, total and per-session bytes; drops sessions that are gone"""
+        with self._lock:
+            if is_active is not None:
+                for session_id in [s for s in self._sizes if not is_active(s)]:
+                    del self._sizes[session_id]
+            sizes = [size for size, _ in self._sizes.values()]
+        return {
+            "sessions": len(sizes),
+            "total_bytes": sum(sizes),
+            "mean_bytes": round(sum(sizes) / len(sizes)) if sizes else 0,
+            "max_bytes": max(sizes, default=0),
+        }
@@ -0,0 +1,337 @@
+"""Quota-aware scheduling of LLM calls
+
+Every backend call first takes a slot from a process-wide RequestScheduler.
+Token buckets keep calls under the requests-per-minute and tokens-per-minute
+quotas. Waiting calls are served in priority order, then in arrival order:
+instructors before students, and interactive sessions before batch jobs. When
+the backend answers with a rate-limit error, dispatch pauses for its
+retry-after and the call is queued again. When the queue is full, new calls
+are rejected with QueueFull rather than piling up.
+"""
+import asyncio
+import heapq
+import itertools
+import re
+import threading
+import time
+
+import tracing
+from llm_backends import LLMBackend
+from mcq_prompt import requested_count
+
+PRIORITY_INSTRUCTOR = 0
+PRIORITY_STUDENT = 1
+PRIORITY_BATCH = 2
+
+PRIORITY_NAMES = {
+    PRIORITY_INSTRUCTOR: "instructor",
+    PRIORITY_STUDENT: "student",
+    PRIORITY_BATCH: "batch",
+}
+
+
+class QueueFull(RuntimeError):
+    """Raised when the scheduler cannot take another waiting call"""
+
+    def __init__(self, queued, retry_after):
+        super().__init__(f"{queued} requests are already waiting; retry in about {retry_after:.0f}s")
+        self.queued = queued
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Refills `per_minute` units per minute, holding at most one minute's worth"""
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount):
+        """Seconds until `amount` units are available (call refill first)"""
+        # A request larger than the bucket may go once the bucket is full
+        amount = min(amount, self.capacity)
+        return max(0.0, (amount - self.level) / self.rate)
+
+    def take(self, amount):
+        self.level -= min(amount, self.capacity)
+
+
+def estimate_tokens(prompt, tokens_per_question=0):
+    """Rough token count for a prompt (4 characters per token) plus expected output"""
+    questions = requested_count(prompt) or 1
+    return len(prompt) // 4 + 1 + questions * tokens_per_question
+
+
+def rate_limit_retry_after(error, default=10.0):
+    """Seconds to back off if `error` is a rate-limit response, else None"""
+    retry_after = getattr(error, "retry_after", None)
+    if retry_after is not None:
+        return float(retry_after)
+    text = str(error)
+    is_rate_limit = (
+        getattr(error, "code", None) == 429
+        or type(error).__name__ in ("ResourceExhausted", "TooManyRequests")
+        or "429" in text
+    )
+    if not is_rate_limit:
+        return None
+    # Gemini reports "retry_delay { seconds: 17 }" or "Please retry in 16.6s"
+    match = (re.search(r"retry_delay\s*\{\s*seconds:\s*([\d.]+)", text)
+             or re.search(r"retry in ([\d.]+)\s*s", text, re.IGNORECASE))
+    return float(match.group(1)) if match else default
+
+
+class _Ticket:
+    def __init__(self, priority, seq, tokens):
+        self.priority = priority
+        self.seq = seq
+        self.tokens = tokens
+
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class RequestScheduler:
+    """Priority queue of waiting LLM calls in front of per-minute quotas
+
+    A limit of 0 disables that bucket. `max_queue` of 0 means unbounded.
+    """
+
+    def __init__(self, requests_per_minute=0, tokens_per_minute=0, max_queue=0):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.max_queue = max_queue
+        self._cond = threading.Condition()
+        self._queue = []
+        self._seq = itertools.count()
+        self._paused_until = 0.0
+        self.granted = 0
+        self.rejected = 0
+        self.rate_limited = 0
+        self.total_wait = 0.0
+        self.max_depth = 0
+        self.spare_granted = 0
+        self.spare_denied = 0
+
+    def acquire(self, priority, tokens, on_wait=None, poll_interval=0.5):
+        """Block until this call may run; returns seconds spent waiting
+
+        `on_wait(position, eta_seconds)` is called while the call is queued.
+        """
+        started = time.monotonic()
+        with self._cond:
+            if self.max_queue and len(self._queue) >= self.max_queue:
+                self.rejected += 1
+                raise QueueFull(len(self._queue), self._eta_locked(len(self._queue), tokens))
+            ticket = _Ticket(priority, next(self._seq), tokens)
+            heapq.heappush(self._queue, ticket)
+            self.max_depth = max(self.max_depth, len(self._queue))
+
+        try:
+            while True:
+                with self._cond:
+                    now = time.monotonic()
+                    self._refill_locked(now)
+                    if self._queue[0] is ticket:
+                        delay = self._ready_in_locked(tokens, now)
+                        if delay <= 0:
+                            heapq.heappop(self._queue)
+                            if self.requests is not None:
+                                self.requests.take(1)
+                            if self.tokens is not None:
+                                self.tokens.take(tokens)
+                            waited = now - started
+                            self.granted += 1
+                            self.total_wait += waited
+                            self._cond.notify_all()
+                            return waited
+                        position = 1
+                    else:
+                        delay = poll_interval
+                        position = 1 + sum(1 for other in self._queue if other < ticket)
+                    eta = self._eta_locked(position - 1, tokens, ahead_of=ticket)
+
+                if on_wait is not None:
+                    on_wait(position, eta)
+                with self._cond:
+                    self._cond.wait(min(max(delay, 0.01), poll_interval))
+        except BaseException:
+            # Don't leave an abandoned ticket blocking the queue
+            with self._cond:
+                if ticket in self._queue:
+                    self._queue.remove(ticket)
+                    heapq.heapify(self._queue)
+                    self._cond.notify_all()
+            raise
+
+    def try_acquire(self, tokens):
+        """Take quota for a call only if it is free right now; never queues
+
+        For optional calls such as hedges: they run only when nobody is
+        waiting and the buckets have room, so they can't delay queued calls
+        or push the process into the provider's rate limit.
+        """
+        with self._cond:
+            now = time.monotonic()
+            self._refill_locked(now)
+            if self._queue or self._ready_in_locked(tokens, now) > 0:
+                self.spare_denied += 1
+                return False
+            if self.requests is not None:
+                self.requests.take(1)
+            if self.tokens is not None:
+                self.tokens.take(tokens)
+            self.granted += 1
+            self.spare_granted += 1
+            return True
+
+    def pause(self, seconds):
+        """Hold all dispatch for `seconds`, e.g. after a 429 with retry-after"""
+        with self._cond:
+            self.rate_limited += 1
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def _refill_locked(self, now):
+        for bucket in (self.requests, self.tokens):
+            if bucket is not None:
+                bucket.refill(now)
+
+    def _ready_in_locked(self, tokens, now):
+        delay = self._paused_until - now
+        if self.requests is not None:
+            delay = max(delay, self.requests.wait_time(1))
+        if self.tokens is not None:
+            delay = max(delay, self.tokens.wait_time(tokens))
+        return delay
+
+    def _eta_locked(self, ahead, tokens, ahead_of=None):
+        """Estimated seconds until a call behind `ahead` others may start"""
+        now = time.monotonic()
+        self._refill_locked(now)
+        eta = max(0.0, self._paused_until - now)
+        if self.requests is not None:
+            eta = max(eta, (ahead + 1 - self.requests.level) / self.requests.rate)
+        if self.tokens is not None:
+            queued = self._queue if ahead_of is None else [t for t in self._queue if t < ahead_of]
+            needed = sum(t.tokens for t in queued) + tokens
+            eta = max(eta, max(0.0, (needed - self.tokens.level) / self.tokens.rate))
+        return eta
+
+    def status(self):
+        """Current queue depth and estimated wait for a new call"""
+        with self._cond:
+            depth = len(self._queue)
+            return depth, self._eta_locked(depth, 0)
+
+    def stats(self):
+        with self._cond:
+            now = time.monotonic()
+            self._refill_locked(now)
+            return {
+                "queued": len(self._queue),
+                "queued_by_priority": {
+                    PRIORITY_NAMES.get(p, str(p)): sum(1 for t in self._queue if t.priority == p)
+                    for p in sorted({t.priority for t in self._queue})
+                },
+                "granted": self.granted,
+                "spare_granted": self.spare_granted,
+                "spare_denied": self.spare_denied,
+                "rejected": self.rejected,
+                "rate_limited": self.rate_limited,
+                "avg_wait_ms": round(self.total_wait / self.granted * 1000, 1) if self.granted else 0.0,
+                "max_depth": self.max_depth,
+                "paused_for_s": round(max(0.0, self._paused_until - now), 1),
+                "requests_available": round(self.requests.level, 1) if self.requests else None,
+                "tokens_available": round(self.tokens.level) if self.tokens else None,
+            }
+
+    def wrap(self, backend, priority, tokens_per_question=0, max_retries=2, on_wait=None):
+        """Backend whose calls go through this scheduler at the given priority"""
+        return ScheduledBackend(backend, self, priority, tokens_per_question, max_retries, on_wait)
+
+    def hedge_gate(self, tokens_per_question=0):
+        """`allow_hedge` for a HedgedBackend below this scheduler: each hedge takes spare quota"""
+        return lambda prompt: self.try_acquire(estimate_tokens(prompt, tokens_per_question))
+
+
+class ScheduledBackend(LLMBackend):
+    """Backend wrapper that takes a scheduler slot before every call
+
+    Rate-limit errors pause the scheduler for the reported retry-after and the
+    call is queued again, up to `max_retries` times. `queue_position` and
+    `queue_eta` describe the most recent wait and are 0 once the call runs.
+    """
+
+    def __init__(self, backend, scheduler, priority, tokens_per_question=0, max_retries=2, on_wait=None):
+        self.backend = backend
+        self.scheduler = scheduler
+        self.priority = priority
+        self.tokens_per_question = tokens_per_question
+        self.max_retries = max_retries
+        self.on_wait = on_wait
+        self.name = backend.name
+        self.model_name = backend.model_name
+        self.queue_position = 0
+        self.queue_eta = 0.0
+
+    def _waiting(self, position, eta):
+        self.queue_position = position
+        self.queue_eta = eta
+        if self.on_wait is not None:
+            self.on_wait(position, eta)
+
+    def _acquire(self, prompt):
+        waited = self.scheduler.acquire(
+            self.priority, estimate_tokens(prompt, self.tokens_per_question), self._waiting
+        )
+        tracing.observe("queue_wait", waited)
+        self.queue_position = 0
+        self.queue_eta = 0.0
+
+    def _should_retry(self, error, attempt):
+        retry_after = rate_limit_retry_after(error)
+        if retry_after is None or attempt >= self.max_retries:
+            return False
+        self.scheduler.pause(retry_after)
+        return True
+
+    def generate(self, prompt, response_schema=None):
+        for attempt in itertools.count():
+            self._acquire(prompt)
+            try:
+                return self.backend.generate(prompt, response_schema=response_schema)
+            except Exception as e:
+                if not self._should_retry(e, attempt):
+                    raise
+
+    def stream(self, prompt, response_schema=None):
+        for attempt in itertools.count():
+            self._acquire(prompt)
+            started = False
+            try:
+                for chunk in self.backend.stream(prompt, response_schema=response_schema):
+                    started = True
+                    yield chunk
+                return
+            except Exception as e:
+                # Chunks already handed out can't be taken back, so only retry before the first
+                if started or not self._should_retry(e, attempt):
+                    raise
+
+    async def generate_async(self, prompt, response_schema=None):
+        for attempt in itertools.count():
+            await asyncio.to_thread(self._acquire, prompt)
+            try:
+                return await self.backend.generate_async(prompt, response_schema=response_schema)
+            except Exception as e:
+                if not self._should_retry(e, attempt):
+                    raise
+
+    def warm_up(self):
+        return self.backend.warm_up()
@@ -0,0 +1,125 @@
+"""Coalesce identical in-flight generation requests across sessions
+
+When many sessions ask for the same quiz at once, only the first (the leader)
+calls the LLM. The others wait for it and share its result or its exception.
+Keys are the normalized request keys from mcq_cache.make_cache_key, so
+requests that differ only in whitespace or case are coalesced too.
+"""
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class _Shared(_Call):
+    """A shared object, set once start() returns, and how to tell it is finished"""
+
+    def __init__(self, is_done):
+        super().__init__()
+        self.is_done = is_done
+
+    def finished(self):
+        if not self.done.is_set():
+            return False
+        return self.error is not None or self.is_done(self.result)
+
+
+class SingleFlight:
+    """Process-wide map of request key to the one call producing its result"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._shared = {}
+        self.requests = 0
+        self.leaders = 0
+        self.coalesced = 0
+        self.max_waiters = 0
+
+    def do(self, key, fn):
+        """Run fn() once per key at a time; concurrent callers get the same result"""
+        with self._lock:
+            self.requests += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+            else:
+                call.waiters += 1
+                self.coalesced += 1
+                self.max_waiters = max(self.max_waiters, call.waiters)
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result
+
+    def share(self, key, start, is_done):
+        """Return the unfinished object registered for key, or register start()
+
+        Used for streamed quizzes: every session opening the same request while
+        it is still streaming reads the one StreamingQuiz the leader started.
+        start() runs outside the lock, so unrelated keys don't queue behind it;
+        callers arriving meanwhile wait for it and share its result or exception.
+        `is_done` is kept with the entry and only ever applied to its own object.
+        """
+        with self._lock:
+            self.requests += 1
+            for other in [k for k, entry in self._shared.items() if entry.finished()]:
+                del self._shared[other]
+            entry = self._shared.get(key)
+            leader = entry is None
+            if leader:
+                entry = self._shared[key] = _Shared(is_done)
+                self.leaders += 1
+            else:
+                entry.waiters += 1
+                self.coalesced += 1
+                self.max_waiters = max(self.max_waiters, entry.waiters)
+
+        if not leader:
+            entry.done.wait()
+            if entry.error is not None:
+                raise entry.error
+            return entry.result
+
+        try:
+            entry.result = start()
+        except Exception as e:
+            entry.error = e
+            with self._lock:
+                if self._shared.get(key) is entry:
+                    del self._shared[key]
+            raise
+        finally:
+            entry.done.set()
+        return entry.result
+
+    def stats(self):
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "leaders": self.leaders,
+                "coalesced_waiters": self.coalesced,
+                "max_waiters": self.max_waiters,
+                "in_flight": len(self._calls) + len(self._shared),
+                "coalescing_ratio": round(self.coalesced / self.requests, 4) if self.requests else 0.0,
+            }
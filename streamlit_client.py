@@ -0,0 +1,190 @@
+"""Minimal websocket client for a running Streamlit server
+
+Drives one browser-less session the way the frontend does: it sends
+rerun_script BackMsgs carrying widget states (with the fragment id when the
+widget lives in a fragment), answers auto-rerun requests from
+st.fragment(run_every=...), and records wall time and bytes received for
+every interaction. Used by the interaction benchmark and the load test.
+"""
+import asyncio
+import time
+from dataclasses import dataclass, field
+
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+FINAL_STATUSES = {
+    ForwardMsg.FINISHED_SUCCESSFULLY,
+    ForwardMsg.FINISHED_WITH_COMPILE_ERROR,
+    ForwardMsg.FINISHED_FRAGMENT_RUN_SUCCESSFULLY,
+}
+WIDGET_TYPES = {"button", "text_area", "text_input", "radio", "selectbox", "checkbox", "toggle"}
+
+
+@dataclass
+class Widget:
+    id: str
+    kind: str
+    label: str
+    fragment_id: str
+    options: list = field(default_factory=list)
+
+
+@dataclass
+class Interaction:
+    """One rerun as seen by the client"""
+    name: str
+    seconds: float
+    bytes: int
+    messages: int
+    fragment: bool
+
+
+class StreamlitSession:
+    """One websocket session against `url` (e.g. http://127.0.0.1:8501)"""
+
+    def __init__(self, url, query_string=""):
+        self.url = url.rstrip("/").replace("http://", "ws://").replace("https://", "wss://")
+        self.query_string = query_string
+        self.widgets = {}
+        self.texts = []
+        self.exceptions = []
+        self.auto_reruns = {}
+        self.history = []
+        self._values = {}
+        self._ws = None
+
+    async def __aenter__(self):
+        import websockets
+
+        self._ws = await websockets.connect(
+            f"{self.url}/_stcore/stream", subprotocols=["streamlit"], max_size=None
+        )
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._ws.close()
+
+    # --- widgets ---------------------------------------------------------
+
+    def find(self, label, kind=None):
+        """The most recently rendered widget with this label, or None"""
+        for widget in reversed(list(self.widgets.values())):
+            if widget.label == label and (kind is None or widget.kind == kind):
+                return widget
+        return None
+
+    def has_text(self, fragment):
+        return any(fragment in text for text in self.texts)
+
+    def set_value(self, label, value):
+        """Set a text, radio or selectbox value to send with the next rerun"""
+        widget = self.find(label)
+        if widget is None:
+            raise LookupError(f"no widget labelled {label!r}")
+        self._values[widget.id] = ("string_value", value)
+
+    async def click(self, label, name=None, timeout=30.0):
+        widget = self.find(label, "button")
+        if widget is None:
+            raise LookupError(f"no button labelled {label!r}")
+        return await self.rerun(
+            name or label, triggers=[widget.id], fragment_id=widget.fragment_id, timeout=timeout
+        )
+
+    # --- reruns ----------------------------------------------------------
+
+    async def rerun(self, name="rerun", triggers=(), fragment_id="", auto=False, timeout=30.0):
+        """Send one rerun request and read messages until that run finishes"""
+        message = BackMsg()
+        state = message.rerun_script
+        state.query_string = self.query_string
+        state.page_script_hash = ""
+        if fragment_id:
+            state.fragment_id = fragment_id
+        state.is_auto_rerun = auto
+        for widget_id, (kind, value) in self._values.items():
+            if widget_id in self.widgets:
+                widget_state = state.widget_states.widgets.add()
+                widget_state.id = widget_id
+                setattr(widget_state, kind, value)
+        for widget_id in triggers:
+            widget_state = state.widget_states.widgets.add()
+            widget_state.id = widget_id
+            widget_state.trigger_value = True
+
+        started = time.perf_counter()
+        await self._ws.send(message.SerializeToString())
+        received = count = 0
+        while True:
+            raw = await asyncio.wait_for(self._ws.recv(), timeout)
+            received += len(raw)
+            count += 1
+            msg = ForwardMsg()
+            msg.ParseFromString(raw)
+            if self._apply(msg):
+                break
+        interaction = Interaction(name, time.perf_counter() - started, received, count, bool(fragment_id))
+        self.history.append(interaction)
+        return interaction
+
+    async def poll(self, timeout=30.0):
+        """Run every auto-rerunning fragment once, as the frontend's timers would"""
+        results = []
+        for fragment_id, interval in list(self.auto_reruns.items()):
+            await asyncio.sleep(interval)
+            if fragment_id in self.auto_reruns:
+                results.append(await self.rerun("poll", fragment_id=fragment_id, auto=True,
+                                                timeout=timeout))
+        return results
+
+    async def wait_for(self, ready, timeout=60.0):
+        """Poll auto-rerunning fragments until ready(self) or the timeout passes"""
+        deadline = time.monotonic() + timeout
+        while not ready(self):
+            if time.monotonic() > deadline:
+                raise TimeoutError("session did not reach the expected state")
+            if not self.auto_reruns:
+                await asyncio.sleep(0.05)
+                await self.rerun("poll")
+            else:
+                await self.poll()
+
+    def _apply(self, msg):
+        """Update client state from one ForwardMsg; True when the run is over"""
+        kind = msg.WhichOneof("type")
+        if kind == "new_session":
+            fragments = set(msg.new_session.fragment_ids_this_run)
+            if fragments:
+                # A fragment run only replaces that fragment's widgets
+                self.widgets = {
+                    key: widget for key, widget in self.widgets.items()
+                    if widget.fragment_id not in fragments
+                }
+            else:
+                # A full script run starts: the page is rebuilt from scratch
+                self.widgets = {}
+                self.texts = []
+                self.exceptions = []
+                self.auto_reruns = {}
+        elif kind == "auto_rerun":
+            self.auto_reruns[msg.auto_rerun.fragment_id] = msg.auto_rerun.interval
+        elif kind == "delta" and msg.delta.WhichOneof("type") == "new_element":
+            element = msg.delta.new_element
+            element_type = element.WhichOneof("type")
+            proto = getattr(element, element_type)
+            if element_type in WIDGET_TYPES:
+                self.widgets[proto.id] = Widget(
+                    proto.id, element_type, proto.label, msg.delta.fragment_id,
+                    list(getattr(proto, "options", [])),
+                )
+            elif element_type == "exception":
+                self.exceptions.append(proto.message)
+            else:
+                for attr in ("label", "body", "text"):
+                    text = getattr(proto, attr, None)
+                    if isinstance(text, str) and text:
+                        self.texts.append(text)
+        elif kind == "script_finished":
+            return msg.script_finished in FINAL_STATUSES
+        return False
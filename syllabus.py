@@ -0,0 +1,176 @@
+"""Whole-syllabus generation: one quiz per lecture, checkpointed and resumable
+
+A syllabus is a CSV or JSON list of lectures, each with a title, its topics
+and optionally instructions and a question count. SyllabusRun submits one
+job per lecture to a shared executor, so lectures generate in parallel
+while every LLM call still goes through the global scheduler.
+
+Each finished lecture is appended to a JSONL checkpoint named after the
+syllabus content. Starting the same syllabus again loads the checkpoint and
+only generates lectures that are missing, so a crash or quota exhaustion
+resumes where it stopped.
+"""
+import csv
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+
+TITLE_FIELDS = ("lecture", "title", "name")
+TOPIC_FIELDS = ("topics", "summary", "content")
+
+
+def _field(row, names):
+    for name in names:
+        value = row.get(name)
+        if value:
+            return value
+    return None
+
+
+def parse_syllabus(filename, data, default_questions=5, max_questions=20):
+    """Lectures from an uploaded CSV or JSON file; raises ValueError if unusable
+
+    JSON may be a list of lectures or {"lectures": [...]}; topics may be a
+    string or a list of strings. n_questions is clamped to 1..max_questions,
+    and a clamped lecture keeps the value it asked for as requested_questions.
+    """
+    text = data.decode("utf-8-sig") if isinstance(data, bytes) else data
+    if filename.lower().endswith(".json"):
+        rows = json.loads(text)
+        if isinstance(rows, dict):
+            rows = rows.get("lectures", [])
+    else:
+        rows = list(csv.DictReader(io.StringIO(text)))
+    if not isinstance(rows, list):
+        raise ValueError("expected a list of lectures")
+
+    lectures = []
+    for number, row in enumerate(rows, 1):
+        if not isinstance(row, dict):
+            raise ValueError(f"lecture {number} is not an object")
+        row = {str(key).strip().lower(): value for key, value in row.items() if key is not None}
+        topics = _field(row, TOPIC_FIELDS)
+        if isinstance(topics, list):
+            topics = "\n".join(str(topic) for topic in topics)
+        if not topics or not str(topics).strip():
+            raise ValueError(f"lecture {number} has no topics")
+        try:
+            requested = int(row.get("n_questions") or default_questions)
+        except (TypeError, ValueError):
+            raise ValueError(f"lecture {number} has an invalid n_questions") from None
+        lecture = {
+            "lecture": str(_field(row, TITLE_FIELDS) or f"Lecture {number}"),
+            "topics": str(topics).strip(),
+            "instructions": str(row.get("instructions") or ""),
+            "n_questions": min(max(requested, 1), max_questions),
+        }
+        if lecture["n_questions"] != requested:
+            lecture["requested_questions"] = requested
+        lectures.append(lecture)
+    if not lectures:
+        raise ValueError("the syllabus has no lectures")
+    return lectures
+
+
+def syllabus_id(lectures):
+    canonical = json.dumps(lectures, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+
+
+class SyllabusRun:
+    """Progress of one syllabus: finished, failed and pending lectures"""
+
+    def __init__(self, lectures, checkpoint_dir):
+        self.lectures = lectures
+        self.id = syllabus_id(lectures)
+        self.checkpoint_path = os.path.join(checkpoint_dir, f"{self.id}.jsonl")
+        self.results = {}
+        self.errors = {}
+        self.resumed = 0
+        self.completed_this_run = 0
+        self.started_at = time.monotonic()
+        self.done = False
+        self._running = 0
+        self._lock = threading.Lock()
+        self._load_checkpoint()
+
+    def _load_checkpoint(self):
+        if not os.path.exists(self.checkpoint_path):
+            return
+        with open(self.checkpoint_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A crash mid-write leaves a partial last line; that lecture reruns
+                    continue
+                self.results[record["index"]] = record["questions"]
+        self.resumed = len(self.results)
+
+    def _checkpoint(self, index, questions):
+        os.makedirs(os.path.dirname(self.checkpoint_path) or ".", exist_ok=True)
+        record = {"index": index, "lecture": self.lectures[index]["lecture"], "questions": questions}
+        with open(self.checkpoint_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def pending(self):
+        return [i for i in range(len(self.lectures)) if i not in self.results]
+
+    def start(self, generate, executor):
+        """Submit every unfinished lecture; generate(lecture) returns its questions"""
+        pending = self.pending()
+        self.errors = {}
+        self.started_at = time.monotonic()
+        self.completed_this_run = 0
+        self.done = not pending
+        self._running = len(pending)
+        for index in pending:
+            executor.submit(self._run_lecture, generate, index)
+        return self
+
+    def _run_lecture(self, generate, index):
+        try:
+            questions = generate(self.lectures[index])
+            if not questions:
+                raise ValueError("no valid questions generated")
+        except Exception as e:
+            with self._lock:
+                self.errors[index] = e
+        else:
+            with self._lock:
+                self._checkpoint(index, questions)
+                self.results[index] = questions
+                self.completed_this_run += 1
+        finally:
+            with self._lock:
+                self._running -= 1
+                if self._running == 0:
+                    self.done = True
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.started_at
+
+    def progress(self):
+        """(finished, failed, total, eta_seconds or None)"""
+        with self._lock:
+            finished = len(self.results)
+            failed = len(self.errors)
+            completed = self.completed_this_run
+        total = len(self.lectures)
+        remaining = total - finished - failed
+        eta = None
+        if completed and remaining:
+            eta = self.elapsed / completed * remaining
+        return finished, failed, total, eta
+
+    def export_jsonl(self):
+        """Finished lectures as JSONL, in syllabus order"""
+        lines = []
+        for index, lecture in enumerate(self.lectures):
+            if index in self.results:
+                lines.append(json.dumps({**lecture, "questions": self.results[index]}, ensure_ascii=False))
+        return "\n".join(lines) + "\n"
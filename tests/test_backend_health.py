@@ -0,0 +1,46 @@
+import json
+import threading
+from types import SimpleNamespace
+
+import generation
+from llm_backends import BackendRegistry, MockBackend
+from mcq_schema import OutputMetrics
+
+TOPICS = "\n".join(f"Topic {i}: definition and units of concept {i}" for i in range(1, 4))
+
+
+def test_failing_health_path_does_not_fail_generation(tmp_path):
+    not_a_dir = tmp_path / "health"
+    not_a_dir.write_text("")
+    registry = BackendRegistry(str(not_a_dir / "backend_health.json"), heartbeat_seconds=0)
+    resources = SimpleNamespace(cache=None, metrics=OutputMetrics(), registry=registry)
+
+    mcqs = generation.generate_llm_mcqs(TOPICS, "", 3, MockBackend(latency=0), resources)
+
+    assert len(mcqs["questions"]) == 3
+    assert registry.health()["backends"]["mock"]["warm"]
+
+
+def test_concurrent_health_writes_leave_a_complete_file(tmp_path, caplog):
+    path = tmp_path / "backend_health.json"
+    registry = BackendRegistry(str(path), heartbeat_seconds=0)
+    registry.mark_warm(MockBackend(latency=0))
+    errors = []
+
+    def write():
+        for _ in range(10):
+            try:
+                registry._write_health()
+            except OSError as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=write) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert not caplog.records
+    assert json.loads(path.read_text())["warm"]
+    assert [p.name for p in tmp_path.iterdir()] == ["backend_health.json"]
@@ -0,0 +1,46 @@
+import asyncio
+import json
+
+import pytest
+
+import config
+from batch_generate import run_batch
+from llm_backends import MockBackend
+from question_bank import QuestionBank
+
+
+@pytest.fixture(autouse=True)
+def no_shared_stores(monkeypatch):
+    monkeypatch.setattr(config, "BANK_ENABLED", False)
+
+
+def test_non_object_lines_are_reported_not_fatal(tmp_path):
+    source = tmp_path / "requests.jsonl"
+    source.write_text('[1, 2]\n"x"\n{"topics": "Photosynthesis: light to sugar\\nRespiration: sugar to energy", "n_questions": 2}\n',
+                      encoding="utf-8")
+    output = tmp_path / "out.jsonl"
+
+    failures = asyncio.run(run_batch(MockBackend(latency=0), str(source), str(output), use_cache=False))
+
+    results = {r["line"]: r for r in map(json.loads, output.read_text(encoding="utf-8").splitlines())}
+    assert failures == 2
+    assert results[1]["status"] == "error" and "not a JSON object" in results[1]["error"]
+    assert results[2]["status"] == "error"
+    assert results[3]["status"] == "ok" and len(results[3]["questions"]) == 2
+
+
+def test_batch_quizzes_are_stored_in_the_bank(monkeypatch, tmp_path):
+    monkeypatch.setattr(config, "BANK_ENABLED", True)
+    monkeypatch.setattr(config, "BANK_DB_PATH", str(tmp_path / "bank.db"))
+    topics = "Photosynthesis: light to sugar\nRespiration: sugar to energy"
+    source = tmp_path / "requests.jsonl"
+    source.write_text(json.dumps({"topics": topics, "instructions": "Numerical only", "n_questions": 2}) + "\n",
+                      encoding="utf-8")
+
+    failures = asyncio.run(run_batch(MockBackend(latency=0), str(source), str(tmp_path / "out.jsonl"),
+                                     use_cache=False))
+
+    bank = QuestionBank(config.BANK_DB_PATH)
+    assert failures == 0
+    assert len(bank.find_questions(topics, 5, ai_instructions="numerical only")) == 2
+    assert bank.find_questions(topics, 5) == []
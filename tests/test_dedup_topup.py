@@ -0,0 +1,47 @@
+from types import SimpleNamespace
+
+import generation
+from dedup import QuizDeduper
+from llm_backends import MockBackend
+from mcq_schema import OutputMetrics
+
+TOPICS = "\n".join(f"Topic {i}: definition and units of concept {i}" for i in range(1, 6))
+
+
+class RepeatingBackend(MockBackend):
+    """First responses repeat their first question; repair calls answer normally"""
+
+    def build_questions(self, prompt):
+        questions = super().build_questions(prompt)
+        if "were rejected" in prompt:
+            return [{
+                "question": f"Which unit measures quantity {i} in the replacement set?",
+                "options": {"A": f"Kelvin {i}", "B": f"Pascal {i}", "C": f"Joule {i}", "D": f"Tesla {i}"},
+                "correct_answer": "C",
+                "explanation": f"Replacement question {i}.",
+            } for i in range(len(questions))]
+        return [questions[0]] * 2 + questions[2:]
+
+
+def deduper(metrics):
+    return QuizDeduper(None, 0.45, "flag", metrics)
+
+
+def test_whole_quiz_replaces_dropped_duplicates():
+    metrics = OutputMetrics()
+    resources = SimpleNamespace(cache=None, metrics=metrics, registry=SimpleNamespace(mark_warm=lambda b: None))
+    mcqs = generation.generate_llm_mcqs(TOPICS, "", 5, RepeatingBackend(latency=0), resources, deduper(metrics))
+
+    assert len(mcqs["questions"]) == 5
+    assert metrics.stats()["near_duplicates_dropped"] == 1
+    assert metrics.stats()["questions_repaired"] == 1
+
+
+def test_stream_replaces_dropped_duplicates():
+    metrics = OutputMetrics()
+    questions = list(generation.stream_llm_mcqs(TOPICS, "", RepeatingBackend(latency=0), None, 5, metrics,
+                                         deduper(metrics)))
+
+    assert len(questions) == 5
+    assert len({q["question"] for q in questions}) == 5
+    assert metrics.stats()["questions_missing"] == 0
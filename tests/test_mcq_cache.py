@@ -0,0 +1,73 @@
+import mcq_cache
+from mcq_cache import LRUCache, MCQCache
+
+QUIZ = {"questions": [{"question": "What is 2 + 2?", "options": {"A": "3", "B": "4"}, "correct_answer": "B"}]}
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_memory_entries_expire_after_ttl(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(mcq_cache.time, "time", clock)
+    cache = LRUCache(4, ttl_seconds=60)
+    cache.set("key", QUIZ)
+
+    clock.now += 59
+    assert cache.get("key") is QUIZ
+    clock.now += 2
+    assert cache.get("key") is None
+    assert len(cache) == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = LRUCache(2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+
+
+def test_disk_entry_is_promoted_to_memory(tmp_path):
+    path = str(tmp_path / "cache.db")
+    MCQCache(db_path=path).set("key", QUIZ)
+    cache = MCQCache(db_path=path)
+
+    assert cache.get("key") == QUIZ
+    assert cache.get("key") == QUIZ
+    stats = cache.stats()
+    assert (stats["disk_hits"], stats["memory_hits"], stats["memory_entries"]) == (1, 1, 1)
+
+
+def test_promoted_entry_keeps_its_disk_expiry(monkeypatch, tmp_path):
+    clock = Clock()
+    monkeypatch.setattr(mcq_cache.time, "time", clock)
+    path = str(tmp_path / "cache.db")
+    MCQCache(db_path=path, ttl_seconds=60).set("key", QUIZ)
+    clock.now += 50
+    cache = MCQCache(db_path=path, ttl_seconds=60)
+    assert cache.get("key") == QUIZ
+
+    clock.now += 11
+    assert cache.get("key") is None
+
+
+def test_callers_cannot_change_the_cached_value(tmp_path):
+    cache = MCQCache(db_path=str(tmp_path / "cache.db"))
+    quiz = {"questions": [dict(q) for q in QUIZ["questions"]]}
+    cache.set("key", quiz)
+    quiz["questions"].clear()
+
+    first = cache.get("key")
+    first["questions"][0]["correct_answer"] = "A"
+    first["questions"].append({})
+
+    assert cache.get("key") == QUIZ
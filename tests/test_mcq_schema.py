@@ -0,0 +1,22 @@
+import pytest
+
+from mcq_schema import validate_question
+
+
+def question(**fields):
+    base = {
+        "question": "Which gas do plants absorb?",
+        "options": {"A": "Carbon dioxide", "B": "Oxygen", "C": "Nitrogen", "D": "Helium"},
+        "correct_answer": "A",
+        "explanation": "Plants take in carbon dioxide for photosynthesis.",
+    }
+    return {**base, **fields}
+
+
+def test_valid_question_has_no_problems():
+    assert validate_question(question()) == []
+
+
+@pytest.mark.parametrize("answer", [["A"], {"key": "A"}, None, 1])
+def test_non_string_correct_answer_is_rejected(answer):
+    assert validate_question(question(correct_answer=answer)) == ["correct_answer is not a string"]
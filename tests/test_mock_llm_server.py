@@ -0,0 +1,49 @@
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from llm_backends import BackendError, HTTPBackend, MockBackend
+from mock_llm_server import make_handler
+
+
+class FailingMidStream(MockBackend):
+    def stream(self, prompt, response_schema=None):
+        yield '{"questions": ['
+        raise BackendError("connection reset")
+
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def start(backend):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(backend))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return HTTPBackend(f"http://127.0.0.1:{server.server_address[1]}", timeout=10)
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_stream_returns_the_mock_response(serve):
+    client = serve(MockBackend(latency=0))
+
+    assert '"questions"' in "".join(client.stream("Generate 2 multiple choice questions"))
+
+
+def test_injected_error_on_stream_raises_backend_error(serve):
+    client = serve(MockBackend(latency=0, error_rate=1.0))
+
+    with pytest.raises(BackendError, match="503"):
+        list(client.stream("Generate 2 multiple choice questions"))
+
+
+def test_error_after_the_first_chunk_raises_backend_error(serve):
+    client = serve(FailingMidStream(latency=0))
+
+    with pytest.raises(BackendError, match="connection reset"):
+        list(client.stream("Generate 2 multiple choice questions"))
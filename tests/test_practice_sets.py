@@ -0,0 +1,51 @@
+from types import SimpleNamespace
+
+import generation
+from llm_backends import MockBackend
+from mcq_schema import OutputMetrics
+from prefetch import practice_instructions
+from question_bank import QuestionBank
+
+TOPICS = "\n".join(f"Topic {i}: definition and units of concept {i}" for i in range(1, 6))
+
+
+class PracticeBackend(MockBackend):
+    """Numbers its questions by practice set so sets can be told apart"""
+
+    def build_questions(self, prompt):
+        questions = super().build_questions(prompt)
+        number = next((n for n in range(2, 10) if f"practice set {n}" in prompt), 1)
+        return [dict(q, question=f"Set {number}: {q['question']}") for q in questions]
+
+
+def texts(questions):
+    return {q["question"] for q in questions}
+
+
+def test_streamed_practice_set_skips_banked_earlier_sets(tmp_path):
+    bank = QuestionBank(str(tmp_path / "bank.db"))
+    backend = PracticeBackend(latency=0)
+
+    def practice_set(number, earlier_sets):
+        instructions = practice_instructions("", number)
+        return list(generation.stream_mcqs(TOPICS, instructions, backend, None, 5, OutputMetrics(), bank, None,
+                                    earlier_sets))
+
+    first = practice_set(1, [])
+    second = practice_set(2, [first])
+
+    assert len(second) == 5
+    assert not texts(first) & texts(second)
+
+
+def test_whole_quiz_practice_set_skips_banked_earlier_sets(tmp_path):
+    metrics = OutputMetrics()
+    resources = SimpleNamespace(cache=None, bank=QuestionBank(str(tmp_path / "bank.db")), metrics=metrics,
+                                registry=SimpleNamespace(mark_warm=lambda b: None), deduper=lambda: None)
+    backend = PracticeBackend(latency=0)
+
+    first = generation.build_quiz(TOPICS, "", 5, backend, resources)["questions"]
+    second = generation.build_quiz(TOPICS, practice_instructions("", 2), 5, backend, resources, [first])["questions"]
+
+    assert len(second) == 5
+    assert not texts(first) & texts(second)
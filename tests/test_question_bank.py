@@ -0,0 +1,56 @@
+import json
+import sqlite3
+
+from question_bank import QuestionBank
+
+TOPICS = "Topic 1: Ohm's law relates voltage, current and resistance"
+
+
+def question(i):
+    return {
+        "question": f"Question {i} about voltage and resistance?",
+        "options": {"A": f"Volt {i}", "B": f"Ampere {i}", "C": f"Ohm {i}", "D": f"Watt {i}"},
+        "correct_answer": "C",
+        "explanation": f"Explanation {i}.",
+    }
+
+
+def test_questions_are_served_only_for_the_same_instructions(tmp_path):
+    bank = QuestionBank(str(tmp_path / "bank.db"))
+    bank.add_questions([question(1), question(2)], TOPICS)
+    bank.add_questions([question(3)], TOPICS, "Numerical problems only")
+
+    assert len(bank.find_questions(TOPICS, 5)) == 2
+    numerical = bank.find_questions(TOPICS, 5, ai_instructions="  numerical PROBLEMS   only ")
+    assert [q["question"] for q in numerical] == [question(3)["question"]]
+    assert bank.find_questions(TOPICS, 5, ai_instructions="Conceptual questions") == []
+
+
+def test_existing_bank_gains_the_instructions_column(tmp_path):
+    path = str(tmp_path / "bank.db")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        """CREATE TABLE questions (
+               id INTEGER PRIMARY KEY, fingerprint TEXT NOT NULL UNIQUE, question TEXT NOT NULL,
+               options TEXT NOT NULL, correct_answer TEXT NOT NULL, explanation TEXT NOT NULL,
+               topics TEXT NOT NULL, created_at REAL NOT NULL, served_count INTEGER NOT NULL DEFAULT 0
+           )"""
+    )
+    conn.commit()
+    conn.close()
+
+    bank = QuestionBank(path)
+    bank.add_questions([question(1)], TOPICS)
+
+    assert len(bank.find_questions(TOPICS, 5)) == 1
+
+
+def test_option_texts_skips_non_string_options(tmp_path):
+    bank = QuestionBank(str(tmp_path / "bank.db"))
+    bank.add_questions([question(1)], TOPICS)
+    with bank._lock:
+        bank._conn.execute("UPDATE questions SET options = ?",
+                           (json.dumps({"A": 7, "B": None, "C": "Ohm", "D": ["x"]}),))
+        bank._conn.commit()
+
+    assert bank.option_texts(TOPICS) == ["Ohm"]
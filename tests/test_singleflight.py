@@ -0,0 +1,157 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from singleflight import SingleFlight
+
+
+def run_threads(count, target):
+    results = [None] * count
+    errors = [None] * count
+
+    def run(i):
+        try:
+            results[i] = target()
+        except Exception as e:
+            errors[i] = e
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    return results, errors
+
+
+def test_do_runs_once_for_concurrent_callers():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        release.wait(5)
+        return {"questions": []}
+
+    waiter = threading.Timer(0.2, release.set)
+    waiter.start()
+    results, errors = run_threads(4, lambda: flight.do("key", fn))
+
+    assert calls == [1]
+    assert errors == [None] * 4
+    assert all(result is results[0] for result in results)
+    assert flight.stats()["coalesced_waiters"] == 3
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_do_shares_the_leaders_exception_then_forgets_it():
+    flight = SingleFlight()
+
+    with pytest.raises(ValueError):
+        flight.do("key", lambda: (_ for _ in ()).throw(ValueError("bad")))
+
+    assert flight.do("key", lambda: 42) == 42
+
+
+def job(done=False):
+    return SimpleNamespace(done=done)
+
+
+def test_share_returns_the_unfinished_object():
+    flight = SingleFlight()
+    first = flight.share("key", job, lambda j: j.done)
+
+    assert flight.share("key", job, lambda j: j.done) is first
+    first.done = True
+    assert flight.share("key", job, lambda j: j.done) is not first
+    assert flight.stats()["leaders"] == 2
+
+
+def test_share_callers_arriving_during_start_wait_for_it():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    starts = []
+
+    def slow_start():
+        starts.append(1)
+        started.set()
+        release.wait(5)
+        return job()
+
+    leader = threading.Thread(target=lambda: flight.share("key", slow_start, lambda j: j.done))
+    leader.start()
+    started.wait(5)
+    threading.Timer(0.2, release.set).start()
+    results, errors = run_threads(3, lambda: flight.share("key", slow_start, lambda j: j.done))
+    leader.join(5)
+
+    assert starts == [1]
+    assert errors == [None] * 3
+    assert all(result is results[0] for result in results)
+
+
+def test_share_starts_other_keys_while_one_is_starting():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow_start():
+        started.set()
+        release.wait(5)
+        return job()
+
+    leader = threading.Thread(target=lambda: flight.share("slow", slow_start, lambda j: j.done))
+    leader.start()
+    started.wait(5)
+    try:
+        other, errors = run_threads(1, lambda: flight.share("other", job, lambda j: j.done))
+        # Finished while "slow" is still inside start()
+        assert not release.is_set()
+        assert errors == [None] and other[0] is not None
+    finally:
+        release.set()
+        leader.join(5)
+
+
+def test_share_start_error_reaches_waiters_and_is_not_kept():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+
+    def failing_start():
+        started.set()
+        release.wait(5)
+        raise RuntimeError("queue full")
+
+    leader_errors = []
+
+    def lead():
+        try:
+            flight.share("key", failing_start, lambda j: j.done)
+        except RuntimeError as e:
+            leader_errors.append(e)
+
+    leader = threading.Thread(target=lead)
+    leader.start()
+    started.wait(5)
+    threading.Timer(0.2, release.set).start()
+    _, errors = run_threads(2, lambda: flight.share("key", failing_start, lambda j: j.done))
+    leader.join(5)
+
+    assert len(leader_errors) == 1
+    assert all(isinstance(e, RuntimeError) for e in errors)
+    assert flight.stats()["in_flight"] == 0
+    assert flight.share("key", job, lambda j: j.done).done is False
+
+
+def test_share_prunes_each_entry_with_its_own_predicate():
+    flight = SingleFlight()
+    run = SimpleNamespace(finished=False)
+    flight.share("run", lambda: run, lambda r: r.finished)
+
+    # The run has no `done`: only its own predicate may be applied to it
+    flight.share("job", job, lambda j: j.done)
+
+    assert flight.share("run", lambda: None, lambda r: r.finished) is run
@@ -0,0 +1,42 @@
+import generation
+from llm_backends import MockBackend
+from mcq_cache import MCQCache
+from mcq_schema import OutputMetrics
+
+TOPICS = "\n".join(f"Topic {i}: definition and units of concept {i}" for i in range(1, 6))
+
+
+class TruncatedStreamBackend(MockBackend):
+    """Streams only the first part of each response; whole responses are intact"""
+
+    def stream(self, prompt, response_schema=None):
+        text = "".join(super().stream(prompt, response_schema))
+        yield text[:int(len(text) * 0.45)]
+
+
+def stream(backend, cache, metrics, count=5):
+    return list(generation.stream_llm_mcqs(TOPICS, "", backend, cache, count, metrics))
+
+
+def test_truncated_stream_is_topped_up_by_repair():
+    metrics, cache = OutputMetrics(), MCQCache()
+    questions = stream(TruncatedStreamBackend(latency=0), cache, metrics)
+
+    stats = metrics.stats()
+    assert len(questions) == 5
+    assert stats["parse_failures"] == 1
+    assert 0 < stats["questions_missing"] < 5
+    assert stats["repair_calls"] == 1 and stats["questions_repaired"] == stats["questions_missing"]
+
+
+def test_short_quiz_is_not_cached():
+    class NoRepairs(TruncatedStreamBackend):
+        def generate(self, prompt, response_schema=None):
+            raise RuntimeError("repair unavailable")
+
+    metrics, cache = OutputMetrics(), MCQCache()
+    questions = stream(NoRepairs(latency=0), cache, metrics)
+
+    assert 0 < len(questions) < 5
+    assert metrics.stats()["responses"] == 1
+    assert cache.stats()["stores"] == 0
@@ -0,0 +1,241 @@
+"""Per-stage timing spans, token counts and metrics export
+
+Generation is split into stages (queue wait, prompt construction, LLM call,
+time to first chunk, JSON extraction, validation, repair, page rendering).
+Each finished stage is added to a latency histogram and, when a trace path
+is set, written as one JSON line to a rotating trace file. Stages carry the
+request ID of the generation they belong to; the ID lives in a context
+variable, so worker threads started through `bind` inherit it.
+
+Tracing is off until `enable()` installs a Tracer. While it is off, `span`
+returns a shared no-op context manager and `observe`/`add_tokens` return
+immediately, so the instrumentation costs one global lookup per call site.
+"""
+import contextlib
+import contextvars
+import functools
+import json
+import logging
+import logging.handlers
+import os
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+_tracer = None
+_request_id = contextvars.ContextVar("mcq_request_id", default=None)
+_NOOP = contextlib.nullcontext()
+
+
+class Tracer:
+    """Stage histograms, token counters and an optional rotating JSONL trace"""
+
+    def __init__(self, path=None, max_bytes=10_000_000, backups=3, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._stages = {}
+        self.prompt_tokens = 0
+        self.output_tokens = 0
+        self.path = path
+        self._log = None
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            handler = logging.handlers.RotatingFileHandler(
+                path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8"
+            )
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self._log = logging.getLogger(f"mcq.trace.{id(self)}")
+            self._log.propagate = False
+            self._log.setLevel(logging.INFO)
+            self._log.addHandler(handler)
+
+    def observe(self, stage, seconds, error=None, **attrs):
+        with self._lock:
+            entry = self._stages.get(stage)
+            if entry is None:
+                entry = self._stages[stage] = {
+                    "count": 0, "errors": 0, "sum": 0.0, "buckets": [0] * len(self.buckets),
+                }
+            entry["count"] += 1
+            entry["sum"] += seconds
+            if error is not None:
+                entry["errors"] += 1
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    entry["buckets"][i] += 1
+                    break
+        if self._log is not None:
+            record = {
+                "ts": round(time.time(), 3),
+                "request_id": _request_id.get(),
+                "stage": stage,
+                "ms": round(seconds * 1000, 3),
+            }
+            if error is not None:
+                record["error"] = type(error).__name__
+            record.update(attrs)
+            self._log.info(json.dumps(record, default=str))
+
+    def add_tokens(self, prompt_tokens, output_tokens):
+        with self._lock:
+            self.prompt_tokens += prompt_tokens or 0
+            self.output_tokens += output_tokens or 0
+        if self._log is not None:
+            self._log.info(json.dumps({
+                "ts": round(time.time(), 3),
+                "request_id": _request_id.get(),
+                "stage": "tokens",
+                "prompt_tokens": prompt_tokens,
+                "output_tokens": output_tokens,
+            }))
+
+    def stats(self):
+        """Count, errors and mean milliseconds per stage, plus token totals"""
+        with self._lock:
+            stats = {
+                stage: {
+                    "count": entry["count"],
+                    "errors": entry["errors"],
+                    "mean_ms": round(entry["sum"] / entry["count"] * 1000, 3),
+                }
+                for stage, entry in sorted(self._stages.items())
+            }
+            stats["tokens"] = {"prompt": self.prompt_tokens, "output": self.output_tokens}
+        return stats
+
+    def render_prometheus(self):
+        """Metrics in the Prometheus text exposition format"""
+        lines = [
+            "# HELP mcq_stage_seconds Time spent in each generation and page stage.",
+            "# TYPE mcq_stage_seconds histogram",
+        ]
+        with self._lock:
+            stages = {stage: dict(entry, buckets=list(entry["buckets"]))
+                      for stage, entry in sorted(self._stages.items())}
+            prompt_tokens, output_tokens = self.prompt_tokens, self.output_tokens
+        for stage, entry in stages.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, entry["buckets"]):
+                cumulative += count
+                lines.append(f'mcq_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'mcq_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {entry["count"]}')
+            lines.append(f'mcq_stage_seconds_sum{{stage="{stage}"}} {entry["sum"]:.6f}')
+            lines.append(f'mcq_stage_seconds_count{{stage="{stage}"}} {entry["count"]}')
+        lines += ["# HELP mcq_stage_errors_total Stages that ended with an exception.",
+                  "# TYPE mcq_stage_errors_total counter"]
+        for stage, entry in stages.items():
+            lines.append(f'mcq_stage_errors_total{{stage="{stage}"}} {entry["errors"]}')
+        lines += [
+            "# HELP mcq_llm_tokens_total Tokens reported by the LLM SDK.",
+            "# TYPE mcq_llm_tokens_total counter",
+            f'mcq_llm_tokens_total{{kind="prompt"}} {prompt_tokens}',
+            f'mcq_llm_tokens_total{{kind="output"}} {output_tokens}',
+        ]
+        return "\n".join(lines) + "\n"
+
+
+class _Span:
+    __slots__ = ("tracer", "stage", "attrs", "started")
+
+    def __init__(self, tracer, stage, attrs):
+        self.tracer = tracer
+        self.stage = stage
+        self.attrs = attrs
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Control flow such as st.rerun() raises BaseException; only Exceptions are errors
+        error = exc if isinstance(exc, Exception) else None
+        self.tracer.observe(self.stage, time.perf_counter() - self.started, error, **self.attrs)
+        return False
+
+
+def enable(tracer):
+    """Install `tracer` for the whole process (None turns tracing off)"""
+    global _tracer
+    _tracer = tracer
+
+
+def enabled():
+    return _tracer is not None
+
+
+def get_tracer():
+    return _tracer
+
+
+def span(stage, **attrs):
+    """Context manager timing one stage"""
+    tracer = _tracer
+    if tracer is None:
+        return _NOOP
+    return _Span(tracer, stage, attrs)
+
+
+def observe(stage, seconds, **attrs):
+    """Record a stage that was timed by the caller (e.g. time to first chunk)"""
+    tracer = _tracer
+    if tracer is not None:
+        tracer.observe(stage, seconds, **attrs)
+
+
+def add_tokens(prompt_tokens, output_tokens):
+    tracer = _tracer
+    if tracer is not None:
+        tracer.add_tokens(prompt_tokens, output_tokens)
+
+
+def current_request_id():
+    return _request_id.get()
+
+
+@contextlib.contextmanager
+def _request_scope(request_id):
+    token = _request_id.set(request_id)
+    try:
+        yield request_id
+    finally:
+        _request_id.reset(token)
+
+
+def request(request_id=None):
+    """Context manager giving the stages inside it one request ID"""
+    if _tracer is None:
+        return _NOOP
+    return _request_scope(request_id or uuid.uuid4().hex[:12])
+
+
+def bind(fn):
+    """fn wrapped to run in the caller's context, so a worker thread keeps its request ID"""
+    if _tracer is None:
+        return fn
+    return functools.partial(contextvars.copy_context().run, fn)
+
+
+def serve_metrics(tracer, host="0.0.0.0", port=9464):
+    """Serve tracer.render_prometheus() at /metrics on a daemon thread"""
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = tracer.render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True, name="mcq-metrics").start()
+    return server